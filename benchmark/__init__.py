@@ -0,0 +1,16 @@
+"""Benchmarks of the renderer
+
+`generate` writes synthetic libraries, `run` times the rendering stages
+and `compare` flags regressions between two results. `determinism`
+checks that archives and pdfs do not depend on the number of workers and
+`bounds` checks the boxes of arcs and the layouts built on them.
+Run from the repository root, e.g.
+`python -m benchmark.run lib.lbr -o result.json`.
+"""
+import os
+import sys
+
+# the renderer modules live flat in src/
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
@@ -0,0 +1,205 @@
+"""Check the bounds of arcs and the layouts built on them
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+from typing import List
+
+import numpy as np
+
+import benchmark  # noqa: F401  (puts src/ on the path)
+from colorful_logger import get_colorful_logger
+from deviceset import GAP, compose_deviceset
+from canvas import BACKENDS
+from EagleDraw import (GeometryCache, RenderOptions, build_geometry,
+                       build_layer_table)
+from geometry import arc_bounds, arc_segments, tessellate_arcs
+from geometry_ir import GeometryBuilder
+from overview import (CELL, FRAME_WIDTH, LABEL_HEIGHT, MARGIN, SCALE,
+                      compose_overview, grid_shape, render_overview)
+
+logger = get_colorful_logger(__name__)
+
+# shallow arcs around each axis, a wrap through 0 deg and a full circle
+ARCS = [(80, 100), (170, 190), (260, 280), (350, 370), (-10, 10),
+        (30, 60), (0, 360)]
+
+
+def check_arc_bounds(n: int = 500, seed: int = 0) -> List[str]:
+    """Compare `arc_bounds` with fine polylines of the arcs
+
+    Args:
+        n (int, optional): random arcs besides `ARCS`. Defaults to 500.
+        seed (int, optional): seed of the random arcs. Defaults to 0.
+
+    Returns:
+        List[str]: arcs whose box differs from that of their polyline
+    """
+    rng = np.random.default_rng(seed)
+    t1 = np.concatenate([[a for a, _ in ARCS], rng.uniform(-360, 360, n)])
+    t2 = np.concatenate([[b for _, b in ARCS],
+                         t1[len(ARCS):] + rng.uniform(0, 360, n)])
+    cx = rng.uniform(-50, 50, len(t1))
+    cy = rng.uniform(-50, 50, len(t1))
+    r = rng.uniform(0.1, 20, len(t1))
+
+    # the polyline vertices lie on the arc, so they must be inside the box;
+    # its extremes may fall short of the box by the sagitta of a chord
+    lines = tessellate_arcs(cx, cy, r, t1, t2)
+    span = np.radians(np.where(np.mod(t2 - t1, 360) == 0, 360,
+                               np.mod(t2 - t1, 360)))
+    sagitta = r*(1 - np.cos(span/arc_segments(r, t1, t2)/2)) + 1e-9
+    boxes = np.stack(arc_bounds(cx, cy, r, t1, t2), axis=1)
+    failures = []
+    for i, line in enumerate(lines):
+        extremes = np.concatenate([line.min(axis=0), line.max(axis=0)])
+        slack = (extremes - boxes[i]) * [1, 1, -1, -1]
+        if np.any(slack < -1e-9) or np.any(slack > sagitta[i]):
+            failures.append(f'arc {t1[i]:.1f}..{t2[i]:.1f}: '
+                            f'{np.round(boxes[i], 3).tolist()} vs polyline '
+                            f'{np.round(extremes, 3).tolist()}')
+    return failures
+
+
+def check_geometry_bounds() -> List[str]:
+    """Bound a package made only of a shallow arc
+
+    Returns:
+        List[str]: a description of the failure, if any
+    """
+    builder = GeometryBuilder()
+    builder.arc((0, -10), 10, 80, 100, 0, 'k', 1)
+    xmin, ymin, xmax, ymax = builder.geometry().bounds()
+    expected = (-10 * np.sin(np.radians(10)), 10 * np.cos(np.radians(10)) - 10,
+                10 * np.sin(np.radians(10)), 0)
+    if np.allclose((xmin, ymin, xmax, ymax), expected, atol=1e-9):
+        return []
+    return [f'shallow arc: bounds {(xmin, ymin, xmax, ymax)} != {expected}']
+
+
+# a 10 mm chord with a 20 deg arc over it, 0.44 mm high
+ARC_PACKAGE = """<package name="ARC">
+<wire x1="-5" y1="0" x2="5" y2="0" width="0.2" layer="21" curve="20"/>
+</package>"""
+BOX_SYMBOL = """<symbol name="BOX">
+<wire x1="0" y1="-5" x2="10" y2="-5" width="0.4" layer="94"/>
+<wire x1="10" y1="-5" x2="10" y2="5" width="0.4" layer="94"/>
+<wire x1="10" y1="5" x2="0" y2="5" width="0.4" layer="94"/>
+<wire x1="0" y1="5" x2="0" y2="-5" width="0.4" layer="94"/>
+</symbol>"""
+DEVICESET = """<deviceset name="PART">
+<gates><gate name="G$1" symbol="BOX" x="0" y="0"/></gates>
+<devices><device name="" package="ARC"/></devices>
+</deviceset>"""
+LAYERS = """<layers>
+<layer number="21" name="tPlace" color="7" fill="1"/>
+<layer number="94" name="Symbols" color="4" fill="1"/>
+<layer number="95" name="Names" color="7" fill="1"/>
+<layer number="96" name="Values" color="7" fill="1"/>
+</layers>"""
+
+
+def _cache() -> GeometryCache:
+    """Geometries of `ARC_PACKAGE` and `BOX_SYMBOL`"""
+    layers = build_layer_table(ET.fromstring(LAYERS))
+    cache = GeometryCache(layers)
+    for kind, xml in (('packages', ARC_PACKAGE), ('symbols', BOX_SYMBOL)):
+        item = ET.fromstring(xml)
+        cache.add(kind, item.attrib['name'], build_geometry(kind, item, layers))
+    return cache
+
+
+def check_deviceset() -> List[str]:
+    """Place a package with a shallow arc next to a symbol on a sheet
+
+    The package is `GAP` to the right of the symbol and centred on it, so
+    the sheet is as high as the symbol.
+
+    Returns:
+        List[str]: descriptions of the failures
+    """
+    cache = _cache()
+    sheet = compose_deviceset(ET.fromstring(DEVICESET), cache, cache.layers)
+
+    failures = []
+    package, dx, dy = sheet.parts[1]
+    px0, py0, px1, py1 = package.bounds()
+    if not np.isclose(px0 + dx, 10 + GAP):
+        failures.append(f'package starts at x={px0 + dx:.3f}, '
+                        f'not {10 + GAP:.3f}')
+    if not np.isclose(py0 + py1 + 2*dy, 0) or py1 - py0 > 0.5:
+        failures.append(f'package spans y={py0 + dy:.3f}..{py1 + dy:.3f}')
+    _, _, _, ymax = sheet.bounds()
+    if not np.isclose(ymax, 5):
+        failures.append(f'sheet reaches up to y={ymax:.3f}, not 5')
+    return failures
+
+
+def check_overview() -> List[str]:
+    """Fill an overview cell with a package with a shallow arc
+
+    The package spans the width of its cell less the margins. The sheet
+    is drawn on a page of the size of the grid at `overview.SCALE`.
+
+    Returns:
+        List[str]: descriptions of the failures
+    """
+    cache = _cache()
+    names = ['ARC', 'ARC', 'ARC']
+    sheet, _ = compose_overview('packages', names[:1], cache, cache.layers)
+    failures = []
+    x0, _, x1, _ = sheet.select([21]).bounds()
+    if not np.isclose(x1 - x0, CELL - 2*MARGIN):
+        failures.append(f'package fills {x1 - x0:.3f} of {CELL - 2*MARGIN} '
+                        f'mm of its cell')
+
+    rows, cols = grid_shape(len(names))
+    for backend in BACKENDS:
+        with tempfile.TemporaryDirectory() as workdir:
+            figpath = os.path.join(workdir, 'packages.svg')
+            render_overview('packages', names, cache, figpath,
+                            RenderOptions(backend=backend))
+            with open(os.path.join(workdir, 'packages.json')) as f:
+                cellmap = json.load(f)
+        page = np.array(cellmap['page'])
+        expected = (np.array([cols*CELL, rows*(CELL + LABEL_HEIGHT)])
+                    + 2*FRAME_WIDTH)*SCALE
+        if not np.allclose(page, expected, atol=0.01):
+            failures.append(f'{backend}: page {page.tolist()} != '
+                            f'{np.round(expected, 2).tolist()}')
+        left, top, right, bottom = cellmap['cells'][0]['box']
+        if not np.allclose([left, top, right - left, bottom - top],
+                           [FRAME_WIDTH*SCALE, FRAME_WIDTH*SCALE,
+                            CELL*SCALE, CELL*SCALE], atol=0.01):
+            failures.append(f'{backend}: first cell at '
+                            f'{cellmap["cells"][0]["box"]}')
+    return failures
+
+
+CHECKS = {
+    'arcs': check_arc_bounds,
+    'geometry': check_geometry_bounds,
+    'deviceset': check_deviceset,
+    'overview': check_overview,
+}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--check', choices=list(CHECKS), nargs='+',
+                        default=list(CHECKS))
+    args = parser.parse_args()
+
+    failed = False
+    for name in args.check:
+        failures = CHECKS[name]()
+        for failure in failures:
+            logger.error(f'{name}: {failure}')
+        if len(failures) > 0:
+            failed = True
+        else:
+            logger.info(f'{name}: ok')
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,92 @@
+"""Compare two benchmark results and flag regressions
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, NamedTuple
+
+from colorful_logger import get_colorful_logger
+
+logger = get_colorful_logger(__name__)
+
+MIN_DELTA = 0.001  # s, differences below are noise
+
+
+class Regression(NamedTuple):
+    metric: str
+    base: float
+    new: float
+
+    @property
+    def ratio(self) -> float:
+        return self.new/self.base if self.base > 0 else float('inf')
+
+
+def load(filename: str) -> dict:
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+
+def metrics(result: dict) -> Dict[str, float]:
+    """Timings of a result, in seconds"""
+    m = {f'stages.{k}': v for k, v in result['stages'].items()}
+    g = result.get('glyphs')
+    if g and g['letters']:
+        m['glyphs.per_letter'] = g['seconds']/g['letters']
+    return m
+
+
+def compare(base: dict, new: dict, threshold: float = 0.1) -> List[Regression]:
+    """Metrics that got slower than the threshold allows
+
+    Args:
+        base (dict): reference result
+        new (dict): result to check
+        threshold (float, optional): allowed slowdown, 0.1 is 10%.
+            Defaults to 0.1.
+
+    Returns:
+        List[Regression]: regressed metrics
+    """
+    if base.get('library') != new.get('library') or \
+            base.get('options') != new.get('options'):
+        logger.warning('results are from different workloads or options')
+    if base.get('items') != new.get('items'):
+        logger.warning(f'item counts differ: {base.get("items")} vs '
+                       f'{new.get("items")}')
+
+    m_base = metrics(base)
+    m_new = metrics(new)
+    regressions = []
+    for key in m_base:
+        if key not in m_new:
+            continue
+        b, n = m_base[key], m_new[key]
+        # per-letter times are tiny, scale the noise floor per letter
+        min_delta = MIN_DELTA/new['glyphs']['letters'] \
+            if key.startswith('glyphs.') else MIN_DELTA
+        if n > b*(1 + threshold) and n - b > min_delta:
+            regressions.append(Regression(key, b, n))
+    return regressions
+
+
+def report(regressions: List[Regression]):
+    if not regressions:
+        logger.info('no regressions')
+        return
+    for r in regressions:
+        logger.error(f'{r.metric}: {r.base*1e3:.3f} ms -> {r.new*1e3:.3f} ms '
+                     f'({r.ratio:.2f}x)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('base', help='reference json result')
+    parser.add_argument('new', help='json result to check')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='allowed slowdown, 0.1 is 10%%')
+    args = parser.parse_args()
+
+    regressions = compare(load(args.base), load(args.new), args.threshold)
+    report(regressions)
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,82 @@
+"""Check that archives and pdfs do not depend on the number of workers
+"""
+import argparse
+import filecmp
+import os
+import sys
+import tempfile
+from typing import List
+
+import benchmark  # noqa: F401  (puts src/ on the path)
+from batch import render_files
+from benchmark.generate import Workload, generate
+from colorful_logger import get_colorful_logger
+from sinks import SINKS
+
+logger = get_colorful_logger(__name__)
+
+# libraries of different sizes, so that the largest-first schedule of a
+# batch differs from the order of the files
+LIBRARIES = [
+    Workload(packages=12, symbols=4, wires=64),
+    Workload(packages=3, symbols=10),
+    Workload(packages=8, symbols=8, pads=12, smds=24),
+]
+
+
+def differences(sink: str, jobs: int, workdir: str) -> List[str]:
+    """Draw a batch of libraries serially, in parallel and file by file
+
+    Args:
+        sink (str): `zip`, `tar` or `pdf`
+        jobs (int): workers of the parallel run
+        workdir (str): directory for the libraries and the outputs
+
+    Returns:
+        List[str]: outputs that differ from those of the serial batch
+    """
+    filenames = []
+    for i, w in enumerate(LIBRARIES):
+        filename = os.path.join(workdir, f'lib{i}.lbr')
+        generate(filename, w, seed=i)
+        filenames.append(filename)
+
+    outputs = {}
+    for label, runs in (('j1', [filenames]), (f'j{jobs}', [filenames]),
+                        ('single', [[f] for f in filenames])):
+        outputdir = os.path.join(workdir, f'{sink}-{label}')
+        for files in runs:
+            render_files(files, outputdir, jobs=1 if label == 'j1' else jobs,
+                         sink=sink)
+        outputs[label] = outputdir
+
+    names = [f'lib{i}.{sink}' for i in range(len(LIBRARIES))]
+    if sink == 'pdf':
+        names += [f'{name}.json' for name in names]
+    different = []
+    for label in (f'j{jobs}', 'single'):
+        _, mismatch, errors = filecmp.cmpfiles(outputs['j1'], outputs[label],
+                                               names, shallow=False)
+        different += [f'{label}/{name}' for name in mismatch + errors]
+    return different
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--jobs', '-j', type=int, default=3,
+                        help='workers of the parallel run')
+    parser.add_argument('--sink', choices=SINKS[1:], nargs='+',
+                        default=['zip', 'tar', 'pdf'])
+    args = parser.parse_args()
+
+    failed = False
+    for sink in args.sink:
+        with tempfile.TemporaryDirectory() as workdir:
+            different = differences(sink, args.jobs, workdir)
+        if len(different) > 0:
+            logger.error(f'{sink}: differs from -j1: {", ".join(different)}')
+            failed = True
+        else:
+            logger.info(f'{sink}: -j1, -j{args.jobs} and per-file runs '
+                        f'are identical')
+    sys.exit(1 if failed else 0)
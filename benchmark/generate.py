@@ -0,0 +1,165 @@
+"""Synthetic EAGLE libraries of a configurable size
+"""
+import argparse
+import random
+import string
+import xml.etree.ElementTree as ET
+from typing import NamedTuple
+
+from colorful_logger import get_colorful_logger
+
+logger = get_colorful_logger(__name__)
+
+LAYERS = [
+    (1, 'Top', 4), (16, 'Bottom', 1), (17, 'Pads', 2), (21, 'tPlace', 7),
+    (25, 'tNames', 7), (27, 'tValues', 7), (51, 'tDocu', 6),
+    (94, 'Symbols', 4), (95, 'Names', 7), (96, 'Values', 7),
+]
+PACKAGE_LAYERS = [21, 51]
+TEXT_CHARS = string.ascii_letters + string.digits + '-_.+/()#'
+
+
+class Workload(NamedTuple):
+    packages: int = 10
+    symbols: int = 10
+    pads: int = 4  # per package
+    smds: int = 4  # per package
+    wires: int = 16  # per package and symbol
+    curved: float = 0.25  # fraction of the wires that are arcs
+    texts: int = 2  # per package and symbol
+    text_length: int = 8
+    pins: int = 4  # per symbol
+
+
+# named workloads, so that results of different runs are comparable
+WORKLOADS = {
+    'small': Workload(),
+    'medium': Workload(packages=100, symbols=100),
+    'large': Workload(packages=200, symbols=100, pads=20, smds=40,
+                      wires=200, texts=8, text_length=16, pins=16),
+    'text': Workload(packages=50, symbols=50, pads=0, smds=0, wires=4,
+                     texts=20, text_length=32, pins=2),
+}
+
+
+def _fmt(v: float) -> str:
+    return f'{v:.4f}'.rstrip('0').rstrip('.')
+
+
+def _text(rng: random.Random, length: int) -> str:
+    return ''.join(rng.choice(TEXT_CHARS) for _ in range(length))
+
+
+def _rot(rng: random.Random) -> str:
+    return rng.choice(['R0', 'R90', 'R180', 'R270'])
+
+
+def make_package(name: str, w: Workload, rng: random.Random) -> ET.Element:
+    pkg = ET.Element('package', name=name)
+    for i in range(w.pads):
+        ET.SubElement(pkg, 'pad', name=f'P{i+1}', x=_fmt(2.54*i), y='0',
+                      drill='0.8', diameter='1.6')
+    for i in range(w.smds):
+        ET.SubElement(pkg, 'smd', name=f'S{i+1}', x=_fmt(1.27*i), y='-3',
+                      dx='0.6', dy='1.2', layer='1', rot=_rot(rng))
+    for i in range(w.wires):
+        attr = dict(x1=_fmt(rng.uniform(-5, 5)), y1=_fmt(rng.uniform(-5, 5)),
+                    x2=_fmt(rng.uniform(-5, 5)), y2=_fmt(rng.uniform(-5, 5)),
+                    width='0.127', layer=str(rng.choice(PACKAGE_LAYERS)))
+        if rng.random() < w.curved:
+            attr['curve'] = _fmt(rng.choice([-1, 1])*rng.uniform(10, 180))
+        ET.SubElement(pkg, 'wire', attr)
+    for i in range(w.texts):
+        t = ET.SubElement(pkg, 'text', x=_fmt(rng.uniform(-5, 5)),
+                          y=_fmt(rng.uniform(-5, 5)), size='0.8',
+                          layer=rng.choice(['25', '27']), rot=_rot(rng))
+        t.text = _text(rng, w.text_length)
+    return pkg
+
+
+def make_symbol(name: str, w: Workload, rng: random.Random) -> ET.Element:
+    sym = ET.Element('symbol', name=name)
+    for i in range(w.wires):
+        ET.SubElement(sym, 'wire', x1=_fmt(rng.uniform(-5, 5)),
+                      y1=_fmt(rng.uniform(-5, 5)), x2=_fmt(rng.uniform(-5, 5)),
+                      y2=_fmt(rng.uniform(-5, 5)), width='0.254', layer='94')
+    for i in range(w.pins):
+        ET.SubElement(sym, 'pin', name=f'{i+1}', x=_fmt(-7.62), y=_fmt(-2.54*i),
+                      length='short', direction='pas')
+    for i in range(w.texts):
+        t = ET.SubElement(sym, 'text', x=_fmt(rng.uniform(-5, 5)),
+                          y=_fmt(rng.uniform(-5, 5)), size='1.778',
+                          layer=rng.choice(['95', '96']))
+        t.text = _text(rng, w.text_length)
+    return sym
+
+
+def make_library(w: Workload, seed: int = 0) -> ET.ElementTree:
+    """Build a library for a workload
+
+    Args:
+        w (Workload): sizes of the library
+        seed (int, optional): seed of the random geometry. Defaults to 0.
+
+    Returns:
+        ET.ElementTree: <eagle> document
+    """
+    rng = random.Random(seed)
+    eagle = ET.Element('eagle', version='9.6.2')
+    drawing = ET.SubElement(eagle, 'drawing')
+    layers = ET.SubElement(drawing, 'layers')
+    for number, name, color in LAYERS:
+        ET.SubElement(layers, 'layer', number=str(number), name=name,
+                      color=str(color), fill='1', visible='yes', active='yes')
+    library = ET.SubElement(drawing, 'library')
+    packages = ET.SubElement(library, 'packages')
+    for i in range(w.packages):
+        packages.append(make_package(f'PKG{i}', w, rng))
+    symbols = ET.SubElement(library, 'symbols')
+    for i in range(w.symbols):
+        symbols.append(make_symbol(f'SYM{i}', w, rng))
+
+    devicesets = ET.SubElement(library, 'devicesets')
+    for i in range(min(w.packages, w.symbols)):
+        ds = ET.SubElement(devicesets, 'deviceset', name=f'DEV{i}', prefix='U')
+        gates = ET.SubElement(ds, 'gates')
+        ET.SubElement(gates, 'gate', name='G$1', symbol=f'SYM{i}', x='0', y='0')
+        devices = ET.SubElement(ds, 'devices')
+        dev = ET.SubElement(devices, 'device', name='', package=f'PKG{i}')
+        connects = ET.SubElement(dev, 'connects')
+        for k in range(min(w.pins, w.pads)):
+            ET.SubElement(connects, 'connect', gate='G$1', pin=f'{k+1}',
+                          pad=f'P{k+1}')
+    return ET.ElementTree(eagle)
+
+
+def generate(filename: str, w: Workload = Workload(), seed: int = 0):
+    """Write a synthetic library
+
+    Args:
+        filename (str): path of the .lbr file
+        w (Workload, optional): sizes of the library
+        seed (int, optional): seed of the random geometry. Defaults to 0.
+    """
+    tree = make_library(w, seed)
+    tree.write(filename, encoding='utf-8', xml_declaration=True)
+    logger.info(f'write {filename}: {w.packages} packages, '
+                f'{w.symbols} symbols')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('filename')
+    parser.add_argument(
+        '--workload', choices=WORKLOADS, default='small',
+        help='named workload, the options below override its sizes')
+    for field, default in Workload._field_defaults.items():
+        parser.add_argument(f'--{field.replace("_", "-")}',
+                            type=type(default), default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    w = WORKLOADS[args.workload]
+    w = w._replace(**{f: getattr(args, f) for f in Workload._fields
+                      if getattr(args, f) is not None})
+    generate(args.filename, w, args.seed)
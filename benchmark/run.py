@@ -0,0 +1,170 @@
+"""Time the rendering of a library stage by stage
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict
+
+import benchmark  # noqa: F401  (puts src/ on the path)
+from colorful_logger import get_colorful_logger
+from EagleDraw import (LayerTable, RenderOptions, build_geometry,
+                       build_layer_table, draw_text, make_layer, new_canvas)
+from geometry_ir import GeometryBuilder
+from vector_font import glyph_table
+
+logger = get_colorful_logger(__name__)
+
+STAGES = ('xml_load', 'layers', 'geometry', 'draw', 'save')
+GLYPH_TEXT = 'The quick brown fox jumps over the lazy dog 0123456789 >NAME'
+
+
+def time_library(filename: str, outputdir: str,
+                 options: RenderOptions = RenderOptions()) -> Dict[str, float]:
+    """Render every package and symbol once and time each stage
+
+    Args:
+        filename (str): path of the .lbr file
+        outputdir (str): directory for the output files
+        options (RenderOptions, optional): backend and its settings
+
+    Returns:
+        Dict[str, float]: seconds per stage, `geometry` covers the draw_*
+            calls, `draw` the replay on the backend canvas and `save` the
+            file output (savefig for matplotlib)
+    """
+    t = {stage: 0.0 for stage in STAGES}
+    t['items'] = 0
+
+    t0 = time.perf_counter()
+    root = ET.parse(filename).getroot()
+    t1 = time.perf_counter()
+    t['xml_load'] = t1 - t0
+
+    drawing = root.find('drawing')
+    layers = build_layer_table(drawing.find('layers'))
+    t['layers'] = time.perf_counter() - t1
+
+    library = drawing.find('library')
+    for kind in ('packages', 'symbols'):
+        items = library.find(kind)
+        if items is None:
+            continue
+        for item in items:
+            t0 = time.perf_counter()
+            geometry = build_geometry(kind, item, layers)
+            t1 = time.perf_counter()
+            canvas = new_canvas(options)
+            geometry.draw(canvas)
+            t2 = time.perf_counter()
+            canvas.save(os.path.join(outputdir, f'{kind}_{item.attrib["name"]}.svg'),
+                        title=item.attrib['name'])
+            t3 = time.perf_counter()
+            t['geometry'] += t1 - t0
+            t['draw'] += t2 - t1
+            t['save'] += t3 - t2
+            t['items'] += 1
+    return t
+
+
+def time_glyphs(text: str = GLYPH_TEXT, repeat: int = 20) -> Dict[str, float]:
+    """Time `draw_text` of a whole string into a geometry builder
+
+    Returns:
+        Dict[str, float]: number of letters and seconds
+    """
+    builder = GeometryBuilder()
+    layers = LayerTable({95: make_layer(95, 'Names')})
+    elem = ET.Element('text', {'x': '0', 'y': '0', 'size': '1',
+                               'layer': '95'})
+    elem.text = text
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        draw_text(elem, layers, builder)
+    return {'letters': repeat*len(text), 'seconds': time.perf_counter() - t0}
+
+
+def run(filename: str, options: RenderOptions = RenderOptions(),
+        repeat: int = 3) -> dict:
+    """Benchmark a library
+
+    The stages keep the best time of `repeat` runs. The first run loads
+    the backend and the glyphs.
+
+    Args:
+        filename (str): path of the .lbr file
+        options (RenderOptions, optional): backend and its settings
+        repeat (int, optional): number of runs. Defaults to 3.
+
+    Returns:
+        dict: result, see `benchmark.compare`
+    """
+    t0 = time.perf_counter()
+    new_canvas(options)
+    import_time = time.perf_counter() - t0
+    glyph_table()
+
+    best: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as outputdir:
+        for _ in range(repeat):
+            t = time_library(filename, outputdir, options)
+            for stage, v in t.items():
+                best[stage] = min(best.get(stage, v), v)
+    items = int(best.pop('items'))
+    best['total'] = sum(best[stage] for stage in STAGES)
+
+    glyphs = min((time_glyphs() for _ in range(repeat)),
+                 key=lambda g: g['seconds'])
+
+    try:
+        import matplotlib
+        mpl_version = matplotlib.__version__
+    except ImportError:
+        mpl_version = None
+    import numpy as np
+    return {
+        'library': os.path.basename(filename),
+        'options': options._asdict(),
+        'repeat': repeat,
+        'items': items,
+        'import': import_time,
+        'stages': best,
+        'glyphs': glyphs,
+        'environment': {'python': platform.python_version(),
+                        'numpy': np.__version__,
+                        'matplotlib': mpl_version},
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('filename', help='.lbr file, see benchmark.generate')
+    parser.add_argument('--output', '-o', help='json result path')
+    parser.add_argument('--repeat', '-r', type=int, default=3)
+    parser.add_argument('--batch', action='store_true')
+    parser.add_argument('--backend', default='matplotlib')
+    parser.add_argument('--compare', help='json result to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='allowed slowdown, 0.1 is 10%%')
+    args = parser.parse_args()
+
+    result = run(args.filename, RenderOptions(args.batch, args.backend),
+                 args.repeat)
+    for stage, v in result['stages'].items():
+        logger.info(f'{stage:>10}: {v*1e3:9.1f} ms')
+    g = result['glyphs']
+    logger.info(f'{"glyphs":>10}: {g["seconds"]/g["letters"]*1e6:9.1f} us/letter')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=1)
+        logger.info(f'write {args.output}')
+
+    if args.compare:
+        from benchmark.compare import compare, load, report
+        regressions = compare(load(args.compare), result, args.threshold)
+        report(regressions)
+        sys.exit(1 if regressions else 0)
@@ -1,160 +1,101 @@
+from matplotlib.collections import LineCollection, PatchCollection
 from matplotlib.lines import Line2D
 import matplotlib.patches as patches
 from matplotlib.text import Text
 
-import math
+import numpy as np
 
 
-class LineDataUnits(Line2D):
-    def __init__(self, *args, **kwargs):
-        _lw_data = kwargs.pop("linewidth", 1)
-        super().__init__(*args, **kwargs)
-        self._lw_data = _lw_data
-
-    def _get_lw(self):
-        if self.axes is not None:
-            ppd = 72./self.axes.figure.dpi
-            trans = self.axes.transData.transform
-            return ((trans((1, self._lw_data))-trans((0, 0)))*ppd)[1]
-        else:
-            return 1
+class DataUnitScale(object):
+    """Points per data unit of an axes
 
-    def _set_lw(self, lw):
-        self._lw_data = lw
+    One instance is shared by all data-unit artists of an axes. The scale
+    is recomputed only when the y view limits, the axes box or the dpi
+    have changed since the last read, so the transforms stay out of the
+    per-artist linewidth reads.
+    """
 
-    _linewidth = property(_get_lw, _set_lw)
+    def __init__(self, axes):
+        self.axes = axes
+        self._key = None
+        self._scale = 1.0
 
+    def __call__(self) -> float:
+        axes = self.axes
+        dpi = axes.figure.dpi
+        key = (axes.viewLim.height, axes.bbox.height, dpi)
+        if key != self._key:
+            ppd = 72./dpi
+            trans = axes.transData.transform
+            self._scale = ((trans((0, 1))-trans((0, 0)))*ppd)[1]
+            self._key = key
+        return self._scale
 
-class CircleDataUnit(patches.Circle):
-    def __init__(self, *args, **kwargs):
-        _lw_data = kwargs.pop("linewidth", 1)
-        super().__init__(*args, **kwargs)
-        self._lw_data = _lw_data
 
-    def _get_lw(self):
-        if self.axes is not None:
-            ppd = 72./self.axes.figure.dpi
-            trans = self.axes.transData.transform
-            return ((trans((1, self._lw_data))-trans((0, 0)))*ppd)[1]
-        else:
-            return 1
+def data_unit_scale(axes) -> float:
+    """Points per data unit of an axes, cached on the axes"""
+    scale = getattr(axes, '_data_unit_scale', None)
+    if scale is None:
+        scale = DataUnitScale(axes)
+        axes._data_unit_scale = scale
+    return scale()
 
-    def _set_lw(self, lw):
-        self._lw_data = lw
 
-    _linewidth = property(_get_lw, _set_lw)
+class _DataUnitLinewidth(object):
+    """Linewidth in data units instead of points
 
+    The width given by `_lw_kwarg` is kept in data units and scaled to
+    points on every read by the shared `DataUnitScale` of the axes.
+    Collections set `_lw_array` for their per-item widths.
+    """
+    _lw_kwarg = 'linewidth'
+    _lw_array = False
 
-class RectDataUnit(patches.Rectangle):
     def __init__(self, *args, **kwargs):
-        _lw_data = kwargs.pop("linewidth", 1)
+        _lw_data = kwargs.pop(self._lw_kwarg, 1)
         super().__init__(*args, **kwargs)
-        self._lw_data = _lw_data
+        self._set_lw(_lw_data)
 
     def _get_lw(self):
         if self.axes is not None:
-            ppd = 72./self.axes.figure.dpi
-            trans = self.axes.transData.transform
-            return ((trans((1, self._lw_data))-trans((0, 0)))*ppd)[1]
+            return self._lw_data*data_unit_scale(self.axes)
         else:
-            return 1
+            return np.ones(1) if self._lw_array else 1
 
     def _set_lw(self, lw):
-        self._lw_data = lw
-
-    _linewidth = property(_get_lw, _set_lw)
-
-
-class TextDataUnit(Text):
-    def __init__(self, *args, **kwargs):
-        _fontsize_data = kwargs.pop("fontsize", 1)
-        super().__init__(*args, **kwargs)
-        self._fontsize_data = _fontsize_data
-
-    def _get_fontsize(self):
-        if self.axes is not None:
-            ppd = 72./self.axes.figure.dpi
-            trans = self.axes.transData.transform
-            return ((trans((1, self._fontsize_data))-trans((0, 0)))*ppd)[1]
-        else:
-            return 1
-
-    def _set_fontsize(self, fontsize):
-        self._fontsize_data = fontsize
-
-    _linewidth = property(_get_fontsize, _set_fontsize)
-
+        self._lw_data = np.atleast_1d(lw) if self._lw_array else lw
 
-def get_arc_param(x1, y1, x2, y2, curve: float = 0.5*math.pi):
+    _linewidth = property(lambda self: self._get_lw(),
+                          lambda self, lw: self._set_lw(lw))
 
-    l = math.sqrt((x2-x1)**2 + (y2-y1)**2)
-    phi = math.pi*0.5 - curve*0.5
 
-    u = l*(1-math.sin(phi))/(2*math.cos(phi)+1e-6)
-    # if math.fabs(curve) > (math.pi - 0.001):
-    #     u *= -1
+class LineDataUnits(_DataUnitLinewidth, Line2D):
+    pass
 
-    n = [-(y2-y1), (x2-x1)]
-    nn = math.sqrt(n[0]**2 + n[1]**2)
-    n = [n[0]/nn, n[1]/nn]  # normalize
-    m = [0.5*(x1+x2), 0.5*(y1+y2)]
-    x3 = m[0] - u*n[0]
-    y3 = m[1] - u*n[1]
 
-    x0 = (x1**2*y2 - x1**2*y3 - x2**2*y1 + x2**2*y3 + x3**2*y1 - x3**2*y2 + y1**2*y2 - y1**2*y3 -
-          y1*y2**2 + y1*y3**2 + y2**2*y3 - y2*y3**2)/(2*(x1*y2 - x1*y3 - x2*y1 + x2*y3 + x3*y1 - x3*y2)+1e-6)
-    y0 = -(x1**2*x2 - x1**2*x3 - x1*x2**2 + x1*x3**2 - x1*y2**2 + x1*y3**2 + x2**2*x3 - x2*x3**2 +
-           x2*y1**2 - x2*y3**2 - x3*y1**2 + x3*y2**2)/(2*(x1*y2 - x1*y3 - x2*y1 + x2*y3 + x3*y1 - x3*y2)+1e-6)
-    r = -math.sqrt((x1**2 - 2*x1*x2 + x2**2 + y1**2 - 2*y1*y2 + y2**2)*(x1**2 - 2*x1*x3 + x3**2 + y1**2 - 2*y1*y3 + y3**2)
-                   * (x2**2 - 2*x2*x3 + x3**2 + y2**2 - 2*y2*y3 + y3**2))/(2*(x1*y2 - x1*y3 - x2*y1 + x2*y3 + x3*y1 - x3*y2)+1e-6)
+class CircleDataUnit(_DataUnitLinewidth, patches.Circle):
+    pass
 
-    # if curve < 0:
-    #     x = x1
-    #     y = y1
-    #     x1 = x2
-    #     y1 = y2
-    #     x2 = x
-    #     y2 = y
 
-    theta1 = math.atan2((y1-y0), (x1-x0))
-    theta2 = math.atan2((y2-y0), (x2-x0))
+class RectDataUnit(_DataUnitLinewidth, patches.Rectangle):
+    pass
 
-    if curve < 0:
-        # if theta1 < 0:
-        theta1 += math.pi
 
-    # if theta2 < 0:
-        theta2 += math.pi
+class TextDataUnit(_DataUnitLinewidth, Text):
+    _lw_kwarg = 'fontsize'
 
-    # if theta2 < theta1:
-        t = theta1
-        theta1 = theta2
-        theta2 = t
 
-    # t = theta2 - theta1
-    # if (math.fabs(t)-math.fabs(curve)) > 1.0e-2:
-    #     theta1 -= 0.5*math.pi
-    #     theta2 -= 0.5*math.pi
-    # print(f'{theta1}, {theta2}')
+class ArcDataUnit(_DataUnitLinewidth, patches.Arc):
+    pass
 
-    return x0, y0, r, theta1, theta2, x3, y3
 
+class LineCollectionDataUnits(_DataUnitLinewidth, LineCollection):
+    _lw_kwarg = 'linewidths'
+    _lw_array = True
+    _linewidths = _DataUnitLinewidth._linewidth
 
-class ArcDataUnit(patches.Arc):
-    def __init__(self, *args, **kwargs):
-        _lw_data = kwargs.pop("linewidth", 1)
-        super().__init__(*args, **kwargs)
-        self._lw_data = _lw_data
-
-    def _get_lw(self):
-        if self.axes is not None:
-            ppd = 72./self.axes.figure.dpi
-            trans = self.axes.transData.transform
-            return ((trans((1, self._lw_data))-trans((0, 0)))*ppd)[1]
-        else:
-            return 1
-
-    def _set_lw(self, lw):
-        self._lw_data = lw
 
-    _linewidth = property(_get_lw, _set_lw)
+class PatchCollectionDataUnit(_DataUnitLinewidth, PatchCollection):
+    _lw_kwarg = 'linewidths'
+    _lw_array = True
+    _linewidths = _DataUnitLinewidth._linewidth
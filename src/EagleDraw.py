@@ -1,22 +1,41 @@
+import importlib
 import math
 import os
 import re
 import sys
+import time
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
 import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
-from typing import List, Tuple
+from typing import Dict, List, NamedTuple, Tuple
 
-import matplotlib.patches as patches
-import matplotlib.pyplot as plt
 import numpy as np
 
+from canvas import BACKENDS, Canvas
 from colorful_logger import get_colorful_logger
-from DiagramDataUnit import (ArcDataUnit, CircleDataUnit, LineDataUnits,
-                             RectDataUnit, Text, TextDataUnit, get_arc_param)
-from svg_parser import seek_tree
+from geometry import arc_params
+from geometry_ir import Geometry, GeometryBuilder
+from manifest import Manifest, digest
+from profiler import (active_profiler, count_glyph, profiled, profiling,
+                      stage)
+from sinks import MemorySink, WriteQueue, open_sink
+from store import RenderStore
+from vector_font import glyph_store, glyph_table
 
 logger = get_colorful_logger(__name__)
 
+# bump when the look of the output changes, to invalidate manifests
+RENDERER_VERSION = '5'
+
+PAD_LAYER = 17  # Pad layer no. may be fixed
+PIN_LAYER = 94  # pin layer may be fixed
+
 
 class Unit(Enum):
     MM = 0
@@ -30,7 +49,7 @@ eagle_colors = {
     0: '#ffffff',
     1: '#0696D7',
     2: '#0DAB76',
-    3: '32C8C8',
+    3: '#32C8C8',
     4: '#C90D15',
     5: '#FFBA08',
     6: '#C8C832',
@@ -47,65 +66,6 @@ eagle_colors = {
     95: '#ff0000',
     96: '#ff0000', }
 
-symbol_map = {
-    '&': 'and',
-    '\'': 'apostrophe',
-    '*': 'asterisk',
-    '@': 'at',
-    '(': 'bracket-l',
-    ')': 'bracket-r',
-    '^': 'circumflex',
-    ':': 'colon',
-    ',': 'comma',
-    '{': 'curly-bracket-l',
-    '}': 'curly-bracket-r',
-    '$': 'dollar',
-    '=': 'equal',
-    '!': 'exclamation',
-    '>': 'ge',
-    '`': 'grave',
-    '-': 'hyphen',
-    '<': 'le',
-    '#': 'no',
-    '%': 'per',
-    '.': 'period',
-    '+': 'plus',
-    '?': 'question',
-    '\"': 'quotation',
-    ';': 'semicolon',
-    '/': 'slash',
-    '[': 'sq-bracket-l',
-    ']': 'sq-bracket-r',
-    '~': 'tilde',
-    '_': 'underscore',
-    '|': 'vertical',
-    ' ': 'space'
-}
-
-
-def offset_from_align(align, width: float, height: float, fullwidth: float):
-    offset = [0, 0]
-    if align == 'top-left':
-        offset = [0, -height*0.5]
-    elif align == 'top-center':
-        offset = [-0.5*fullwidth, -height*0.5]
-    elif align == 'top-right':
-        offset = [-fullwidth, -height*0.5]
-    elif align == 'center-left':
-        offset = [0, 0]
-    elif align == 'center':
-        offset = [-0.5*fullwidth, 0]
-    elif align == 'center-right':
-        offset = [-fullwidth, 0]
-    elif align == 'bottom-left':
-        offset = [-0, height*0.5]
-    elif align == 'bottom-center':
-        offset = [-0.5*fullwidth, height*0.5]
-    elif align == 'bottom-right':
-        offset = [-fullwidth, height*0.5]
-    offset[0] += 0.5*width
-    return offset
-
 
 def hflip_align(align: str):
     l = align.split('-')
@@ -128,65 +88,59 @@ def mm_to_point(mm):
     return (mm/25.4) * dpi
 
 
-def search_layer(layers: ET.ElementTree, no: int):
-    for l in layers:
-        attr = l.attrib
-        if no == int(attr['number']):
-            return l
-
-    return None
+class Layer(NamedTuple):
+    number: int
+    name: str
+    color: int  # eagle color id, 0 when the color is undefined
+    visible: bool
+    zorder: int
+    hex: str
 
 
-def rotate(x, y, angle: float) -> Tuple:
-    u = np.cos(angle)*x-np.sin(angle)*y
-    v = np.sin(angle)*x+np.cos(angle)*y
-    return u, v
+def make_layer(number: int, name: str = '', color: int = 0,
+               visible: bool = True) -> Layer:
+    if not color in eagle_colors:
+        logger.warning(f'color id {color} is undefined (layer {number})')
+        color = 0
+    return Layer(number, name, color, visible, -number, eagle_colors[color])
 
 
-def draw_vector_letter(filename: str, offset=[0, 0], ax: plt.Axes = None,
-                       w: float = 0.1, size: float = 1.0, angle: float = 0.0,
-                       color_id: int = 0, layer_no: int = 0) -> None:
-    """Draw A Letter in Vector style from svg file
+class LayerTable(dict):
+    """Layers of a drawing indexed by layer number
 
-    Args:
-        filename (str): [description]
-        offset (list, optional): [description]. Defaults to [0, 0].
-        ax (plt.Axes, optional): [description]. Defaults to None.
-        w (float, optional): linewidth. Defaults to 0.1.
-        size (float, optional): [description]. Defaults to 1.0.
-        angle (float, optional): [description]. Defaults to 0.0.
-        color_id (int, optional): [description]. Defaults to 0.
-        layer_no (int, optional): [description]. Defaults to 0.
+    Layers missing from the drawing resolve to the default color once.
     """
-    if ax is None:
-        ax = plt.gca()
-    tree = ET.parse(filename)
-    root = tree.getroot()
 
-    pathes = []
-    pathes = seek_tree(root, [], pathes)
-    if len(pathes) == 0:
-        return 0
-    # x_all = []
-    for p in pathes:
-        s = size/12.7
-        # centering, flap-y, scaling
-        x = np.array([s*(xx[0]-10.0) for xx in p])
-        y = np.array([s*(10.0-yy[1]) for yy in p])
+    def __missing__(self, no: int) -> Layer:
+        logger.warning(f'layer {no} is undefined')
+        layer = make_layer(no)
+        self[no] = layer
+        return layer
 
-        u, v = rotate(x, y, angle)
 
-        # a, b = rotate(offset[0], offset[1], angle)
-        l = LineDataUnits(u+offset[0], v+offset[1], linewidth=w,
-                          color=eagle_colors[color_id], zorder=-layer_no, solid_capstyle='round')
+def build_layer_table(layers: ET.ElementTree) -> LayerTable:
+    """Index the <layers> element by layer number
 
-        ax.add_line(l)
-        # x_all.extend(x)
-    # width = 2*max(x_all)
-    # return width
+    Args:
+        layers (ET.ElementTree): <layers> element
+
+    Returns:
+        LayerTable: layer number -> Layer
+    """
+    table = LayerTable()
+    if layers is None:
+        return table
+    for l in layers:
+        attr = l.attrib
+        no = int(attr['number'])
+        table[no] = make_layer(no, attr.get('name', ''),
+                               int(attr.get('color', 0)),
+                               attr.get('visible', 'yes') == 'yes')
+    return table
 
 
-def draw_pad(pad: ET.ElementTree, layers: ET.ElementTree, ax: plt.Axes):
+@profiled
+def draw_pad(pad: ET.ElementTree, layers: 'LayerTable', canvas: Canvas):
     attr = pad.attrib
     x = float(attr['x'])
     y = float(attr['y'])
@@ -206,22 +160,13 @@ def draw_pad(pad: ET.ElementTree, layers: ET.ElementTree, ax: plt.Axes):
     w = 0.5*(diameter-drill)
     r = 0.5*drill + 0.5*w
     # print(f'width: {w}, pt: {mm_to_point(w)}')
-    layer_no = 17  # Pad layer no. may be fixed
-    layer = search_layer(layers, layer_no)
-    color_id = int(layer.attrib['color'])
-    if not color_id in eagle_colors:
-        logger.warning(f'color id {color_id} is undefined')
-        color_id = 0
-    c = patches.Circle(xy=(x, y), radius=0.5*diameter,
-                       ec=None, fc=eagle_colors[color_id], zorder=-layer_no)
-    ax.add_patch(c)
-
-    d = patches.Circle(xy=(x, y), radius=0.5*drill, ec=None,
-                       fc='#a0a0a0', zorder=-layer_no)
-    ax.add_patch(d)
-
-
-def draw_smd(smd: ET.ElementTree, layers: ET.ElementTree, ax: plt.Axes):
+    layer_no = PAD_LAYER
+    layer = layers[layer_no]
+    canvas.pad((x, y), diameter, drill, layer.hex, layer.zorder)
+
+
+@profiled
+def draw_smd(smd: ET.ElementTree, layers: 'LayerTable', canvas: Canvas):
     attr = smd.attrib
     # center location of smd land
     x0 = float(attr['x'])
@@ -246,85 +191,58 @@ def draw_smd(smd: ET.ElementTree, layers: ET.ElementTree, ax: plt.Axes):
     y = y0-0.5*h
 
     layer_no = int(attr['layer'])
-    layer = search_layer(layers, layer_no)
-    color_id = int(layer.attrib['color'])
-
-    if not color_id in eagle_colors:
-        logger.warning(f'color id {color_id} is undefined')
-        color_id = 0
+    layer = layers[layer_no]
 
     # rect = patches.FancyBboxPatch(
-    #     xy=(x, y), width=w, height=h, fc=eagle_colors[color_id], ec=None, lw=None, zorder=-layer_no,
+    #     xy=(x, y), width=w, height=h, fc=layer.hex, ec=None, lw=None, zorder=layer.zorder,
     #     mutation_scale=0)
 
-    rect = RectDataUnit(
-        xy=(x, y), width=w, height=h, fc=eagle_colors[color_id], ec=None, lw=None, zorder=-layer_no
-    )
-    ax.add_patch(rect)
+    canvas.fill_rect((x, y), w, h, layer.hex, layer.zorder)
 
 
-def draw_wire(wire: ET.ElementTree, layers: ET.ElementTree, ax: plt.Axes):
-    attr = wire.attrib
-    x = [float(attr['x1']), float(attr['x2'])]
-    y = [float(attr['y1']), float(attr['y2'])]
-    w = float(attr['width'])
-    curve = None
-    if 'curve' in attr:
-        curve = math.radians(float(attr['curve']))
+@profiled
+def draw_wires(wires: List[ET.ElementTree], layers: 'LayerTable', canvas: Canvas):
+    """Draw wires, solving the circles of all curved ones in one call
 
-    layer_no = int(attr['layer'])
-    layer = search_layer(layers, layer_no)
-    color_id = int(layer.attrib['color'])
-    if not color_id in eagle_colors:
-        logger.warning(f'color id {color_id} is undefined')
-        color_id = 0
-
-    if curve is None:
-        # straight line
-        l = LineDataUnits(x, y, linewidth=w,
-                          color=eagle_colors[color_id], zorder=-layer_no, solid_capstyle='round')
-
-        ax.add_line(l)
-    else:
-        # draw arc
-        x0, y0, r, t1, t2, x3, y3 = get_arc_param(
-            x[0], y[0], x[1], y[1], curve)
-
-        arc = ArcDataUnit((x0, y0), r*2, r*2,
-                          theta1=math.degrees(t1),
-                          theta2=math.degrees(t2),
-                          linewidth=w,
-                          color=eagle_colors[color_id],  zorder=-layer_no)
-        ax.add_patch(arc)
-
-        # debug
-        # reference point
-        # c = CircleDataUnit(xy=(x3, y3), radius=0.1, ec=eagle_colors[4],
-        #                    fill=False, linewidth=w, zorder=-layer_no)
-        # ax.add_patch(c)
-
-        # # xy
-        # c = CircleDataUnit(xy=(x[0], y[0]), radius=0.1, ec=eagle_colors[6],
-        #                    fill=False, linewidth=w, zorder=-layer_no)
-        # ax.add_patch(c)
-        # c = CircleDataUnit(xy=(x[1], y[1]), radius=0.1, ec=eagle_colors[7],
-        #                    fill=False, linewidth=w, zorder=-layer_no)
-        # ax.add_patch(c)
-
-        # # mid point
-        # m = [0.5*(x[0]+x[1]), 0.5*(y[0]+y[1])]
-
-        # c = CircleDataUnit(xy=m, radius=0.01, ec=eagle_colors[4],
-        #                    fill=False, linewidth=w, zorder=-layer_no)
-        # ax.add_patch(c)
-
-        # # arc center
-        # c = CircleDataUnit(xy=(x0, y0), radius=0.05, ec=eagle_colors[4],
-        #                    fill=False, linewidth=w, zorder=-layer_no)
-        # ax.add_patch(c)
-
-
-def draw_circle(circle: ET.ElementTree, layers: ET.ElementTree, ax: plt.Axes):
+    Args:
+        wires (List[ET.ElementTree]): <wire> elements
+        layers (LayerTable): layer table of the drawing
+        canvas (Canvas): canvas to draw on
+    """
+    curved = []
+    for wire in wires:
+        attr = wire.attrib
+        x = [float(attr['x1']), float(attr['x2'])]
+        y = [float(attr['y1']), float(attr['y2'])]
+        w = float(attr['width'])
+
+        layer_no = int(attr['layer'])
+        layer = layers[layer_no]
+
+        if 'curve' in attr:
+            curved.append((x[0], y[0], x[1], y[1], float(attr['curve']),
+                           w, layer))
+        else:
+            # straight line
+            canvas.line(x, y, w, layer.hex, layer.zorder, capstyle='round')
+
+    if len(curved) == 0:
+        return
+
+    # draw arcs
+    p = np.array([c[:5] for c in curved]).T
+    cx, cy, r, t1, t2 = arc_params(*p)
+    for i, (*_, w, layer) in enumerate(curved):
+        canvas.arc((cx[i], cy[i]), r[i], t1[i], t2[i],
+                   w, layer.hex, layer.zorder)
+
+
+def draw_wire(wire: ET.ElementTree, layers: 'LayerTable', canvas: Canvas):
+    draw_wires([wire], layers, canvas)
+
+
+@profiled
+def draw_circle(circle: ET.ElementTree, layers: 'LayerTable', canvas: Canvas):
     attr = circle.attrib
     x = float(attr['x'])
     y = float(attr['y'])
@@ -332,59 +250,13 @@ def draw_circle(circle: ET.ElementTree, layers: ET.ElementTree, ax: plt.Axes):
     w = float(attr['width'])
     # inch to point
     layer_no = int(attr['layer'])
-    layer = search_layer(layers, layer_no)
-    color_id = int(layer.attrib['color'])
-    if not color_id in eagle_colors:
-        logger.warning(f'color id {color_id} is undefined')
-        color_id = 0
-
-    c = CircleDataUnit(xy=(x, y), radius=r, ec=eagle_colors[color_id],
-                       fill=False, linewidth=w, zorder=-layer_no)
-    ax.add_patch(c)
+    layer = layers[layer_no]
 
+    canvas.circle((x, y), r, w, layer.hex, layer.zorder)
 
-def draw_letter(s: str, x: float, y: float, **kwargs) -> None:
-    """Draw a letter
 
-    Args:
-        s (str): single letter to draw
-        x (float): letter center x-position
-        y (float): letter center y-position
-    """
-    a = re.findall(r'[a-z]', s)
-    if len(a) > 0:
-        # Lower Alphabet
-        f = os.path.join(os.path.dirname(__file__),
-                         f'letters/{a[0]}_lower.svg')
-        draw_vector_letter(f, (x, y), **kwargs)
-        return
-
-    A = re.findall(r'[A-Z]', s)
-    if len(A) > 0:
-        f = os.path.join(os.path.dirname(__file__),
-                         f'letters/{A[0]}_upper.svg')
-        draw_vector_letter(f, (x, y), **kwargs)
-        return
-
-    n = re.findall(r'[0-9]', s)
-    if len(n) > 0:
-        f = os.path.join(os.path.dirname(__file__), f'letters/{n[0]}.svg')
-        draw_vector_letter(f, (x, y), **kwargs)
-        return
-
-    # symbols
-    if s in symbol_map:
-        f = os.path.join(os.path.dirname(__file__),
-                         f'letters/{symbol_map[s]}.svg')
-        draw_vector_letter(f, (x, y), **kwargs)
-        return
-
-    f = os.path.join(os.path.dirname(__file__), f'letters/tofu.svg')
-    draw_vector_letter(f, (x, y), **kwargs)
-    return
-
-
-def draw_text(text: ET.ElementTree, layers: ET.ElementTree, ax: plt.Axes):
+@profiled
+def draw_text(text: ET.ElementTree, layers: 'LayerTable', canvas: Canvas):
 
     # <text x="-12.7" y="-10.16" size="1.778" layer="95">&gt;VALUE</text>
 
@@ -403,7 +275,7 @@ def draw_text(text: ET.ElementTree, layers: ET.ElementTree, ax: plt.Axes):
     if 'ratio' in attr:
         ratio = float(attr['ratio'])/100.0
     linewidth = ratio*size/5.0
-    txt = text.text
+    txt = text.text or ''
 
     rot = 'R0'
     if 'rot' in attr:
@@ -415,34 +287,21 @@ def draw_text(text: ET.ElementTree, layers: ET.ElementTree, ax: plt.Axes):
         angle -= 180
 
     layer_no = int(attr['layer'])
-    layer = search_layer(layers, layer_no)
-    color_id = int(layer.attrib['color'])
-    if not color_id in eagle_colors:
-        logger.warning(f'color id {color_id} is undefined')
-        color_id = 0
-
-    clearance = size*0.1
-    w = 0.5*size
-    full_width = w*len(txt) + clearance*(len(txt)-1)
-    offset = offset_from_align(align, w, size, full_width)
-    offset = rotate(offset[0], offset[1], math.radians(angle))
-    dx = w+clearance
-    dy = 0
-    dx, dy = rotate(dx, dy, math.radians(angle))
-    # logger.debug(f'align: {align}, offset: {offset}')
+    layer = layers[layer_no]
+
     # draw text origin
-    c = CircleDataUnit(xy=(x, y), radius=0.01, ec=eagle_colors[color_id],
-                       fill=False, linewidth=0.1, zorder=-layer_no)
-    ax.add_patch(c)
+    canvas.circle((x, y), 0.01, 0.1, layer.hex, layer.zorder)
 
-    for s in txt:
-        draw_letter(s, x+offset[0], y+offset[1],
-                    ax=ax, size=size, angle=math.radians(angle), w=linewidth, color_id=color_id, layer_no=layer_no)
-        x += dx
-        y += dy
+    segments, _ = glyph_table().layout(txt, size, linewidth, align,
+                                       math.radians(angle))
+    count_glyph(len(txt))
+    segments[:, [0, 2]] += x
+    segments[:, [1, 3]] += y
+    canvas.strokes(segments, linewidth, layer.hex, layer.zorder)
 
 
-def draw_pin(pin: ET.ElementTree, layers: ET.ElementTree, ax: plt.Axes):
+@profiled
+def draw_pin(pin: ET.ElementTree, layers: 'LayerTable', canvas: Canvas):
     attr = pin.attrib
     x0 = float(attr['x'])
     y0 = float(attr['y'])
@@ -481,81 +340,662 @@ def draw_pin(pin: ET.ElementTree, layers: ET.ElementTree, ax: plt.Axes):
         x = [x0, x0]
         y = [y0, y0-dx]
 
-    layer_no = 94  # pin layer may be fixed
-    layer = search_layer(layers, layer_no)
-    color_id = int(layer.attrib['color'])
-    if not color_id in eagle_colors:
-        logger.warning(f'color id {color_id} is undefined')
-        color_id = 0
+    layer_no = PIN_LAYER
+    layer = layers[layer_no]
     w = 0.1
-    l = LineDataUnits(x, y, linewidth=w,
-                      color=eagle_colors[color_id], zorder=-layer_no)
-
-    ax.add_line(l)
+    canvas.line(x, y, w, layer.hex, layer.zorder)
 
     # Name
     text_height = 2.0
-    text_width = 0.5*text_height
-    text_x += text_width  # default origin is left
-    clearance = text_height*0.1
-    full_width = text_width*len(name) + clearance*(len(name)-1)
-    offset = offset_from_align(halign, w, text_height, full_width)
     linewidth = 0.2*text_height/5.0
-    for s in name:
-        draw_letter(s, text_x+offset[0], text_y + offset[1],
-                    ax=ax, size=text_height, w=linewidth, color_id=0, layer_no=layer_no)
-        text_x += text_width + clearance
+    segments, _ = glyph_table().layout(name, text_height, linewidth, halign)
+    count_glyph(len(name))
+    segments[:, [0, 2]] += text_x
+    segments[:, [1, 3]] += text_y
+    canvas.strokes(segments, linewidth, eagle_colors[0], layer.zorder)
     # ax.text(text_x, text_y, name, verticalalignment='center',
-    #         horizontalalignment=halign, color=eagle_colors[color_id], zorder=-layer_no)
+    #         horizontalalignment=halign, color=layer.hex, zorder=layer.zorder)
 
 
-def draw_package(package: ET.ElementTree, layers: ET.ElementTree, ax: plt.Axes):
+@profiled
+def draw_package(package: ET.ElementTree, layers: 'LayerTable', canvas: Canvas):
+    """Draw a package
 
+    Args:
+        package (ET.ElementTree): <package> element
+        layers (LayerTable): layer table of the drawing
+        canvas (Canvas): canvas to draw on
+    """
     name = package.attrib['name']
 
     for pad in package.findall('pad'):
-        draw_pad(pad, layers, ax)
+        draw_pad(pad, layers, canvas)
 
     for smd in package.findall('smd'):
-        draw_smd(smd, layers, ax)
+        draw_smd(smd, layers, canvas)
 
     for circle in package.findall('circle'):
-        draw_circle(circle, layers, ax)
+        draw_circle(circle, layers, canvas)
 
-    for wire in package.findall('wire'):
-        draw_wire(wire, layers, ax)
+    draw_wires(package.findall('wire'), layers, canvas)
 
     for text in package.findall('text'):
-        draw_text(text, layers, ax)
+        draw_text(text, layers, canvas)
 
-    # ax.plot([0, 1], [0, 1])
-    plt.axis('scaled')
-    ax.set_aspect('equal')
 
+@profiled
+def draw_symbol(symbol: ET.ElementTree, layers: 'LayerTable', canvas: Canvas):
+    """Draw a symbol
 
-def draw_symbol(symbol: ET.ElementTree, layers: ET.ElementTree, ax: plt.Axes):
-
+    Args:
+        symbol (ET.ElementTree): <symbol> element
+        layers (LayerTable): layer table of the drawing
+        canvas (Canvas): canvas to draw on
+    """
     name = symbol.attrib['name']
 
     for pin in symbol.findall('pin'):
-        draw_pin(pin, layers, ax)
+        draw_pin(pin, layers, canvas)
 
     for circle in symbol.findall('circle'):
-        draw_circle(circle, layers, ax)
+        draw_circle(circle, layers, canvas)
 
-    for wire in symbol.findall('wire'):
-        draw_wire(wire, layers, ax)
+    draw_wires(symbol.findall('wire'), layers, canvas)
 
     for text in symbol.findall('text'):
-        draw_text(text, layers, ax)
+        draw_text(text, layers, canvas)
+
+
+class RenderOptions(NamedTuple):
+    batch: bool = False  # one collection per layer (matplotlib)
+    backend: str = 'matplotlib'
+    compact: int = None  # decimals of compacted svg output, None keeps it
+
+
+# module -> seconds spent importing it in this process
+import_times: Dict[str, float] = {}
+
+
+def import_backend(module: str):
+    """Import a backend module on first use and record how long it took
+
+    Args:
+        module (str): module name, e.g. `mpl_canvas`
+
+    Returns:
+        module: the imported module
+    """
+    m = sys.modules.get(module)
+    if m is None:
+        t = time.perf_counter()
+        m = importlib.import_module(module)
+        import_times[module] = time.perf_counter() - t
+    return m
+
+
+def new_canvas(options: RenderOptions = RenderOptions(),
+               bounds: Tuple[float, float, float, float] = None,
+               scale: float = None) -> Canvas:
+    """Canvas of the selected backend
+
+    The backends are imported on demand, so that `svg-native` never loads
+    matplotlib.
+
+    Args:
+        options (RenderOptions, optional): backend and its settings
+        bounds (Tuple[float, float, float, float], optional): xmin, ymin,
+            xmax, ymax of a fixed region, drawn on a page of its size
+            without axes and title, e.g. an overview sheet. Defaults to
+            None, i.e. a page with axes fitted to the drawing.
+        scale (float, optional): pt per data unit of the fixed region.
+            Defaults to None.
+    """
+    if options.backend == 'svg-native':
+        return import_backend('svg_writer').SvgCanvas(bounds, scale)
+    if bounds is not None:
+        return import_backend('mpl_canvas').SheetCanvas(bounds, scale)
+    return import_backend('mpl_canvas').figure_canvas(batch=options.batch)
+
+
+def build_geometry(kind: str, item: ET.ElementTree, layers: LayerTable) -> Geometry:
+    """Convert a package or a symbol to its geometry in one pass
+
+    Args:
+        kind (str): `packages` or `symbols`
+        item (ET.ElementTree): <package> or <symbol> element
+        layers (LayerTable): layer table of the drawing
+
+    Returns:
+        Geometry: arrays of primitives, independent of any backend
+    """
+    builder = GeometryBuilder()
+    if kind == 'packages':
+        draw_package(item, layers, builder)
+    else:
+        draw_symbol(item, layers, builder)
+    return builder.geometry()
 
-    # ax.plot([0, 1], [0, 1])
-    plt.axis('scaled')
-    ax.set_aspect('equal')
 
+class GeometryCache(object):
+    """Geometry of the packages and symbols of a run, each built once
 
-def parse_tree(filename, outputdir='imgs'):
-    tree = ET.parse(filename)
+    Device sheets compose the cached geometries by reference. Items that
+    were not rendered in this run (e.g. unchanged ones) can be registered
+    as `sources` and are built on their first lookup.
+    """
+
+    def __init__(self, layers: LayerTable):
+        self.layers = layers
+        self.geometries: Dict[Tuple[str, str], Geometry] = {}
+        # (kind, name) -> element or its serialized xml
+        self.sources: Dict[Tuple[str, str], object] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, kind: str, name: str, geometry: Geometry):
+        self.geometries[(kind, name)] = geometry
+
+    def get(self, kind: str, item: ET.ElementTree) -> Geometry:
+        """Geometry of an item, built on the first call"""
+        key = (kind, item.attrib['name'])
+        geometry = self.geometries.get(key)
+        if geometry is not None:
+            self.hits += 1
+            return geometry
+        self.misses += 1
+        with stage('geometry'):
+            geometry = build_geometry(kind, item, self.layers)
+        self.geometries[key] = geometry
+        return geometry
+
+    def lookup(self, kind: str, name: str) -> Geometry:
+        """Geometry of an item by name, or None if it is unknown"""
+        geometry = self.geometries.get((kind, name))
+        if geometry is not None:
+            self.hits += 1
+            return geometry
+        source = self.sources.pop((kind, name), None)
+        if source is None:
+            return None
+        if isinstance(source, bytes):
+            source = ET.fromstring(source)
+        return self.get(kind, source)
+
+
+def render_item(kind: str, item: ET.ElementTree, layers: LayerTable,
+                figpath: str, options: RenderOptions = RenderOptions(),
+                cache: GeometryCache = None, sink=None) -> str:
+    """Draw a package or a symbol and save it
+
+    Args:
+        kind (str): `packages` or `symbols`
+        item (ET.ElementTree): <package> or <symbol> element
+        layers (LayerTable): layer table of the drawing
+        figpath (str): output path
+        options (RenderOptions, optional): backend and its settings
+        cache (GeometryCache, optional): where to keep the geometry.
+            Defaults to None.
+        sink (optional): where the drawing goes instead of `figpath`.
+            Defaults to None.
+
+    Returns:
+        str: output path
+    """
+    t = time.perf_counter()
+    if cache is not None:
+        geometry = cache.get(kind, item)
+    else:
+        with stage('geometry'):
+            geometry = build_geometry(kind, item, layers)
+    return save_geometry(geometry, figpath, kind, item.attrib['name'],
+                         options, t, sink)
+
+
+def save_compact(canvas: Canvas, figpath: str, kind: str, name: str,
+                 decimals: int, sink=None) -> Tuple[int, int]:
+    """Save a canvas as compacted svg, see `compact_svg.Compactor`
+
+    Args:
+        canvas (Canvas): drawing
+        figpath (str): output path
+        kind (str): kind of the drawing, e.g. `packages`
+        name (str): title of the drawing
+        decimals (int): decimals of the page coordinates
+        sink (optional): where the drawing goes instead of `figpath`.
+            Defaults to None.
+
+    Returns:
+        Tuple[int, int]: size of the output and bytes saved
+    """
+    from compact_svg import compact_svg
+
+    memory = MemorySink()
+    raw = memory.save(canvas, figpath, kind, name)
+    with stage('compact'):
+        data = compact_svg(memory.data, decimals)
+    logger.debug(f'compact {figpath}: {raw} -> {len(data)} bytes')
+    if sink is not None:
+        return sink.write(figpath, data, kind, name), raw - len(data)
+    # never write through a hardlink into the render store
+    if os.path.lexists(figpath):
+        os.remove(figpath)
+    with open(figpath, 'wb') as f:
+        f.write(data)
+    return len(data), raw - len(data)
+
+
+def save_geometry(geometry: Geometry, figpath: str, kind: str, name: str,
+                  options: RenderOptions = RenderOptions(),
+                  t_start: float = None, sink=None,
+                  canvas: Canvas = None) -> str:
+    """Draw a geometry on a new canvas and save it
+
+    Args:
+        geometry (Geometry): primitives to draw, or anything else with
+            `draw` and `layer_counts` such as a device `Sheet`
+        figpath (str): output path
+        kind (str): kind of the drawing for the profile, e.g. `packages`
+        name (str): title of the drawing
+        options (RenderOptions, optional): backend and its settings
+        t_start (float, optional): `time.perf_counter()` when the item was
+            started, for the profile. Defaults to now.
+        sink (optional): where the drawing goes instead of `figpath`, see
+            `sinks.open_sink`. Defaults to None.
+        canvas (Canvas, optional): empty canvas to draw on, e.g. to read
+            its `page` once saved. Defaults to None, i.e. a new canvas of
+            the backend of `options`.
+
+    Returns:
+        str: output path
+    """
+    if t_start is None:
+        t_start = time.perf_counter()
+    with stage('draw'):
+        if canvas is None:
+            canvas = new_canvas(options)
+        geometry.draw(canvas)
+    saved = 0
+    with stage('save'):
+        if options.compact is not None:
+            nbytes, saved = save_compact(canvas, figpath, kind, name,
+                                         options.compact, sink)
+        elif sink is not None:
+            nbytes = sink.save(canvas, figpath, kind, name)
+        else:
+            # never write through a hardlink into the render store
+            if os.path.lexists(figpath):
+                os.remove(figpath)
+            canvas.save(figpath, title=name)
+            nbytes = os.path.getsize(figpath)
+    p = active_profiler()
+    if p is not None:
+        p.add_item(kind, name, time.perf_counter() - t_start, figpath,
+                   nbytes, geometry.layer_counts(), saved)
+    return figpath
+
+
+def referenced_layers(item: ET.ElementTree) -> List[int]:
+    """Numbers of the layers an item draws on"""
+    numbers = set()
+    for e in item.iter():
+        if 'layer' in e.attrib:
+            numbers.add(int(e.attrib['layer']))
+        elif e.tag == 'pad':
+            numbers.add(PAD_LAYER)
+        elif e.tag == 'pin':
+            numbers.add(PIN_LAYER)
+    return sorted(numbers)
+
+
+def item_digest(item: ET.ElementTree, layers: LayerTable, options: str = '') -> str:
+    """Digest of everything an item's output depends on
+
+    Args:
+        item (ET.ElementTree): <package> or <symbol> element
+        layers (LayerTable): layer table of the drawing
+        options (str, optional): render options that change the output
+
+    Returns:
+        str: hex digest of the canonical xml, the referenced layers and
+            the renderer version
+    """
+    xml = ET.canonicalize(ET.tostring(item, encoding='unicode'),
+                          strip_text=True)
+    used = [tuple(layers[no]) for no in referenced_layers(item)]
+    return digest(RENDERER_VERSION, options, repr(used), xml)
+
+
+# per-process state of the rendering workers
+_worker_layers: LayerTable = None
+# layer xml -> table, for workers that serve several libraries
+_worker_tables: Dict[bytes, LayerTable] = {}
+
+
+def _init_worker(layers_xml: bytes):
+    global _worker_layers
+    layers = ET.fromstring(layers_xml) if layers_xml else None
+    _worker_layers = build_layer_table(layers)
+    glyph_table()
+
+
+class RenderResult(NamedTuple):
+    figpath: str
+    kind: str
+    name: str
+    geometry: Geometry  # sent back for the device sheets
+    profile: dict = None  # profiler state of the worker
+    data: bytes = None  # the drawing, when it goes to a sink
+
+
+def _worker_table(layers_xml: bytes) -> LayerTable:
+    """Layer table of a library of a batch, built once per worker"""
+    table = _worker_tables.get(layers_xml)
+    if table is None:
+        layers = ET.fromstring(layers_xml) if layers_xml else None
+        table = _worker_tables[layers_xml] = build_layer_table(layers)
+    return table
+
+
+def _render_task(kind: str, item_xml: bytes, figpath: str,
+                 options: RenderOptions, profile: bool = False,
+                 layers_xml: bytes = None,
+                 output: str = 'file') -> RenderResult:
+    """Render an item in a worker
+
+    `output` is `file` to write `figpath`, `bytes` to send the drawing
+    back and `geometry` to only build the geometry, see `task_output`.
+    """
+    item = ET.fromstring(item_xml)
+    layers = _worker_layers if layers_xml is None else \
+        _worker_table(layers_xml)
+    cache = GeometryCache(layers)
+    sink = MemorySink() if output == 'bytes' else None
+
+    def work():
+        if output == 'geometry':
+            cache.get(kind, item)
+        else:
+            render_item(kind, item, layers, figpath, options, cache, sink)
+
+    if not profile:
+        work()
+        state = None
+    else:
+        with profiling() as p:
+            work()
+        state = p.state()
+    name = item.attrib['name']
+    return RenderResult(figpath, kind, name, cache.lookup(kind, name), state,
+                        sink.data if sink is not None else None)
+
+
+def task_output(sink) -> str:
+    """What a worker returns for a sink, see `_render_task`"""
+    if sink is None:
+        return 'file'
+    return 'bytes' if sink.in_worker else 'geometry'
+
+
+def _collect(future, cache: GeometryCache = None, sink=None,
+             options: RenderOptions = RenderOptions()) -> str:
+    """Result of a render task, merging the worker's profile and geometry
+
+    A drawing for a sink is written to it here, or drawn here from the
+    geometry if the sink cannot take drawings from the workers.
+    """
+    result = future.result()
+    p = active_profiler()
+    if p is not None and result.profile is not None:
+        p.merge(result.profile)
+    if cache is not None:
+        cache.add(result.kind, result.name, result.geometry)
+    if sink is not None:
+        if result.data is not None:
+            sink.write(result.figpath, result.data, result.kind, result.name)
+        else:
+            save_geometry(result.geometry, result.figpath, result.kind,
+                          result.name, options, sink=sink)
+    return result.figpath
+
+
+def deviceset_digest(deviceset: ET.ElementTree, layers: LayerTable,
+                     options: str, digests: Dict[Tuple[str, str], str]) -> str:
+    """Digest of a deviceset and the items its sheet shows
+
+    Args:
+        deviceset (ET.ElementTree): <deviceset> element
+        layers (LayerTable): layer table of the drawing
+        options (str): render options
+        digests (Dict[Tuple[str, str], str]): digests of the packages and
+            symbols by (kind, name)
+
+    Returns:
+        str: hex digest
+    """
+    from deviceset import referenced_items
+
+    return digest(item_digest(deviceset, layers, options),
+                  *[digests.get(key, '') for key in referenced_items(deviceset)])
+
+
+def overview_digest(kind: str, names: List[str], options: str,
+                    digests: Dict[Tuple[str, str], str]) -> str:
+    """Digest of the overview sheet of the packages or symbols of a library
+
+    Args:
+        kind (str): `packages` or `symbols`
+        names (List[str]): items in grid order
+        options (str): render options
+        digests (Dict[Tuple[str, str], str]): digests of the items by
+            (kind, name)
+
+    Returns:
+        str: hex digest
+    """
+    return digest(RENDERER_VERSION, options,
+                  *[f'{name}:{digests.get((kind, name), "")}'
+                    for name in names])
+
+
+class LibraryRun(object):
+    """Rendering of the items of one library
+
+    `plan` checks every package and symbol against the manifest and the
+    render store and returns the ones to render. Once they are rendered,
+    `finish` records their outputs and draws the device sheets and the
+    overview sheets.
+
+    Args:
+        library (ET.ElementTree): <library> element
+        layers (LayerTable): layer table of the drawing
+        dirpath (str): output directory of the library
+        options (RenderOptions, optional): backend and its settings
+        incremental (bool, optional): skip items that are unchanged since
+            the last run. Defaults to False.
+        store (RenderStore, optional): render store shared with other
+            libraries. Defaults to None.
+        sink (optional): where the drawings go instead of files in
+            `dirpath`, see `sinks.open_sink`. Every item is rendered into
+            an archive or a pdf, the manifest and the store are not used
+            with them. Defaults to None.
+        overview (bool, optional): draw a grid of all packages and one of
+            all symbols, see `overview.render_overview`. Defaults to True.
+    """
+
+    def __init__(self, library: ET.ElementTree, layers: LayerTable,
+                 dirpath: str, options: RenderOptions = RenderOptions(),
+                 incremental: bool = False, store: RenderStore = None,
+                 sink=None, overview: bool = True):
+        self.library = library
+        self.layers = layers
+        self.dirpath = dirpath
+        self.options = options
+        self.sink = sink
+        # the items go to one file instead of the directory
+        self.archived = sink is not None and not sink.writes_files
+        self.manifest = Manifest(dirpath) if incremental and \
+            not self.archived else None
+        self.store = store if not self.archived else None
+        self.cache = GeometryCache(layers)
+        self.digests: Dict[Tuple[str, str], str] = {}
+        # kind, item, output path
+        self.tasks: List[Tuple[str, ET.ElementTree, str]] = []
+        # deviceset, output path
+        self.sheets: List[Tuple[ET.ElementTree, str]] = []
+        self.overview = overview
+        # kind, item names, output path
+        self.overviews: List[Tuple[str, List[str], str]] = []
+
+    def plan(self) -> List[Tuple[str, ET.ElementTree, str]]:
+        """Items to render
+
+        Returns:
+            List[Tuple[str, ET.ElementTree, str]]: kind, item and output
+                path of every item to render
+        """
+        manifest, store = self.manifest, self.store
+        n_unchanged = 0
+        n_linked = store.n_linked if store is not None else 0
+        for kind in ('packages', 'symbols'):
+            if not self.archived:
+                os.makedirs(os.path.join(self.dirpath, kind), exist_ok=True)
+            for item in self.library.iterfind(f'{kind}/{kind[:-1]}'):
+                name = item.attrib['name']
+                figpath = os.path.join(self.dirpath, f'{kind}/{name}.svg')
+                # device sheets build the items they show on demand
+                self.cache.sources[(kind, name)] = item
+                if manifest is not None or store is not None:
+                    self.digests[(kind, name)] = item_digest(
+                        item, self.layers, repr(self.options))
+                key = self.digests.get((kind, name))
+                if manifest is not None and manifest.unchanged(
+                        f'{kind}/{name}.svg', key):
+                    n_unchanged += 1
+                    if store is not None:
+                        store.add(key, figpath, kind, name)
+                    continue
+                if store is not None and store.link(key, figpath, kind, name):
+                    continue
+                self.tasks.append((kind, item, figpath))
+
+        devicesets = self.library.findall('devicesets/deviceset')
+        if len(devicesets) > 0 and not self.archived:
+            os.makedirs(os.path.join(self.dirpath, 'devicesets'),
+                        exist_ok=True)
+        for deviceset in devicesets:
+            name = deviceset.attrib['name']
+            if manifest is not None and manifest.unchanged(
+                    f'devicesets/{name}.svg',
+                    deviceset_digest(deviceset, self.layers,
+                                     repr(self.options), self.digests)):
+                continue
+            self.sheets.append(
+                (deviceset,
+                 os.path.join(self.dirpath, f'devicesets/{name}.svg')))
+
+        for kind in ('packages', 'symbols') if self.overview else ():
+            names = [item.attrib['name'] for item in
+                     self.library.iterfind(f'{kind}/{kind[:-1]}')]
+            if len(names) == 0:
+                continue
+            if manifest is not None:
+                key = overview_digest(kind, names, repr(self.options),
+                                      self.digests)
+                # the sheet and its cell map are recorded both
+                if all([manifest.unchanged(f'overview/{kind}{ext}', key)
+                        for ext in ('.svg', '.json')]):
+                    continue
+            if not self.archived:
+                os.makedirs(os.path.join(self.dirpath, 'overview'),
+                            exist_ok=True)
+            self.overviews.append(
+                (kind, names,
+                 os.path.join(self.dirpath, f'overview/{kind}.svg')))
+
+        if manifest is not None:
+            logger.info(f'skip {n_unchanged} unchanged items')
+            for path in manifest.prune():
+                logger.debug(f'remove {path}')
+        if store is not None:
+            logger.info(f'link {store.n_linked - n_linked} items '
+                        f'from {store.root}')
+        return self.tasks
+
+    def finish(self):
+        """Draw the device and overview sheets, close the sink and record
+        the rendered items"""
+        if len(self.sheets) > 0:
+            from deviceset import render_deviceset
+            for deviceset, figpath in self.sheets:
+                render_deviceset(deviceset, self.cache, figpath, self.options,
+                                 self.sink)
+                logger.debug(f'save {figpath}')
+
+        if len(self.overviews) > 0:
+            from overview import render_overview
+            for kind, names, figpath in self.overviews:
+                render_overview(kind, names, self.cache, figpath,
+                                self.options, self.sink)
+        if len(self.sheets) > 0 or len(self.overviews) > 0:
+            logger.debug(f'geometry cache: {self.cache.hits} hits, '
+                         f'{self.cache.misses} builds')
+
+        # queued files are written once the sink is closed
+        if self.sink is not None:
+            self.sink.close()
+        if self.store is not None:
+            for kind, item, figpath in self.tasks:
+                name = item.attrib['name']
+                self.store.add(self.digests[(kind, name)], figpath, kind, name)
+        if self.manifest is not None:
+            self.manifest.save()
+
+
+def parse_tree(filename, outputdir='imgs', batch: bool = False, jobs: int = 1,
+               incremental: bool = False, backend: str = 'matplotlib',
+               tiles: int = 0, dedupe: bool = False, sink: str = 'dir',
+               compact: int = None, overview: bool = True,
+               write_queue: int = 0, write_queue_mb: float = 64.0):
+    """Draw every package and symbol of a library, or the layers of a board
+
+    Each deviceset gets a sheet of its gates and packages, composed from
+    the geometries built for the package and symbol images.
+
+    Args:
+        filename (str): path of the .lbr or .brd file
+        outputdir (str, optional): output directory. Defaults to 'imgs'.
+        batch (bool, optional): draw one collection per layer. Defaults to False.
+        jobs (int, optional): number of worker processes, 0 uses every
+            core. Defaults to 1.
+        incremental (bool, optional): skip items that are unchanged since
+            the last run, according to the manifest in the output
+            directory. Defaults to False.
+        backend (str, optional): `matplotlib` or `svg-native`.
+            Defaults to 'matplotlib'.
+        tiles (int, optional): zoom levels of a png tile pyramid of a
+            board, 0 writes none. Defaults to 0.
+        dedupe (bool, optional): render identical items of all libraries
+            in the output directory once, see `RenderStore`.
+            Defaults to False.
+        sink (str, optional): `dir` writes a file per item, `zip`, `tar`
+            or `pdf` writes the drawings of a library to one file next to
+            its directory, see `sinks.open_sink`. Defaults to 'dir'.
+        compact (int, optional): write compacted svg with coordinates
+            rounded to this many decimals of a pt, see
+            `compact_svg.Compactor`. Defaults to None, i.e. the svg of the
+            backend as it is.
+        overview (bool, optional): also draw a grid of all packages and
+            one of all symbols of a library into `overview/`, each with a
+            json map of its cells. Defaults to True.
+        write_queue (int, optional): write the files of a serial run from
+            a background thread while the next items are drawn, with at
+            most this many files waiting, see `sinks.WriteQueue`. 0 writes
+            them in turn. Defaults to 0.
+        write_queue_mb (float, optional): MB waiting in the write queue at
+            most. Defaults to 64.0.
+    """
+    with stage('xml_parse'):
+        tree = ET.parse(filename)
     root = tree.getroot()
     logger.info(f'parse {filename}')
     logger.debug(f'root tag: {root.tag}')
@@ -568,7 +1008,14 @@ def parse_tree(filename, outputdir='imgs'):
 
     drawing = root.find('drawing')
 
-    layers = drawing.find('layers')
+    layers_elem = drawing.find('layers')
+    layers = build_layer_table(layers_elem)
+    board = drawing.find('board')
+    if board is not None:
+        from board import render_board
+        render_board(board, layers, dirpath,
+                     RenderOptions(batch, backend, compact), tiles, jobs)
+        return
     library = drawing.find('library')
     if library is None:
         logger.error('No Library')
@@ -582,26 +1029,276 @@ def parse_tree(filename, outputdir='imgs'):
     logger.info(f'# symbols: {len(symbols)}')
     logger.info(f'# devicesets: {len(devicesets)}')
 
-    os.makedirs(os.path.join(dirpath, f'packages'), exist_ok=True)
-    for package in packages:
-        fig = plt.figure()
-        ax = plt.axes()
-        draw_package(package, layers, ax=ax)
-        name = package.attrib['name']
-        ax.set_title(name)
-        figpath = os.path.join(dirpath, f'packages/{name}.svg')
-        plt.savefig(figpath)
-        plt.close()
-        logger.debug(f'save {figpath}')
-
-    os.makedirs(os.path.join(dirpath, f'symbols'), exist_ok=True)
-    for symbol in symbols:
-        fig = plt.figure()
-        ax = plt.axes()
-        draw_symbol(symbol, layers, ax=ax)
-        name = symbol.attrib['name']
-        ax.set_title(name)
-        figpath = os.path.join(dirpath, f'symbols/{name}.svg')
-        plt.savefig(figpath)
-        plt.close()
-        logger.debug(f'save {figpath}')
+    options = RenderOptions(batch=batch, backend=backend, compact=compact)
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    # workers write their own files, the queue serves a serial run
+    queue = WriteQueue(write_queue, int(write_queue_mb*2**20)) \
+        if write_queue > 0 and jobs <= 1 and sink == 'dir' else None
+    run = LibraryRun(library, layers, dirpath, options, incremental,
+                     RenderStore(outputdir) if dedupe else None,
+                     open_sink(sink, dirpath, queue), overview)
+    tasks = run.plan()
+
+    if jobs <= 1:
+        for kind, item, figpath in tasks:
+            render_item(kind, item, layers, figpath, options, run.cache,
+                        run.sink)
+            logger.debug(f'save {figpath}')
+        logger.debug(f'glyph store: {glyph_store.stats()}')
+    else:
+        layers_xml = ET.tostring(
+            layers_elem) if layers_elem is not None else b''
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(layers_xml,)) as executor:
+            profile = active_profiler() is not None
+            output = task_output(run.sink)
+            futures = [executor.submit(_render_task, kind, ET.tostring(item),
+                                       figpath, options, profile,
+                                       output=output)
+                       for kind, item, figpath in tasks]
+            # collect in submission order to keep the log deterministic
+            for future in futures:
+                logger.debug(
+                    f'save {_collect(future, run.cache, run.sink, options)}')
+
+    run.finish()
+    if run.store is not None:
+        run.store.resolve()
+        run.store.save()
+    if queue is not None:
+        queue.close()
+
+
+def peak_rss() -> float:
+    """Peak resident set size of this process in MB (0 if unknown)"""
+    if resource is None:
+        return 0.0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return rss/1024/1024  # bytes
+    return rss/1024  # kilobytes
+
+
+def stream_tree(filename, outputdir='imgs', batch: bool = False, jobs: int = 1,
+                incremental: bool = False, backend: str = 'matplotlib',
+                tiles: int = 0, dedupe: bool = False, sink: str = 'dir',
+                compact: int = None, overview: bool = True,
+                write_queue: int = 0, write_queue_mb: float = 64.0):
+    """Draw a library while parsing it, with bounded memory
+
+    <layers> is read first, then every <package>/<symbol> is rendered as
+    soon as its element closes and is dropped from the tree afterwards, so
+    that peak memory follows the largest item instead of the whole file.
+    A <deviceset> sheet reuses the geometries built for its library.
+    A <board> is rendered as a whole when its element closes.
+
+    Args:
+        filename (str): path of the .lbr or .brd file
+        outputdir (str, optional): output directory. Defaults to 'imgs'.
+        batch (bool, optional): draw one collection per layer. Defaults to False.
+        jobs (int, optional): number of worker processes, 0 uses every
+            core. Defaults to 1.
+        incremental (bool, optional): skip items that are unchanged since
+            the last run. Defaults to False.
+        backend (str, optional): `matplotlib` or `svg-native`.
+            Defaults to 'matplotlib'.
+        tiles (int, optional): zoom levels of a png tile pyramid of a
+            board, 0 writes none. Defaults to 0.
+        dedupe (bool, optional): render identical items of all libraries
+            in the output directory once. Defaults to False.
+        sink (str, optional): `dir`, `zip`, `tar` or `pdf`, see
+            `parse_tree`. Defaults to 'dir'.
+        compact (int, optional): decimals of compacted svg output, see
+            `parse_tree`. Defaults to None.
+        overview (bool, optional): draw the overview sheets of a library,
+            see `parse_tree`. Defaults to True.
+        write_queue (int, optional): files waiting to be written by a
+            background thread at most, see `parse_tree`. Defaults to 0.
+        write_queue_mb (float, optional): MB waiting in the write queue at
+            most. Defaults to 64.0.
+    """
+    logger.info(f'stream {filename}')
+    basename = os.path.basename(filename).split('.')[0]
+    dirpath = os.path.join(outputdir, basename)
+    os.makedirs(dirpath, exist_ok=True)
+    logger.debug(f'make {os.path.normpath(dirpath)}')
+
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    queue = WriteQueue(write_queue, int(write_queue_mb*2**20)) \
+        if write_queue > 0 and jobs <= 1 and sink == 'dir' else None
+
+    layers = LayerTable()
+    layers_xml = b''
+    has_library = False
+    counts = {'packages': 0, 'symbols': 0, 'devicesets': 0}
+    executor = None
+    pending = deque()
+    # an archive is opened on the first item of a library, boards are
+    # written as files
+    library_sink = open_sink(sink, dirpath, queue) if sink == 'dir' else None
+    manifest = Manifest(dirpath) if incremental and sink == 'dir' else None
+    store = RenderStore(outputdir) if dedupe and sink == 'dir' else None
+    # rendered items to keep in the store once they are written
+    stored = []
+    options = RenderOptions(batch=batch, backend=backend, compact=compact)
+    cache = GeometryCache(layers)
+    digests: Dict[Tuple[str, str], str] = {}
+    n_skipped = 0
+    # items of the overview sheets of the current library
+    overview_names: Dict[str, List[str]] = {'packages': [], 'symbols': []}
+
+    stack = []
+    # a board is rendered as a whole, its library items are kept until then
+    in_board = False
+    for event, elem in ET.iterparse(filename, events=('start', 'end')):
+        if event == 'start':
+            stack.append(elem)
+            if elem.tag == 'board' and len(stack) == 3:
+                in_board = True
+            continue
+        stack.pop()
+        parent = stack[-1] if len(stack) > 0 else None
+        parent_tag = parent.tag if parent is not None else None
+        if in_board and elem.tag != 'board':
+            continue
+
+        if elem.tag == 'layers' and parent_tag == 'drawing':
+            layers = build_layer_table(elem)
+            layers_xml = ET.tostring(elem)
+            cache.layers = layers
+        elif elem.tag == 'library' and parent_tag == 'drawing':
+            has_library = True
+            while len(pending) > 0:
+                done = _collect(pending.popleft(), cache, library_sink,
+                                options)
+                logger.debug(f'save {done}')
+            for kind, names in overview_names.items():
+                if len(names) == 0:
+                    continue
+                relpath = f'overview/{kind}.svg'
+                if manifest is not None:
+                    key = overview_digest(kind, names, repr(options),
+                                          digests)
+                    if all([manifest.unchanged(f'overview/{kind}{ext}', key)
+                            for ext in ('.svg', '.json')]):
+                        continue
+                if sink == 'dir':
+                    os.makedirs(os.path.join(dirpath, 'overview'),
+                                exist_ok=True)
+                from overview import render_overview
+                render_overview(kind, names, cache,
+                                os.path.join(dirpath, relpath), options,
+                                library_sink)
+                names.clear()
+            # the geometries are only shared within a library
+            cache.geometries.clear()
+            cache.sources.clear()
+        elif elem.tag == 'board' and parent_tag == 'drawing':
+            from board import render_board
+            render_board(elem, layers, dirpath, options, tiles, jobs)
+            has_library = True
+            in_board = False
+            parent.remove(elem)
+        elif parent_tag in ('packages', 'symbols') \
+                and elem.tag == parent_tag[:-1]:
+            kind = parent_tag
+            name = elem.attrib['name']
+            if sink == 'dir':
+                os.makedirs(os.path.join(dirpath, kind), exist_ok=True)
+            elif library_sink is None:
+                library_sink = open_sink(sink, dirpath)
+            figpath = os.path.join(dirpath, f'{kind}/{name}.svg')
+            if manifest is not None or store is not None:
+                digests[(kind, name)] = item_digest(elem, layers,
+                                                    repr(options))
+            if manifest is not None and manifest.unchanged(
+                    f'{kind}/{name}.svg', digests[(kind, name)]):
+                n_skipped += 1
+                # the element is dropped, device sheets may still need it
+                cache.sources[(kind, name)] = ET.tostring(elem)
+                if store is not None:
+                    store.add(digests[(kind, name)], figpath, kind, name)
+            elif store is not None and store.link(digests[(kind, name)],
+                                                  figpath, kind, name):
+                cache.sources[(kind, name)] = ET.tostring(elem)
+            elif jobs <= 1:
+                render_item(kind, elem, layers, figpath, options, cache,
+                            library_sink)
+                logger.debug(f'save {figpath}')
+                stored.append((kind, name, figpath))
+            else:
+                if executor is None:
+                    executor = ProcessPoolExecutor(
+                        max_workers=jobs, initializer=_init_worker,
+                        initargs=(layers_xml,))
+                pending.append(executor.submit(
+                    _render_task, kind, ET.tostring(elem), figpath, options,
+                    active_profiler() is not None,
+                    output=task_output(library_sink)))
+                stored.append((kind, name, figpath))
+                # bound the number of items in flight
+                while len(pending) > 2*jobs:
+                    done = _collect(pending.popleft(), cache, library_sink,
+                                    options)
+                    logger.debug(f'save {done}')
+            counts[kind] += 1
+            if overview:
+                overview_names[kind].append(name)
+            parent.remove(elem)
+        elif parent_tag == 'devicesets' and elem.tag == 'deviceset':
+            # devicesets follow the packages and symbols of their library
+            while len(pending) > 0:
+                done = _collect(pending.popleft(), cache, library_sink,
+                                options)
+                logger.debug(f'save {done}')
+            name = elem.attrib['name']
+            if sink == 'dir':
+                os.makedirs(os.path.join(dirpath, 'devicesets'),
+                            exist_ok=True)
+            elif library_sink is None:
+                library_sink = open_sink(sink, dirpath)
+            figpath = os.path.join(dirpath, f'devicesets/{name}.svg')
+            if manifest is not None and manifest.unchanged(
+                    f'devicesets/{name}.svg',
+                    deviceset_digest(elem, layers, repr(options), digests)):
+                n_skipped += 1
+            else:
+                from deviceset import render_deviceset
+                render_deviceset(elem, cache, figpath, options, library_sink)
+                logger.debug(f'save {figpath}')
+            counts['devicesets'] += 1
+            parent.remove(elem)
+
+    if executor is not None:
+        while len(pending) > 0:
+            done = _collect(pending.popleft(), cache, library_sink, options)
+            logger.debug(f'save {done}')
+        executor.shutdown()
+    if library_sink is not None:
+        library_sink.close()
+    if queue is not None:
+        queue.close()
+
+    if store is not None:
+        for kind, name, figpath in stored:
+            store.add(digests[(kind, name)], figpath, kind, name)
+        store.resolve()
+        logger.info(f'link {store.n_linked} items from {store.root}')
+        store.save()
+
+    if not has_library:
+        logger.error('No Library')
+        return
+
+    if manifest is not None:
+        logger.info(f'skip {n_skipped} unchanged items')
+        for path in manifest.prune():
+            logger.debug(f'remove {path}')
+        manifest.save()
+
+    logger.info(f'# packages: {counts["packages"]}')
+    logger.info(f'# symbols: {counts["symbols"]}')
+    logger.info(f'# devicesets: {counts["devicesets"]}')
+    logger.info(f'peak RSS: {peak_rss():.1f} MB')
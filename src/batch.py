@@ -0,0 +1,225 @@
+import glob
+import os
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, NamedTuple, Tuple
+
+from colorful_logger import get_colorful_logger
+from EagleDraw import (LibraryRun, RenderOptions, _collect, _render_task,
+                       _worker_table, build_layer_table, parse_tree,
+                       render_item, task_output)
+from sinks import WriteQueue, open_sink
+from profiler import active_profiler, profiling, stage
+from store import RenderStore
+from vector_font import glyph_table
+
+logger = get_colorful_logger(__name__)
+
+
+def expand_filenames(patterns: List[str]) -> List[str]:
+    """Files matching glob patterns, `**` matches any number of directories
+
+    Names without wildcards are kept as they are. Every file is listed
+    once, in the order of the patterns.
+    """
+    filenames = []
+    for pattern in patterns:
+        if not any(c in pattern for c in '*?['):
+            matches = [pattern]
+        else:
+            matches = sorted(glob.glob(pattern, recursive=True))
+            if len(matches) == 0:
+                logger.warning(f'no file matches {pattern}')
+        for filename in matches:
+            if filename not in filenames:
+                filenames.append(filename)
+    return filenames
+
+
+class BatchTask(NamedTuple):
+    cost: int  # size of the xml, to schedule large tasks first
+    run: int  # index of the library, -1 for a board
+    index: int  # position in the plan of the library
+    kind: str  # packages, symbols or board
+    xml: bytes
+    figpath: str  # output path, output directory of a board
+    layers_xml: bytes
+
+
+def _init_worker():
+    glyph_table()
+
+
+def _render_board_task(board_xml: bytes, layers_xml: bytes, dirpath: str,
+                       options: RenderOptions, tiles: int,
+                       profile: bool = False) -> Tuple[str, dict]:
+    from board import render_board
+
+    board = ET.fromstring(board_xml)
+    layers = _worker_table(layers_xml)
+    if not profile:
+        render_board(board, layers, dirpath, options, tiles)
+        return dirpath, None
+    with profiling() as p:
+        render_board(board, layers, dirpath, options, tiles)
+    return dirpath, p.state()
+
+
+def render_files(filenames: List[str], outputdir: str = 'imgs',
+                 batch: bool = False, jobs: int = 1,
+                 incremental: bool = False, backend: str = 'matplotlib',
+                 tiles: int = 0, dedupe: bool = False, sink: str = 'dir',
+                 compact: int = None, overview: bool = True,
+                 write_queue: int = 0, write_queue_mb: float = 64.0):
+    """Draw several libraries and boards from one work queue
+
+    Every file is parsed first and broken into item-level tasks, which
+    are then rendered largest first by a single pool of workers, so that
+    one large library does not hold up the others. Workers keep their
+    glyphs and the layer table of each library between tasks. The device
+    sheets of a library are drawn as soon as its last item is rendered.
+
+    The drawings of a library reach its sink in the order of its plan,
+    as in `parse_tree`, so archives and pdfs do not depend on the number
+    of workers. A serial run renders the files one after another.
+
+    A single file is drawn by `parse_tree`. Arguments are those of
+    `parse_tree`, boards draw their tiles in their worker.
+
+    Args:
+        filenames (List[str]): paths of .lbr and .brd files
+    """
+    if len(filenames) == 1:
+        parse_tree(filenames[0], outputdir, batch=batch, jobs=jobs,
+                   incremental=incremental, backend=backend, tiles=tiles,
+                   dedupe=dedupe, sink=sink, compact=compact,
+                   overview=overview, write_queue=write_queue,
+                   write_queue_mb=write_queue_mb)
+        return
+
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    # workers write their own files, the queue serves a serial run
+    queue = WriteQueue(write_queue, int(write_queue_mb*2**20)) \
+        if write_queue > 0 and jobs <= 1 and sink == 'dir' else None
+    options = RenderOptions(batch=batch, backend=backend, compact=compact)
+    store = RenderStore(outputdir) if dedupe else None
+    runs: List[LibraryRun] = []
+    tasks: List[BatchTask] = []
+    dirpaths = {}
+    for filename in filenames:
+        with stage('xml_parse'):
+            root = ET.parse(filename).getroot()
+        logger.info(f'parse {filename}')
+        basename = os.path.basename(filename).split('.')[0]
+        dirpath = os.path.join(outputdir, basename)
+        if dirpath in dirpaths:
+            logger.warning(f'{filename} and {dirpaths[dirpath]} are both '
+                           f'drawn to {dirpath}')
+        dirpaths[dirpath] = filename
+        os.makedirs(dirpath, exist_ok=True)
+
+        drawing = root.find('drawing')
+        layers_elem = drawing.find('layers')
+        layers_xml = ET.tostring(
+            layers_elem) if layers_elem is not None else b''
+        board = drawing.find('board')
+        if board is not None:
+            xml = ET.tostring(board)
+            tasks.append(BatchTask(len(xml), -1, 0, 'board', xml, dirpath,
+                                   layers_xml))
+            continue
+        library = drawing.find('library')
+        if library is None:
+            logger.error(f'No Library in {filename}')
+            continue
+        run = LibraryRun(library, build_layer_table(layers_elem), dirpath,
+                         options, incremental, store,
+                         open_sink(sink, dirpath, queue), overview)
+        for i, (kind, item, figpath) in enumerate(run.plan()):
+            xml = ET.tostring(item)
+            tasks.append(BatchTask(len(xml), len(runs), i, kind, xml,
+                                   figpath, layers_xml))
+        runs.append(run)
+
+    remaining = [0]*len(runs)
+    for task in tasks:
+        if task.run >= 0:
+            remaining[task.run] += 1
+    logger.info(f'{len(tasks)} tasks from {len(filenames)} files')
+
+    def done(task: BatchTask):
+        if task.run < 0:
+            return
+        remaining[task.run] -= 1
+        if remaining[task.run] == 0:
+            runs[task.run].finish()
+
+    for i, run in enumerate(runs):
+        if remaining[i] == 0:
+            run.finish()
+
+    if jobs <= 1:
+        from board import render_board
+
+        for task in tasks:
+            if task.run < 0:
+                render_board(ET.fromstring(task.xml),
+                             _worker_table(task.layers_xml), task.figpath,
+                             options, tiles)
+            else:
+                run = runs[task.run]
+                render_item(task.kind, ET.fromstring(task.xml), run.layers,
+                            task.figpath, options, run.cache, run.sink)
+                logger.debug(f'save {task.figpath}')
+            done(task)
+    else:
+        # stable, so that equal tasks keep the order of the files
+        tasks.sort(key=lambda t: -t.cost)
+        # futures of every library in the order of its plan, and the first
+        # one not yet collected
+        planned = [[None]*n for n in remaining]
+        heads = [0]*len(runs)
+        profile = active_profiler() is not None
+        with ProcessPoolExecutor(max_workers=jobs,
+                                 initializer=_init_worker) as executor:
+            futures = {}
+            for task in tasks:
+                if task.run < 0:
+                    future = executor.submit(
+                        _render_board_task, task.xml, task.layers_xml,
+                        task.figpath, options, tiles, profile)
+                else:
+                    future = executor.submit(
+                        _render_task, task.kind, task.xml, task.figpath,
+                        options, profile, task.layers_xml,
+                        task_output(runs[task.run].sink))
+                futures[future] = task
+                if task.run >= 0:
+                    planned[task.run][task.index] = future
+            for future in as_completed(futures):
+                task = futures[future]
+                if task.run < 0:
+                    dirpath, state = future.result()
+                    p = active_profiler()
+                    if p is not None and state is not None:
+                        p.merge(state)
+                    logger.debug(f'save {dirpath}')
+                    done(task)
+                    continue
+                # results that finish early wait for those planned before
+                run, order = runs[task.run], planned[task.run]
+                while heads[task.run] < len(order) and \
+                        order[heads[task.run]].done():
+                    figpath = _collect(order[heads[task.run]], run.cache,
+                                       run.sink, options)
+                    logger.debug(f'save {figpath}')
+                    heads[task.run] += 1
+                    done(task)
+
+    if store is not None:
+        store.resolve()
+        logger.info(f'link {store.n_linked} items from {store.root}')
+        store.save()
+    if queue is not None:
+        queue.close()
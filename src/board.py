@@ -0,0 +1,398 @@
+import os
+import re
+import time
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from colorful_logger import get_colorful_logger
+from EagleDraw import (LayerTable, RenderOptions, build_geometry, draw_circle,
+                       draw_text, save_geometry)
+from geometry import arc_params
+from geometry_ir import (ARC, CAPSTYLES, PAD, SEGMENT, Geometry,
+                         GeometryBuilder, concatenate)
+from profiler import stage
+
+logger = get_colorful_logger(__name__)
+
+VIA_LAYER = 18
+HOLE_LAYER = 45
+
+# top <-> bottom counterparts of the layers of mirrored elements
+MIRROR_LAYERS = dict([(1, 16), (21, 22), (23, 24), (25, 26), (27, 28),
+                      (29, 30), (31, 32), (33, 34), (35, 36), (37, 38),
+                      (39, 40), (41, 42), (51, 52)])
+MIRROR_LAYERS.update({b: t for t, b in MIRROR_LAYERS.items()})
+
+
+def parse_rot(rot: str) -> Tuple[float, bool]:
+    """Angle and mirroring of an eagle rotation, e.g. `MR90`
+
+    Returns:
+        Tuple[float, bool]: angle [deg] and whether it is mirrored
+    """
+    m = re.match(r'S?(M?)R([-+]?[\d.]+)', rot)
+    if m is None:
+        return 0.0, False
+    return float(m.group(2)), m.group(1) == 'M'
+
+
+class _Colors(object):
+    """Palette of layer colors for records built without a canvas"""
+
+    def __init__(self, layers: LayerTable):
+        self.layers = layers
+        self.palette: List[str] = []
+        self.index: Dict[str, int] = {}
+
+    def __call__(self, layer_numbers: np.ndarray) -> np.ndarray:
+        numbers, inverse = np.unique(layer_numbers, return_inverse=True)
+        ids = []
+        for no in numbers.tolist():
+            color = self.layers[no].hex
+            if color not in self.index:
+                self.index[color] = len(self.palette)
+                self.palette.append(color)
+            ids.append(self.index[color])
+        return np.array(ids, dtype='i2')[inverse] if ids else \
+            np.zeros(0, 'i2')
+
+
+def _floats(elems: List[ET.Element], key: str, default: float = 0.0):
+    return np.array([float(e.attrib.get(key, default)) for e in elems])
+
+
+def wire_geometry(wires: List[ET.Element], layers: LayerTable) -> Geometry:
+    """Wires as records, converted in one pass over their attributes
+
+    Args:
+        wires (List[ET.Element]): <wire> elements
+        layers (LayerTable): layer table of the drawing
+
+    Returns:
+        Geometry: straight wires and arcs
+    """
+    colors = _Colors(layers)
+    if len(wires) == 0:
+        return Geometry()
+    x1 = _floats(wires, 'x1')
+    y1 = _floats(wires, 'y1')
+    x2 = _floats(wires, 'x2')
+    y2 = _floats(wires, 'y2')
+    width = _floats(wires, 'width')
+    curve = _floats(wires, 'curve')
+    layer = np.array([int(w.attrib['layer']) for w in wires], dtype='i2')
+    color = colors(layer)
+
+    straight = curve == 0
+    segments = np.zeros(int(straight.sum()), SEGMENT)
+    for key, v in (('x1', x1), ('y1', y1), ('x2', x2), ('y2', y2),
+                   ('width', width), ('layer', layer), ('color', color)):
+        segments[key] = v[straight]
+    segments['cap'] = CAPSTYLES.index('round')
+
+    c = ~straight
+    arcs = np.zeros(int(c.sum()), ARC)
+    arcs['x'], arcs['y'], arcs['r'], arcs['theta1'], arcs['theta2'] = \
+        arc_params(x1[c], y1[c], x2[c], y2[c], curve[c])
+    arcs['width'] = width[c]
+    arcs['layer'] = layer[c]
+    arcs['color'] = color[c]
+    return Geometry({'wires': segments, 'arcs': arcs}, colors.palette)
+
+
+def via_geometry(vias: List[ET.Element], layers: LayerTable) -> Geometry:
+    """Vias as pads on the via layer"""
+    colors = _Colors(layers)
+    pads = np.zeros(len(vias), PAD)
+    if len(vias) > 0:
+        pads['x'] = _floats(vias, 'x')
+        pads['y'] = _floats(vias, 'y')
+        pads['drill'] = _floats(vias, 'drill')
+        # same default as the pads of packages
+        diameter = _floats(vias, 'diameter', 0.0)
+        pads['diameter'] = np.where(diameter > 0, diameter, 2*pads['drill'])
+        pads['layer'] = VIA_LAYER
+        pads['color'] = colors(pads['layer'])
+    return Geometry({'pads': pads}, colors.palette)
+
+
+def plain_geometry(board: ET.Element, layers: LayerTable) -> Geometry:
+    """Polygons of the signals and everything in <plain> but the wires
+
+    Polygons are filled along their outline, pours are not computed and
+    curved polygon edges are drawn straight.
+    """
+    builder = GeometryBuilder()
+    polygons = board.findall('signals/signal/polygon') + \
+        board.findall('plain/polygon')
+    for polygon in polygons:
+        layer = layers[int(polygon.attrib['layer'])]
+        vertices = polygon.findall('vertex')
+        builder.fill_polygon(_floats(vertices, 'x'), _floats(vertices, 'y'),
+                             layer.hex, layer.zorder)
+
+    plain = board.find('plain')
+    if plain is None:
+        return builder.geometry()
+    for rect in plain.findall('rectangle'):
+        attr = rect.attrib
+        layer = layers[int(attr['layer'])]
+        x1, y1 = float(attr['x1']), float(attr['y1'])
+        x2, y2 = float(attr['x2']), float(attr['y2'])
+        builder.fill_rect((min(x1, x2), min(y1, y2)), abs(x2 - x1),
+                          abs(y2 - y1), layer.hex, layer.zorder)
+    for hole in plain.findall('hole'):
+        layer = layers[HOLE_LAYER]
+        builder.fill_circle((float(hole.attrib['x']), float(hole.attrib['y'])),
+                            0.5*float(hole.attrib['drill']),
+                            layer.hex, layer.zorder)
+    for circle in plain.findall('circle'):
+        draw_circle(circle, layers, builder)
+    for text in plain.findall('text'):
+        draw_text(text, layers, builder)
+    return builder.geometry()
+
+
+def mirror_layers(geometry: Geometry, layers: LayerTable) -> Geometry:
+    """Move primitives to the bottom counterparts of their layers
+
+    Args:
+        geometry (Geometry): primitives of a mirrored element
+        layers (LayerTable): layer table of the drawing
+
+    Returns:
+        Geometry: primitives on the mirrored layers, recolored
+    """
+    lut = np.arange(256, dtype='i2')
+    for top, bottom in MIRROR_LAYERS.items():
+        lut[top] = bottom
+    palette = list(geometry.palette)
+    arrays = {}
+    for kind, a in geometry.arrays().items():
+        a = a.copy()
+        new = lut[a['layer']]
+        moved = new != a['layer']
+        for no in np.unique(new[moved]).tolist():
+            color = layers[no].hex
+            if color not in palette:
+                palette.append(color)
+            a['color'][moved & (new == no)] = palette.index(color)
+        a['layer'] = new
+        arrays[kind] = a
+    return Geometry(arrays, palette)
+
+
+def _place_records(geometry: Geometry, owners: Dict[str, np.ndarray],
+                   x, y, angle, mirror: bool) -> Geometry:
+    """Move the strokes of several elements to their placements at once
+
+    Args:
+        geometry (Geometry): glyph strokes and text origins in package
+            coordinates
+        owners (Dict[str, np.ndarray]): element index of every record of
+            `glyphs` and `circles`
+        x, y, angle: placements of the elements
+        mirror (bool): whether the elements are mirrored
+
+    Returns:
+        Geometry: strokes in board coordinates
+    """
+    m = -1.0 if mirror else 1.0
+    c = np.cos(np.radians(angle))
+    s = np.sin(np.radians(angle))
+
+    def tf(u, v, i):
+        u = m*u
+        return c[i]*u - s[i]*v + x[i], s[i]*u + c[i]*v + y[i]
+
+    glyphs = geometry.glyphs.copy()
+    i = owners['glyphs']
+    glyphs['x1'], glyphs['y1'] = tf(glyphs['x1'], glyphs['y1'], i)
+    glyphs['x2'], glyphs['y2'] = tf(glyphs['x2'], glyphs['y2'], i)
+    circles = geometry.circles.copy()
+    i = owners['circles']
+    circles['x'], circles['y'] = tf(circles['x'], circles['y'], i)
+    return Geometry({'glyphs': glyphs, 'circles': circles}, geometry.palette)
+
+
+def _substitute(s: str, element: ET.Element) -> str:
+    """Text of an element for a `>NAME`-style placeholder"""
+    key = s[1:].upper()
+    if key == 'NAME':
+        return element.attrib.get('name', '')
+    if key == 'VALUE':
+        return element.attrib.get('value', '')
+    for attribute in element.findall('attribute'):
+        if attribute.attrib.get('name', '').upper() == key and \
+                'value' in attribute.attrib:
+            return attribute.attrib['value']
+    return s
+
+
+def placeholder_texts(elements: List[ET.Element],
+                      packages: Dict[Tuple[str, str], ET.Element],
+                      layers: LayerTable) -> Geometry:
+    """Placeholder texts of the elements, e.g. their names and values
+
+    Texts of smashed attributes are drawn where the board places them,
+    the others where the package places them. The texts are drawn in
+    package coordinates and moved to the elements together, once per
+    side of the board.
+
+    Returns:
+        Geometry: texts in board coordinates
+    """
+    absolute = GeometryBuilder()
+    # mirrored -> builder, element index of the records, placements
+    sides = {False: (GeometryBuilder(), {'glyphs': [], 'circles': []}, []),
+             True: (GeometryBuilder(), {'glyphs': [], 'circles': []}, [])}
+    for element in elements:
+        package = packages[(element.attrib.get('library', ''),
+                            element.attrib['package'])]
+        angle, mirror = parse_rot(element.attrib.get('rot', 'R0'))
+        builder, owners, placements = sides[mirror]
+
+        smashed = {}
+        for attribute in element.findall('attribute'):
+            if 'x' in attribute.attrib and \
+                    attribute.attrib.get('display', 'value') != 'off':
+                smashed[attribute.attrib['name'].upper()] = attribute
+
+        for text in package.findall('text'):
+            s = text.text or ''
+            if not s.startswith('>'):
+                continue
+            a = smashed.get(s[1:].upper())
+            t = ET.Element('text', a.attrib if a is not None else text.attrib)
+            t.text = _substitute(s, element)
+            draw_text(t, layers, absolute if a is not None else builder)
+
+        k = len(placements)
+        for kind, owner in owners.items():
+            owner.extend([k]*(builder.count(kind) - len(owner)))
+        placements.append((float(element.attrib.get('x', 0)),
+                           float(element.attrib.get('y', 0)), angle))
+
+    parts = [absolute.geometry()]
+    for mirror, (builder, owners, placements) in sides.items():
+        if len(placements) == 0:
+            continue
+        x, y, angle = np.array(placements).T
+        owners = {kind: np.array(o, dtype=int) for kind, o in owners.items()}
+        placed = _place_records(builder.geometry(), owners, x, y, angle,
+                                mirror)
+        parts.append(mirror_layers(placed, layers) if mirror else placed)
+    return concatenate(parts)
+
+
+def board_geometry(board: ET.Element, layers: LayerTable) -> Geometry:
+    """Every primitive of a board
+
+    The geometry of each package is built once, without its placeholder
+    texts, and placed at all of its elements in a single vectorized
+    transform per package and side.
+
+    Args:
+        board (ET.Element): <board> element
+        layers (LayerTable): layer table of the drawing
+
+    Returns:
+        Geometry: primitives in board coordinates
+    """
+    packages: Dict[Tuple[str, str], ET.Element] = {}
+    for library in board.findall('libraries/library'):
+        lib = library.attrib.get('name', '')
+        for package in library.findall('packages/package'):
+            packages[(lib, package.attrib['name'])] = package
+
+    # (library, package, mirrored) -> elements
+    placements: Dict[Tuple[str, str, bool], List[ET.Element]] = \
+        defaultdict(list)
+    elements = board.findall('elements/element')
+    for element in elements:
+        key = (element.attrib.get('library', ''), element.attrib['package'])
+        if key not in packages:
+            logger.warning(f'package {key[1]} of {element.attrib["name"]} '
+                           f'not found in library {key[0]}')
+            continue
+        _, mirror = parse_rot(element.attrib.get('rot', 'R0'))
+        placements[key + (mirror,)].append(element)
+
+    parts = []
+    cache: Dict[Tuple[str, str], Geometry] = {}
+    for (lib, name, mirror), group in placements.items():
+        if (lib, name) not in cache:
+            package = packages[(lib, name)]
+            static = ET.Element('package', package.attrib)
+            static.extend(c for c in package
+                          if not (c.tag == 'text' and
+                                  (c.text or '').startswith('>')))
+            cache[(lib, name)] = build_geometry('packages', static, layers)
+        x = _floats(group, 'x')
+        y = _floats(group, 'y')
+        angle = np.array([parse_rot(e.attrib.get('rot', 'R0'))[0]
+                          for e in group])
+        placed = cache[(lib, name)].placed(x, y, angle, mirror)
+        if mirror:
+            placed = mirror_layers(placed, layers)
+        parts.append(placed)
+    parts.append(placeholder_texts(
+        [e for group in placements.values() for e in group], packages, layers))
+
+    wires = board.findall('plain/wire') + board.findall('signals/signal/wire')
+    parts.append(plain_geometry(board, layers))
+    parts.append(wire_geometry(wires, layers))
+    parts.append(via_geometry(board.findall('signals/signal/via'), layers))
+    logger.info(f'# elements: {len(elements)}, # packages: {len(cache)}, '
+                f'# signals: {len(board.findall("signals/signal"))}')
+    return concatenate(parts)
+
+
+def render_board(board: ET.Element, layers: LayerTable, dirpath: str,
+                 options: RenderOptions = RenderOptions(), tiles: int = 0,
+                 jobs: int = 1) -> List[str]:
+    """Draw a board and each of its layers
+
+    The whole board goes to `board.svg`, every used layer to
+    `layers/<number>_<name>.svg`. The matplotlib backend always batches
+    the primitives into one collection per layer.
+
+    Args:
+        board (ET.Element): <board> element
+        layers (LayerTable): layer table of the drawing
+        dirpath (str): output directory of the drawing
+        options (RenderOptions, optional): backend and its settings
+        tiles (int, optional): zoom levels of a png tile pyramid of the
+            whole board in `tiles/`, 0 writes none. Defaults to 0.
+        jobs (int, optional): worker processes for the tiles. Defaults to 1.
+
+    Returns:
+        List[str]: output paths
+    """
+    t = time.perf_counter()
+    with stage('geometry'):
+        geometry = board_geometry(board, layers)
+    logger.info(f'# primitives: {len(geometry)} '
+                f'({geometry.nbytes/1e6:.1f} MB)')
+    options = options._replace(batch=True)
+
+    paths = [save_geometry(geometry, os.path.join(dirpath, 'board.svg'),
+                           'board', 'board', options, t)]
+    logger.debug(f'save {paths[-1]}')
+    os.makedirs(os.path.join(dirpath, 'layers'), exist_ok=True)
+    for no in sorted(geometry.layer_counts()):
+        layer = layers[no]
+        name = re.sub(r'[^\w.-]', '_', layer.name) or str(no)
+        figpath = os.path.join(dirpath, f'layers/{no:02d}_{name}.svg')
+        paths.append(save_geometry(geometry.select([no]), figpath, 'layers',
+                                   f'{no} {layer.name}', options))
+        logger.debug(f'save {figpath}')
+
+    if tiles > 0:
+        from tiles import write_pyramid
+        with stage('tiles'):
+            write_pyramid(geometry, os.path.join(dirpath, 'tiles'), tiles, jobs)
+    return paths
@@ -0,0 +1,139 @@
+from typing import Iterator, NamedTuple, Sequence, Tuple
+
+DRILL_COLOR = '#a0a0a0'
+
+# modules of the backends are imported on first use
+BACKENDS = ('matplotlib', 'svg-native')
+
+
+class PageTransform(NamedTuple):
+    """Data to page coordinates of a saved drawing
+
+    Page coordinates are pt from the top left corner of the page, i.e.
+    the user units of the svg viewBox, or of a pdf page seen from the top.
+    """
+    width: float  # of the page [pt]
+    height: float
+    kx: float  # pt per data unit
+    ky: float  # negative, the page y-axis points down
+    x0: float  # page position of the data origin
+    y0: float
+
+    def box(self, xmin: float, ymin: float, xmax: float, ymax: float
+            ) -> Tuple[float, float, float, float]:
+        """Page box (left, top, right, bottom) of a box in data units"""
+        return (self.x0 + self.kx*xmin, self.y0 + self.ky*ymax,
+                self.x0 + self.kx*xmax, self.y0 + self.ky*ymin)
+
+
+class Canvas(object):
+    """Target of the `draw_*` functions
+
+    Every primitive is given in eagle (data) units: coordinates, radii and
+    line widths alike. `zorder` decides the painting order, higher is on
+    top. Backends implement the primitives and `save`, which sets `page`.
+    """
+    # where the data went on the page, known once the drawing is saved
+    page: PageTransform = None
+
+    def line(self, x: Sequence[float], y: Sequence[float], w: float,
+             color: str, zorder: float, capstyle: str = 'projecting'):
+        """Stroke a polyline
+
+        Args:
+            x (Sequence[float]): x-positions of the vertices
+            y (Sequence[float]): y-positions of the vertices
+            w (float): linewidth
+            color (str): stroke color
+            zorder (float): painting order
+            capstyle (str, optional): `projecting`, `round` or `butt`.
+                Defaults to 'projecting'.
+        """
+        raise NotImplementedError
+
+    def circle(self, xy: Tuple[float, float], r: float, w: float,
+               color: str, zorder: float):
+        """Stroke a circle outline"""
+        raise NotImplementedError
+
+    def fill_circle(self, xy: Tuple[float, float], r: float,
+                    color: str, zorder: float):
+        """Fill a disk"""
+        raise NotImplementedError
+
+    def fill_rect(self, xy: Tuple[float, float], width: float, height: float,
+                  color: str, zorder: float):
+        """Fill an axis-aligned rectangle from its lower left corner"""
+        raise NotImplementedError
+
+    def fill_polygon(self, x: Sequence[float], y: Sequence[float],
+                     color: str, zorder: float):
+        """Fill a closed polygon given by its vertices"""
+        raise NotImplementedError
+
+    def arc(self, xy: Tuple[float, float], r: float, theta1: float,
+            theta2: float, w: float, color: str, zorder: float):
+        """Stroke a circular arc counterclockwise from theta1 to theta2 [deg]"""
+        raise NotImplementedError
+
+    def glyph(self, x: Sequence[float], y: Sequence[float], w: float,
+              color: str, zorder: float):
+        """Stroke a polyline of a text glyph"""
+        self.line(x, y, w, color, zorder, capstyle='round')
+
+    def strokes(self, segments: 'np.ndarray', w: float, color: str,
+                zorder: float):
+        """Stroke the segments of a text, e.g. of a whole string
+
+        Args:
+            segments (np.ndarray): (N, 4) of x1, y1, x2, y2, segments of
+                a glyph stroke follow each other
+            w (float): linewidth
+            color (str): stroke color
+            zorder (float): painting order
+        """
+        for x, y in chains(segments):
+            self.glyph(x, y, w, color, zorder)
+
+    def pad(self, xy: Tuple[float, float], diameter: float, drill: float,
+            color: str, zorder: float):
+        """Fill a through-hole pad with its drill hole"""
+        self.fill_circle(xy, 0.5*diameter, color, zorder)
+        self.fill_circle(xy, 0.5*drill, DRILL_COLOR, zorder)
+
+    def flush(self):
+        """Emit buffered primitives"""
+        pass
+
+    def save(self, figpath, title: str = '', format: str = None):
+        """Write the drawing to a file
+
+        Args:
+            figpath (str or file): output path, or a binary file
+            title (str, optional): title of the drawing. Defaults to ''.
+            format (str, optional): file format, e.g. `svg` or `pdf`.
+                Defaults to None, i.e. from the extension of the path.
+        """
+        raise NotImplementedError
+
+
+def chains(segments: 'np.ndarray'
+           ) -> Iterator[Tuple['np.ndarray', 'np.ndarray']]:
+    """Join segments that continue each other into polylines
+
+    Args:
+        segments (np.ndarray): (N, 4) of x1, y1, x2, y2
+
+    Yields:
+        Tuple[np.ndarray, np.ndarray]: x and y of each polyline
+    """
+    # numpy is left out of the module, `draw.py -h` imports it
+    import numpy as np
+
+    if len(segments) == 0:
+        return
+    s = segments
+    brk = (s[1:, 0] != s[:-1, 2]) | (s[1:, 1] != s[:-1, 3])
+    starts = np.concatenate([[0], np.flatnonzero(brk) + 1, [len(s)]])
+    for i, j in zip(starts[:-1], starts[1:]):
+        yield np.append(s[i:j, 0], s[j-1, 2]), np.append(s[i:j, 1], s[j-1, 3])
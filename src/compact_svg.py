@@ -0,0 +1,540 @@
+import math
+import re
+import string
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Set, Tuple
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+XLINK_NS = 'http://www.w3.org/1999/xlink'
+ET.register_namespace('', SVG_NS)
+ET.register_namespace('xlink', XLINK_NS)
+
+# decimals of the coordinates in pt of the page, 0.01 pt is below a pixel
+# at any sensible zoom
+DEFAULT_DECIMALS = 2
+
+# attributes with lengths or coordinates in user units
+LENGTHS = ('x', 'y', 'x1', 'y1', 'x2', 'y2', 'cx', 'cy', 'r', 'rx', 'ry',
+           'width', 'height', 'stroke-width')
+
+_number = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+_path_token = re.compile(
+    r'[A-DF-Za-df-z]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+_reference = re.compile(r'url\(#([^)]+)\)')
+# e.g. the rotate(0 x y) matplotlib writes for every text
+_identity = re.compile(r'\s*rotate\(\s*0(?:[\s,]+[^)]*)?\)\s*')
+
+
+def _tag(name: str) -> str:
+    return f'{{{SVG_NS}}}{name}'
+
+
+HREF = f'{{{XLINK_NS}}}href'
+
+
+def quantize(v: float, decimals: int) -> str:
+    """Shortest text of a number rounded to some decimals"""
+    s = f'{v:.{decimals}f}'
+    if '.' in s:
+        s = s.rstrip('0').rstrip('.')
+    return '0' if s in ('-0', '') else s
+
+
+def compact_numbers(text: str, decimals: int) -> str:
+    """Quantize every number of an attribute, keeping the rest of it"""
+    return _number.sub(lambda m: quantize(float(m.group()), decimals), text)
+
+
+def compact_points(points: str, decimals: int) -> str:
+    """Quantize the points of a polygon, separated by spaces only"""
+    return ' '.join(quantize(float(v), decimals)
+                    for v in _number.findall(points))
+
+
+# numbers per segment of each path command, arcs mix lengths and flags
+_ARITY = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4, 'Q': 4, 'T': 2,
+          'A': 7, 'Z': 0}
+
+
+def _segments(d: str) -> List[Tuple[str, List[float]]]:
+    """Commands of path data with their numbers, one per segment"""
+    segments = []
+    command = None
+    numbers: List[float] = []
+    for token in _path_token.findall(d):
+        if token.isalpha():
+            if command is not None and len(numbers) > 0:
+                raise ValueError(f'{len(numbers)} numbers left for {command}')
+            command = token
+            if command in 'Zz':
+                segments.append((command, []))
+            continue
+        if command is None or command in 'Zz':
+            raise ValueError(f'number without a command in {d[:40]}')
+        numbers.append(float(token))
+        if len(numbers) == _ARITY[command.upper()]:
+            segments.append((command, numbers))
+            numbers = []
+            # further pairs of a moveto draw lines
+            if command in 'Mm':
+                command = chr(ord(command) - 1)
+    if len(numbers) > 0:
+        raise ValueError(f'{len(numbers)} numbers left for {command}')
+    return segments
+
+
+def _short(s: str) -> str:
+    """Number text without its leading zero, e.g. `-.5` for `-0.5`"""
+    if s.startswith('0.'):
+        return s[1:]
+    if s.startswith('-0.'):
+        return '-' + s[2:]
+    return s
+
+
+class _PathWriter(object):
+    """Shortest text of path data, segment by segment
+
+    Coordinates are rounded to integer units of 10^-decimals first, so
+    relative segments are exact differences of the rounded absolute ones
+    and the position does not drift along the path.
+    """
+
+    def __init__(self, decimals: int):
+        self.decimals = decimals
+        self.scale = 10**decimals
+        self.out: List[str] = []
+        self.implied = None  # command of numbers written without a letter
+        self.previous = None  # last number written
+        # box of every point and control point, None with arcs
+        self.box = [math.inf, math.inf, -math.inf, -math.inf]
+
+    def units(self, v: float) -> int:
+        return int(round(v*self.scale))
+
+    def number(self, n: int) -> str:
+        return _short(quantize(n/self.scale, self.decimals))
+
+    def text(self, command: str, numbers: List[str]) -> str:
+        out = [] if command == self.implied else [command]
+        previous = self.previous if len(out) == 0 else None
+        for s in numbers:
+            # a sign or a second point starts a new number by itself
+            if previous is not None and not s.startswith('-') and not (
+                    s.startswith('.') and '.' in previous):
+                out.append(' ')
+            out.append(s)
+            previous = s
+        return ''.join(out)
+
+    def write(self, choices: List[Tuple[str, List[str]]]):
+        text, command, numbers = min(
+            ((self.text(c, n), c, n) for c, n in choices),
+            key=lambda t: len(t[0]))
+        self.out.append(text)
+        self.previous = numbers[-1] if len(numbers) > 0 else None
+        if command in 'Mm':
+            self.implied = 'L' if command == 'M' else 'l'
+        else:
+            self.implied = command if command not in 'Zz' else None
+
+    def compact(self, d: str) -> str:
+        n = self.number
+        x = y = x0 = y0 = 0  # current point and start of the subpath
+        for command, v in _segments(d):
+            c = command.upper()
+            if c == 'Z':
+                self.write([('z', [])])
+                x, y = x0, y0
+                continue
+            ox, oy = (0, 0) if command == c else (x, y)
+            if c == 'H':
+                ex, ey = self.units(v[0]) + ox, y
+            elif c == 'V':
+                ex, ey = x, self.units(v[0]) + oy
+            else:
+                ex, ey = self.units(v[-2]) + ox, self.units(v[-1]) + oy
+            if c == 'M':
+                choices = [('M', [n(ex), n(ey)])]
+                if len(self.out) > 0:
+                    choices.append(('m', [n(ex - x), n(ey - y)]))
+            elif c in 'LHV':
+                if ey == y:
+                    choices = [('H', [n(ex)]), ('h', [n(ex - x)])]
+                elif ex == x:
+                    choices = [('V', [n(ey)]), ('v', [n(ey - y)])]
+                else:
+                    choices = [('L', [n(ex), n(ey)]),
+                               ('l', [n(ex - x), n(ey - y)])]
+            elif c == 'A':
+                rest = [_short(quantize(u, self.decimals)) for u in v[:3]] + \
+                    ['0' if u == 0 else '1' for u in v[3:5]]
+                choices = [('A', rest + [n(ex), n(ey)]),
+                           ('a', rest + [n(ex - x), n(ey - y)])]
+            else:
+                points = [(self.units(u) + ox, self.units(w) + oy)
+                          for u, w in zip(v[0:-2:2], v[1:-2:2])]
+                points.append((ex, ey))
+                choices = [(c, [n(u) for p in points for u in p]),
+                           (c.lower(), [n(u - o) for p in points
+                                        for u, o in zip(p, (x, y))])]
+            self.write(choices)
+            if c == 'A':
+                self.box = None
+            elif self.box is not None:
+                for u, w in points if c in 'CSQT' else [(ex, ey)]:
+                    self.box = [min(self.box[0], u), min(self.box[1], w),
+                                max(self.box[2], u), max(self.box[3], w)]
+            x, y = ex, ey
+            if c == 'M':
+                x0, y0 = x, y
+        return ''.join(self.out)
+
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Box of the path (xmin, ymin, xmax, ymax), None if unknown"""
+        if self.box is None or self.box[0] > self.box[2]:
+            return None
+        return tuple(u/self.scale for u in self.box)
+
+
+def compact_path(d: str, decimals: int) -> str:
+    """Quantize path data and write it in as few characters as it takes
+
+    Every segment is written absolute or relative, whichever is shorter,
+    straight lines along an axis become `H` and `V`, commands implied by
+    the previous one and leading zeros are dropped.
+    """
+    return _PathWriter(decimals).compact(d)
+
+
+def transform_scale(transform: str) -> float:
+    """Scale factor of an svg transform list, e.g. `matrix(...) scale(2)`"""
+    k = 1.0
+    for name, args in re.findall(r'(\w+)\s*\(([^)]*)\)', transform):
+        v = [float(a) for a in _number.findall(args)]
+        if name == 'matrix' and len(v) == 6:
+            k *= math.sqrt(abs(v[0]*v[3] - v[1]*v[2]))
+        elif name == 'scale' and len(v) > 0:
+            k *= math.sqrt(abs(v[0]*(v[1] if len(v) > 1 else v[0])))
+    return k
+
+
+def parse_style(style: str) -> Dict[str, str]:
+    items = {}
+    for declaration in style.split(';'):
+        if ':' in declaration:
+            key, value = declaration.split(':', 1)
+            items[key.strip()] = value.strip()
+    return items
+
+
+def _references(root: ET.Element) -> Set[str]:
+    ids = set()
+    for e in root.iter():
+        for key, value in e.attrib.items():
+            if key == HREF and value.startswith('#'):
+                ids.add(value[1:])
+            else:
+                ids.update(_reference.findall(value))
+        if e.tag == _tag('style') and e.text:
+            ids.update(_reference.findall(e.text))
+    return ids
+
+
+class Compactor(object):
+    """Rewrite an svg with fewer bytes and the same picture
+
+    - metadata, comments, the doctype and whitespace are dropped
+    - numbers are rounded to `decimals` in pt of the page, elements under
+      a scaling transform keep as many more decimals as the scale needs
+    - ids nobody refers to are dropped, so are unused <defs> and groups
+      left without attributes
+    - path data is written relative or absolute, whichever is shorter,
+      without implied commands and leading zeros
+    - unfilled paths (and polylines) with equal attributes, e.g. the
+      strokes of one layer, are merged into one path where no element
+      drawn in between overlaps them
+    - a clip path shared by consecutive elements is set once on a group
+    - style attributes used more than once become classes of one style
+      sheet, e.g. the font of every tick label
+
+    Matplotlib drawings come out about 4 times smaller, 2 times for the
+    svg-native backend, whose output is lean already.
+
+    Args:
+        decimals (int, optional): decimals of the page coordinates.
+            Defaults to DEFAULT_DECIMALS.
+    """
+
+    def __init__(self, decimals: int = DEFAULT_DECIMALS):
+        self.decimals = decimals
+
+    def compact(self, data: bytes) -> bytes:
+        root = ET.fromstring(data)
+        self.referenced = _references(root)
+        # boxes of paths and rects including their strokes, in the user
+        # units of their parents
+        self.boxes: Dict[ET.Element, Tuple[float, float, float, float]] = {}
+        self._clean(root, self.decimals, filled=True, width=1.0)
+        self._restructure(root)
+        for e in root.iter():
+            e.attrib.pop('_filled', None)
+        self._classify(root)
+        # `>` is escaped in attribute values, ` />` only closes elements
+        return ET.tostring(root, encoding='utf-8',
+                           xml_declaration=False).replace(b' />', b'/>')
+
+    def _decimals(self, decimals: int, transform: str) -> int:
+        k = transform_scale(transform)
+        if k <= 0:
+            return decimals
+        return max(0, decimals + math.ceil(math.log10(k) - 1e-9))
+
+    def _clean(self, e: ET.Element, decimals: int, filled: bool,
+               width: float):
+        """Strip and quantize an element and its children
+
+        Args:
+            e (ET.Element): element
+            decimals (int): decimals in the user units of the element
+            filled (bool): whether the parent paints fills
+            width (float): stroke width of the parent, None if unknown
+        """
+        # the parser already drops comments and the doctype
+        for child in e.findall(_tag('metadata')):
+            e.remove(child)
+        if e.tag != _tag('text'):
+            if e.text is not None and e.text.strip() == '':
+                e.text = None
+        for child in e:
+            if child.tail is not None and child.tail.strip() == '':
+                child.tail = None
+
+        a = e.attrib
+        if 'id' in a and a['id'] not in self.referenced:
+            del a['id']
+        if e.tag != _tag('svg'):
+            if 'transform' in a:
+                # factors of the transform multiply the coordinates
+                a['transform'] = compact_numbers(a['transform'],
+                                                 decimals + 3)
+                if _identity.fullmatch(a['transform']):
+                    del a['transform']
+                else:
+                    decimals = self._decimals(decimals, a['transform'])
+            for key in LENGTHS:
+                if key in a:
+                    a[key] = compact_numbers(a[key], decimals)
+            if 'style' in a:
+                style = parse_style(a['style'])
+                for key, value in style.items():
+                    if '.' in value:
+                        style[key] = compact_numbers(value, decimals)
+                a['style'] = ';'.join(f'{k}:{v}' for k, v in style.items())
+                if 'fill' in style:
+                    filled = style['fill'] != 'none'
+                if 'stroke-width' in style:
+                    width = _length(style['stroke-width'])
+            if 'fill' in a:
+                filled = a['fill'] != 'none'
+            if 'stroke-width' in a and 'stroke-width' not in a.get('style', ''):
+                width = _length(a['stroke-width'])
+            if e.tag == _tag('polyline') and 'points' in a:
+                e.tag = _tag('path')
+                a['d'] = 'M' + a.pop('points')
+            if 'd' in a:
+                writer = _PathWriter(decimals)
+                a['d'] = writer.compact(a['d'])
+                self._box(e, writer.bounds(), width)
+            elif e.tag == _tag('rect'):
+                try:
+                    x, y, w, h = [float(a.get(k, 0)) for k in
+                                  ('x', 'y', 'width', 'height')]
+                    self._box(e, (x, y, x + w, y + h), width)
+                except ValueError:
+                    pass
+            if 'points' in a:
+                a['points'] = compact_points(a['points'], decimals)
+        e.set('_filled', '1' if filled else '0')
+        for child in e:
+            self._clean(child, decimals, filled, width)
+
+    def _box(self, e: ET.Element, box: Tuple[float, float, float, float],
+             width: float):
+        if box is None or width is None or 'transform' in e.attrib:
+            return
+        # miter joins reach out up to twice the width at the default limit
+        m = 2*width
+        self.boxes[e] = (box[0] - m, box[1] - m, box[2] + m, box[3] + m)
+
+    def _restructure(self, e: ET.Element):
+        for child in e:
+            self._restructure(child)
+        children: List[ET.Element] = []
+        for child in e:
+            if child.tag == _tag('g') and \
+                    set(child.attrib) == {'_filled'}:
+                # a group without attributes does nothing
+                children.extend(child)
+            elif child.tag == _tag('defs') and len(child) == 0:
+                continue
+            else:
+                children.append(child)
+        if e.tag == _tag('defs'):
+            children = [c for c in children
+                        if c.get('id') in self.referenced or
+                        c.tag == _tag('style')]
+        children = self._merge(children)
+        children = self._hoist_clips(children)
+        e[:] = children
+
+    @staticmethod
+    def _classify(root: ET.Element):
+        """Move style attributes used more than once into a style sheet"""
+        counts: Dict[str, int] = {}
+        for e in root.iter():
+            if 'style' in e.attrib and 'class' not in e.attrib:
+                counts[e.get('style')] = counts.get(e.get('style'), 0) + 1
+        names: Dict[str, str] = {}
+        for style, count in counts.items():
+            if count > 1:
+                names[style] = _class_name(len(names))
+        if len(names) == 0:
+            return
+        for e in root.iter():
+            name = names.get(e.get('style'))
+            if name is not None and 'class' not in e.attrib:
+                del e.attrib['style']
+                e.set('class', name)
+        sheet = root.find(f'{_tag("defs")}/{_tag("style")}')
+        if sheet is None:
+            sheet = ET.Element(_tag('style'))
+            root.insert(0, sheet)
+        # a class rule wins over the `*` rules of matplotlib like the
+        # style attribute did
+        sheet.text = (sheet.text or '') + ''.join(
+            f'.{name}{{{style}}}' for style, name in names.items())
+
+    @staticmethod
+    def _mergeable(e: ET.Element) -> bool:
+        return e.tag == _tag('path') and e.get('_filled') == '0' and \
+            'id' not in e.attrib and len(e) == 0 and \
+            e.get('d', '').startswith('M')
+
+    def _merge(self, children: List[ET.Element]) -> List[ET.Element]:
+        """Join unfilled paths that differ only by their data
+
+        A path is moved back into an earlier one with the same attributes
+        if it does not overlap anything drawn in between, so the picture
+        keeps its order.
+        """
+        out: List[ET.Element] = []
+        d: Dict[ET.Element, List[str]] = {}
+
+        def key(e):
+            return sorted((k, v) for k, v in e.attrib.items() if k != 'd')
+
+        for child in children:
+            target = None
+            box = self.boxes.get(child)
+            if self._mergeable(child):
+                for e in reversed(out):
+                    if e in d and key(e) == key(child):
+                        target = e
+                        break
+                    other = self.boxes.get(e)
+                    if box is None or other is None or _overlap(box, other):
+                        break
+            if target is None:
+                out.append(child)
+                if self._mergeable(child):
+                    d[child] = [child.get('d')]
+                continue
+            d[target].append(child.get('d'))
+            if target in self.boxes and box is not None:
+                self.boxes[target] = _union(self.boxes[target], box)
+            else:
+                self.boxes.pop(target, None)
+        for e, parts in d.items():
+            if len(parts) > 1:
+                e.set('d', ''.join(parts))
+        return out
+
+    @staticmethod
+    def _hoist_clips(children: List[ET.Element]) -> List[ET.Element]:
+        """Set a clip path shared by consecutive elements once on a group"""
+        out: List[ET.Element] = []
+        run: List[ET.Element] = []
+
+        def clip(e):
+            # a transform would change the coordinates of the clip path
+            if 'transform' in e.attrib:
+                return None
+            return e.get('clip-path')
+
+        def close():
+            if len(run) > 1:
+                group = ET.Element(_tag('g'), {'clip-path': clip(run[0])})
+                for e in run:
+                    del e.attrib['clip-path']
+                    if e.tag == _tag('g') and set(e.attrib) <= {'_filled'}:
+                        group.extend(e)
+                    else:
+                        group.append(e)
+                out.append(group)
+            else:
+                out.extend(run)
+            run.clear()
+
+        for child in children:
+            if len(run) > 0 and clip(child) != clip(run[0]):
+                close()
+            if clip(child) is None:
+                out.append(child)
+            else:
+                run.append(child)
+        close()
+        return out
+
+
+def _length(value: str) -> float:
+    """Number of a length in user units, None if it has other units"""
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _overlap(a: Tuple[float, ...], b: Tuple[float, ...]) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def _union(a: Tuple[float, ...], b: Tuple[float, ...]) -> Tuple[float, ...]:
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]),
+            max(a[3], b[3]))
+
+
+def _class_name(i: int) -> str:
+    """Short css class name of a number, `a` to `Z` then `aa`..."""
+    letters = string.ascii_letters
+    name = letters[i % len(letters)]
+    i //= len(letters)
+    while i > 0:
+        i -= 1
+        name = letters[i % len(letters)] + name
+        i //= len(letters)
+    return name
+
+
+def compact_svg(data: bytes, decimals: int = DEFAULT_DECIMALS) -> bytes:
+    """Smaller svg with the same picture, see `Compactor`
+
+    Args:
+        data (bytes): svg document
+        decimals (int, optional): decimals of the page coordinates.
+            Defaults to DEFAULT_DECIMALS.
+
+    Returns:
+        bytes: compacted svg document
+    """
+    return Compactor(decimals).compact(data)
@@ -0,0 +1,162 @@
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from canvas import Canvas
+from colorful_logger import get_colorful_logger
+from EagleDraw import (GeometryCache, LayerTable, RenderOptions, draw_text,
+                       save_geometry)
+from geometry_ir import Geometry, GeometryBuilder
+
+logger = get_colorful_logger(__name__)
+
+GAP = 5.08  # mm between the gates and the packages of a sheet
+NAME_LAYER = 95
+CONNECT_LAYER = 96
+NAME_SIZE = 1.778
+CONNECT_SIZE = 1.27
+
+
+def referenced_items(deviceset: ET.ElementTree) -> List[Tuple[str, str]]:
+    """Symbols of the gates and packages of the devices of a deviceset
+
+    Returns:
+        List[Tuple[str, str]]: (kind, name) in sheet order
+    """
+    items = []
+    for gate in deviceset.iterfind('gates/gate'):
+        items.append(('symbols', gate.attrib['symbol']))
+    for device in deviceset.iterfind('devices/device'):
+        if 'package' in device.attrib:
+            items.append(('packages', device.attrib['package']))
+    return items
+
+
+class Sheet(object):
+    """Geometries placed by reference, e.g. the gates and packages of a device
+
+    The geometries are shared with the package and symbol images and only
+    moved while drawing.
+    """
+
+    def __init__(self):
+        # geometry, dx, dy
+        self.parts: List[Tuple[Geometry, float, float]] = []
+
+    def add(self, geometry: Geometry, dx: float = 0.0, dy: float = 0.0):
+        self.parts.append((geometry, dx, dy))
+
+    def draw(self, canvas: Canvas):
+        for geometry, dx, dy in self.parts:
+            geometry.draw(canvas, (dx, dy))
+
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Extent of the placed geometries without stroke widths"""
+        b = np.array([[x0 + dx, y0 + dy, x1 + dx, y1 + dy]
+                      for geometry, dx, dy in self.parts if len(geometry) > 0
+                      for x0, y0, x1, y1 in [geometry.bounds()]])
+        if len(b) == 0:
+            return 0.0, 0.0, 0.0, 0.0
+        return (float(b[:, 0].min()), float(b[:, 1].min()),
+                float(b[:, 2].max()), float(b[:, 3].max()))
+
+    def layer_counts(self) -> Dict[int, int]:
+        counts: Dict[int, int] = {}
+        for geometry, _, _ in self.parts:
+            for number, n in geometry.layer_counts().items():
+                counts[number] = counts.get(number, 0) + n
+        return counts
+
+
+def _label(builder: GeometryBuilder, layers: LayerTable, s: str, x: float,
+           y: float, size: float, layer: int, align: str = 'top-left'):
+    text = ET.Element('text', {'x': str(x), 'y': str(y), 'size': str(size),
+                               'layer': str(layer), 'align': align})
+    text.text = s
+    draw_text(text, layers, builder)
+
+
+def compose_deviceset(deviceset: ET.ElementTree, cache: GeometryCache,
+                      layers: LayerTable) -> Sheet:
+    """Sheet of a deviceset
+
+    The gates are drawn where the deviceset places them, the package of
+    each device in a row to their right, with the device name and the
+    pin to pad connections below it.
+
+    Args:
+        deviceset (ET.ElementTree): <deviceset> element
+        cache (GeometryCache): geometries of the packages and symbols
+        layers (LayerTable): layer table of the drawing
+
+    Returns:
+        Sheet: the sheet
+    """
+    sheet = Sheet()
+    labels = GeometryBuilder()
+    gates = deviceset.findall('gates/gate')
+    for gate in gates:
+        symbol = cache.lookup('symbols', gate.attrib['symbol'])
+        if symbol is None:
+            logger.warning(f'symbol {gate.attrib["symbol"]} of '
+                           f'{deviceset.attrib["name"]} is undefined')
+            continue
+        x = float(gate.attrib.get('x', 0))
+        y = float(gate.attrib.get('y', 0))
+        sheet.add(symbol, x, y)
+        if len(gates) > 1:
+            _, _, _, ymax = symbol.bounds()
+            _label(labels, layers, gate.attrib['name'], x, y + ymax + GAP/2,
+                   NAME_SIZE, NAME_LAYER, 'bottom-left')
+
+    _, ymin, xmax, ymax = sheet.bounds()
+    x = xmax + GAP
+    yc = 0.5*(ymin + ymax)
+    for device in deviceset.iterfind('devices/device'):
+        if 'package' not in device.attrib:
+            continue  # e.g. a supply symbol without package
+        package = cache.lookup('packages', device.attrib['package'])
+        if package is None:
+            logger.warning(f'package {device.attrib["package"]} of '
+                           f'{deviceset.attrib["name"]} is undefined')
+            continue
+        px0, py0, px1, py1 = package.bounds()
+        dx = x - px0
+        dy = yc - 0.5*(py0 + py1)
+        sheet.add(package, dx, dy)
+
+        y = py0 + dy - GAP/2
+        _label(labels, layers, device.attrib['name'] or "''", x, y,
+               NAME_SIZE, NAME_LAYER)
+        y -= NAME_SIZE + GAP/4
+        for connect in device.iterfind('connects/connect'):
+            a = connect.attrib
+            pin = f'{a["gate"]}.{a["pin"]}' if len(gates) > 1 else a['pin']
+            _label(labels, layers, f'{pin}: {a["pad"]}', x, y,
+                   CONNECT_SIZE, CONNECT_LAYER)
+            y -= 1.5*CONNECT_SIZE
+        x += px1 - px0 + GAP
+    sheet.add(labels.geometry())
+    return sheet
+
+
+def render_deviceset(deviceset: ET.ElementTree, cache: GeometryCache,
+                     figpath: str, options: RenderOptions = RenderOptions(),
+                     sink=None) -> str:
+    """Compose the sheet of a deviceset and save it
+
+    Args:
+        deviceset (ET.ElementTree): <deviceset> element
+        cache (GeometryCache): geometries of the packages and symbols
+        figpath (str): output path
+        options (RenderOptions, optional): backend and its settings
+        sink (optional): where the sheet goes instead of `figpath`.
+            Defaults to None.
+
+    Returns:
+        str: output path
+    """
+    sheet = compose_deviceset(deviceset, cache, cache.layers)
+    return save_geometry(sheet, figpath, 'devicesets',
+                         deviceset.attrib['name'], options, sink=sink)
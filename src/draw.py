@@ -1,26 +1,132 @@
-import argparse
-import matplotlib.pyplot as plt
+import time
+_t_start = time.perf_counter()
 
-from colorful_logger import get_colorful_logger
-from EagleDraw import parse_tree
+import argparse  # noqa: E402
+import contextlib  # noqa: E402
+
+from canvas import BACKENDS  # noqa: E402
+from colorful_logger import get_colorful_logger  # noqa: E402
+from sinks import SINKS  # noqa: E402
 
 logger = get_colorful_logger(__name__)
 
-# matplotlib config
-plt.style.use('dark_background')
-plt.rcParams["svg.fonttype"] = "none"
-plt.rcParams["figure.facecolor"] = '#2b2b2b'
-plt.rcParams["axes.facecolor"] = '#2b2b2b'
-plt.rcParams["savefig.facecolor"] = '#2b2b2b'
-plt.rcParams["font.family"] = 'sans-serif'
+
+def log_timings(t_eagledraw: float, t_render: float):
+    """Log import and render times like `python -X importtime`
+
+    Args:
+        t_eagledraw (float): seconds spent importing EagleDraw
+        t_render (float): seconds spent rendering, backend imports included
+    """
+    from EagleDraw import import_times
+
+    logger.info('import time: self [us] | imported module')
+    logger.info(f'import time: {int(t_eagledraw*1e6):>9} | EagleDraw')
+    for module, t in import_times.items():
+        logger.info(f'import time: {int(t*1e6):>9} | {module}')
+    backends = sum(import_times.values())
+    logger.info(f'render: {t_render - backends:.3f} s, '
+                f'total: {time.perf_counter() - _t_start:.3f} s')
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
-    parser.add_argument('filenames', nargs='*')
+    parser.add_argument(
+        'filenames', nargs='*',
+        help='.lbr and .brd files or glob patterns, e.g. "libs/**/*.lbr"')
     parser.add_argument(
         '--output', '-o', default='imgs', help='output path')
+    parser.add_argument(
+        '--batch', action='store_true',
+        help='draw one collection per layer instead of one artist per primitive')
+    parser.add_argument(
+        '--jobs', '-j', type=int, default=1,
+        help='number of worker processes, 0 uses every core')
+    parser.add_argument(
+        '--stream', action='store_true',
+        help='render items while parsing to bound memory on large libraries')
+    parser.add_argument(
+        '--incremental', action='store_true',
+        help='only render items that changed since the last run')
+    parser.add_argument(
+        '--backend', choices=BACKENDS, default='matplotlib',
+        help='svg-native writes svg directly without matplotlib')
+    parser.add_argument(
+        '--tiles', type=int, default=0, metavar='LEVELS',
+        help='also write a png tile pyramid of boards with this many zoom levels')
+    parser.add_argument(
+        '--dedupe', action='store_true',
+        help='render identical packages and symbols of all libraries once '
+             'and hardlink their outputs')
+    parser.add_argument(
+        '--sink', choices=SINKS, default='dir',
+        help='write the drawings of a library as files, or into one zip, '
+             'tar or multi-page pdf next to its output directory')
+    parser.add_argument(
+        '--compact', nargs='?', type=int, const=2, metavar='DECIMALS',
+        help='write smaller svg: round coordinates to DECIMALS of a pt '
+             '(default 2), shorten path data, merge strokes of the same '
+             'style, share repeated styles and drop metadata and unused '
+             'definitions; matplotlib output gets about 4x smaller, '
+             'svg-native output about 2x')
+    parser.add_argument(
+        '--no-overview', dest='overview', action='store_false',
+        help='do not draw the grids of all packages and all symbols of a '
+             'library')
+    parser.add_argument(
+        '--write-queue', type=int, default=0, metavar='DEPTH',
+        help='write files from a background thread while drawing goes on, '
+             'with at most DEPTH files waiting besides the one being '
+             'written (serial runs)')
+    parser.add_argument(
+        '--write-queue-mb', type=float, default=64.0, metavar='MB',
+        help='at most MB waiting in the write queue')
+    parser.add_argument(
+        '--timings', action='store_true',
+        help='report import and render times')
+    parser.add_argument(
+        '--profile', nargs='?', const='profile.json', metavar='JSON',
+        help='write per-stage, per-function and per-item timings and '
+             'counters to a json file')
     args = parser.parse_args()
-    print(args.filenames)
-    for filename in args.filenames:
-        parse_tree(filename, args.output)
+    if args.sink == 'pdf' and args.backend != 'matplotlib':
+        parser.error('--sink pdf needs the matplotlib backend')
+    if args.sink == 'pdf' and args.compact is not None:
+        parser.error('--compact only applies to svg output')
+    if args.sink != 'dir' and (args.incremental or args.dedupe):
+        logger.warning('--incremental and --dedupe only apply to --sink dir')
+    logger.debug(f'filenames: {args.filenames}')
+
+    # numpy and the backends are only loaded once there is work to do
+    t = time.perf_counter()
+    from EagleDraw import stream_tree
+    t_eagledraw = time.perf_counter() - t
+
+    from batch import expand_filenames, render_files
+    filenames = expand_filenames(args.filenames)
+
+    t = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        if args.profile:
+            from profiler import profiling
+            stack.enter_context(profiling(args.profile))
+        if args.stream:
+            # streaming bounds memory, one file after another
+            for filename in filenames:
+                stream_tree(filename, args.output, batch=args.batch,
+                            jobs=args.jobs, incremental=args.incremental,
+                            backend=args.backend, tiles=args.tiles,
+                            dedupe=args.dedupe, sink=args.sink,
+                            compact=args.compact, overview=args.overview,
+                            write_queue=args.write_queue,
+                            write_queue_mb=args.write_queue_mb)
+        else:
+            render_files(filenames, args.output, batch=args.batch,
+                         jobs=args.jobs, incremental=args.incremental,
+                         backend=args.backend, tiles=args.tiles,
+                         dedupe=args.dedupe, sink=args.sink,
+                         compact=args.compact, overview=args.overview,
+                         write_queue=args.write_queue,
+                         write_queue_mb=args.write_queue_mb)
+    if args.timings:
+        log_timings(t_eagledraw, time.perf_counter() - t)
@@ -2,29 +2,33 @@
 """
 import argparse
 import os
-import glob
 
-import matplotlib.pyplot as plt
 from actions_toolkit import core
 
-from EagleDraw import parse_tree
+from batch import expand_filenames, render_files
 from colorful_logger import get_colorful_logger
 
 logger = get_colorful_logger(__name__)
 
-# matplotlib config
-plt.style.use('dark_background')
-plt.rcParams["svg.fonttype"] = "none"
-plt.rcParams["figure.facecolor"] = '#2b2b2b'
-plt.rcParams["axes.facecolor"] = '#2b2b2b'
-plt.rcParams["savefig.facecolor"] = '#2b2b2b'
-plt.rcParams["font.family"] = 'sans-serif'
-
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    # the filenames input of action.yml, whitespace separated glob patterns
+    parser.add_argument('filenames', nargs='*', default=['*.lbr'])
+    parser.add_argument(
+        '--jobs', '-j', type=int, default=1,
+        help='number of worker processes, 0 uses every core')
+    parser.add_argument(
+        '--incremental', choices=['true', 'false'], default='false',
+        help='skip items whose output from a previous run is up to date')
+    args = parser.parse_args()
+
     workdir = os.getenv('GITHUB_WORKSPACE', '.')
     logger.info(f'workdir : {workdir}')
     os.chdir(workdir)
 
-    for filename in glob.glob('*.lbr'):
-        parse_tree(filename, 'imgs')
+    patterns = [p for arg in args.filenames for p in arg.split()]
+    filenames = expand_filenames(patterns)
+    logger.info(f'draw {len(filenames)} files')
+    render_files(filenames, 'imgs', jobs=args.jobs,
+                 incremental=args.incremental == 'true')
@@ -0,0 +1,139 @@
+from typing import List, Tuple
+
+import numpy as np
+
+
+def arc_params(x1, y1, x2, y2, curve) -> Tuple[np.ndarray, ...]:
+    """Circles of curved wires
+
+    A curved wire runs from (x1, y1) to (x2, y2) along a circular arc
+    whose included angle is `curve`, counterclockwise when positive. All
+    arguments may be arrays of the same shape.
+
+    Args:
+        x1, y1: start points
+        x2, y2: end points
+        curve: included angles [deg], 0 < |curve| <= 360
+
+    Returns:
+        Tuple[np.ndarray, ...]: centre x, centre y, radius, theta1 and
+            theta2 [deg] with theta1 < theta2, i.e. the arc is always
+            drawn counterclockwise from theta1 to theta2
+    """
+    x1 = np.asarray(x1, dtype=float)
+    y1 = np.asarray(y1, dtype=float)
+    x2 = np.asarray(x2, dtype=float)
+    y2 = np.asarray(y2, dtype=float)
+    c = np.radians(np.asarray(curve, dtype=float))
+
+    dx = x2 - x1
+    dy = y2 - y1
+    half = 0.5*np.hypot(dx, dy)
+    s = np.sin(0.5*c)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # distance of the centre from the chord midpoint, to the left of
+        # the chord for |curve| < 180, on it for 180, to the right beyond
+        h = np.where(half > 0, np.cos(0.5*c)/s, 0.0)
+        ux = np.where(half > 0, dx/(2*half), 0.0)
+        uy = np.where(half > 0, dy/(2*half), 0.0)
+    r = np.abs(half/np.where(s != 0, s, 1.0))
+    cx = 0.5*(x1 + x2) - uy*half*h
+    cy = 0.5*(y1 + y2) + ux*half*h
+
+    start = np.degrees(np.arctan2(y1 - cy, x1 - cx))
+    end = start + np.degrees(c)
+    theta1 = np.minimum(start, end)
+    theta2 = np.maximum(start, end)
+    return cx, cy, r, theta1, theta2
+
+
+def arc_segments(r, theta1, theta2, tolerance: float = 0.005,
+                 max_segments: int = 256) -> np.ndarray:
+    """Number of chords for each arc so that the sagitta stays in tolerance
+
+    Args:
+        r: radii
+        theta1, theta2: start and end angles [deg]
+        tolerance (float, optional): largest distance between the chords
+            and the arc. Defaults to 0.005.
+        max_segments (int, optional): upper bound per arc. Defaults to 256.
+
+    Returns:
+        np.ndarray: chords per arc, at least 1
+    """
+    r = np.asarray(r, dtype=float)
+    span = np.radians(np.abs(np.asarray(theta2) - np.asarray(theta1)))
+    # a chord spanning angle a deviates r*(1-cos(a/2)) from the arc
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cos_half = np.clip(1.0 - tolerance/r, -1.0, 1.0)
+        step = 2*np.arccos(cos_half)
+        n = np.ceil(np.where(step > 0, span/step, 1.0))
+    return np.clip(n, 1, max_segments).astype(int)
+
+
+def arc_bounds(cx, cy, r, theta1, theta2) -> Tuple[np.ndarray, ...]:
+    """Boxes of the drawn part of arcs, not of their whole circles
+
+    An arc runs counterclockwise from theta1 over (theta2 - theta1) mod
+    360 degrees, a span of 0 is a full circle. Its box holds the two end
+    points and the points at 0, 90, 180 and 270 degrees it passes.
+
+    Args:
+        cx, cy: centres
+        r: radii
+        theta1, theta2: start and end angles [deg]
+
+    Returns:
+        Tuple[np.ndarray, ...]: xmin, ymin, xmax, ymax per arc
+    """
+    cx = np.atleast_1d(np.asarray(cx, dtype=float))
+    cy = np.atleast_1d(np.asarray(cy, dtype=float))
+    r = np.atleast_1d(np.asarray(r, dtype=float))
+    t1 = np.atleast_1d(np.asarray(theta1, dtype=float))
+    span = np.mod(np.atleast_1d(np.asarray(theta2, dtype=float)) - t1, 360.0)
+    span = np.where(span == 0, 360.0, span)
+
+    t = np.radians(np.column_stack([t1, t1 + span]))
+    xs = cx[:, None] + r[:, None]*np.cos(t)
+    ys = cy[:, None] + r[:, None]*np.sin(t)
+    xmin, xmax = xs.min(axis=1), xs.max(axis=1)
+    ymin, ymax = ys.min(axis=1), ys.max(axis=1)
+    passes = [np.mod(q - t1, 360.0) <= span for q in (0, 90, 180, 270)]
+    xmax = np.where(passes[0], cx + r, xmax)
+    ymax = np.where(passes[1], cy + r, ymax)
+    xmin = np.where(passes[2], cx - r, xmin)
+    ymin = np.where(passes[3], cy - r, ymin)
+    return xmin, ymin, xmax, ymax
+
+
+def tessellate_arcs(cx, cy, r, theta1, theta2,
+                    tolerance: float = 0.005) -> List[np.ndarray]:
+    """Approximate arcs by polylines
+
+    Args:
+        cx, cy: centres
+        r: radii
+        theta1, theta2: start and end angles [deg], counterclockwise
+        tolerance (float, optional): largest distance between the
+            polylines and the arcs. Defaults to 0.005.
+
+    Returns:
+        List[np.ndarray]: one (N, 2) polyline per arc
+    """
+    cx = np.atleast_1d(np.asarray(cx, dtype=float))
+    cy = np.atleast_1d(np.asarray(cy, dtype=float))
+    r = np.atleast_1d(np.asarray(r, dtype=float))
+    t1 = np.atleast_1d(np.asarray(theta1, dtype=float))
+    t2 = np.atleast_1d(np.asarray(theta2, dtype=float))
+    if len(r) == 0:
+        return []
+
+    n = arc_segments(r, t1, t2, tolerance)
+    counts = n + 1
+    ends = np.cumsum(counts)
+    idx = np.repeat(np.arange(len(r)), counts)
+    k = np.arange(ends[-1]) - np.repeat(ends - counts, counts)
+    t = np.radians(t1[idx] + (t2 - t1)[idx]*k/n[idx])
+    points = np.column_stack([cx[idx] + r[idx]*np.cos(t),
+                              cy[idx] + r[idx]*np.sin(t)])
+    return np.split(points, ends[:-1])
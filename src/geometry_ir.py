@@ -0,0 +1,427 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from canvas import Canvas, DRILL_COLOR
+from geometry import arc_bounds
+
+CAPSTYLES = ('projecting', 'round', 'butt')
+
+# every record carries the layer number and an index into the palette
+SEGMENT = np.dtype([('x1', 'f8'), ('y1', 'f8'), ('x2', 'f8'), ('y2', 'f8'),
+                    ('width', 'f4'), ('layer', 'i2'), ('color', 'i2'),
+                    ('cap', 'i1')])
+ARC = np.dtype([('x', 'f8'), ('y', 'f8'), ('r', 'f8'),
+                ('theta1', 'f8'), ('theta2', 'f8'),
+                ('width', 'f4'), ('layer', 'i2'), ('color', 'i2')])
+CIRCLE = np.dtype([('x', 'f8'), ('y', 'f8'), ('r', 'f8'),
+                   ('width', 'f4'), ('layer', 'i2'), ('color', 'i2')])
+DISC = np.dtype([('x', 'f8'), ('y', 'f8'), ('r', 'f8'),
+                 ('layer', 'i2'), ('color', 'i2')])
+RECT = np.dtype([('x', 'f8'), ('y', 'f8'), ('width', 'f8'), ('height', 'f8'),
+                 ('layer', 'i2'), ('color', 'i2')])
+PAD = np.dtype([('x', 'f8'), ('y', 'f8'), ('diameter', 'f8'), ('drill', 'f8'),
+                ('layer', 'i2'), ('color', 'i2')])
+# one record per vertex, consecutive vertices with the same `poly` form a
+# filled polygon
+VERTEX = np.dtype([('x', 'f8'), ('y', 'f8'), ('poly', 'i4'),
+                   ('layer', 'i2'), ('color', 'i2')])
+
+DTYPES = {
+    'wires': SEGMENT,  # wires and pins
+    'glyphs': SEGMENT,  # strokes of vector text
+    'arcs': ARC,
+    'circles': CIRCLE,  # outlines
+    'discs': DISC,  # filled circles
+    'rects': RECT,  # filled, lower left corner
+    'pads': PAD,
+    'polygons': VERTEX,
+}
+
+
+def groups(ids: np.ndarray) -> List[Tuple[int, int]]:
+    """Ranges of equal consecutive ids
+
+    Returns:
+        List[Tuple[int, int]]: start and end index of each run
+    """
+    if len(ids) == 0:
+        return []
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(ids)) + 1, [len(ids)]])
+    return list(zip(starts[:-1].tolist(), starts[1:].tolist()))
+
+
+class Geometry(object):
+    """Drawing of a package or a symbol as structured arrays
+
+    Coordinates, radii and widths are in eagle units, angles in degrees.
+    `layer` is the eagle layer number (zorder = -layer) and `color` an
+    index into `palette`.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray] = None,
+                 palette: List[str] = None):
+        self.palette = palette if palette is not None else []
+        for kind, dtype in DTYPES.items():
+            a = arrays.get(kind) if arrays is not None else None
+            setattr(self, kind, a if a is not None else np.zeros(0, dtype))
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {kind: getattr(self, kind) for kind in DTYPES}
+
+    def __len__(self) -> int:
+        return sum(len(a) for a in self.arrays().values())
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self.arrays().values())
+
+    def layer_counts(self) -> Dict[int, int]:
+        """Number of primitives per layer number"""
+        layers = np.concatenate([a['layer'] for a in self.arrays().values()])
+        numbers, counts = np.unique(layers, return_counts=True)
+        return dict(zip(numbers.tolist(), counts.tolist()))
+
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Extent of the geometry without stroke widths
+
+        Arcs count with the part that is drawn, see `geometry.arc_bounds`.
+
+        Returns:
+            Tuple[float, float, float, float]: xmin, ymin, xmax, ymax
+        """
+        a = self.arcs
+        ax0, ay0, ax1, ay1 = arc_bounds(a['x'], a['y'], a['r'], a['theta1'],
+                                        a['theta2'])
+        xs = [self.polygons['x'], self.wires['x1'], self.wires['x2'],
+              self.glyphs['x1'], self.glyphs['x2'],
+              ax0, ax1,
+              self.circles['x'] - self.circles['r'],
+              self.circles['x'] + self.circles['r'],
+              self.discs['x'] - self.discs['r'],
+              self.discs['x'] + self.discs['r'],
+              self.rects['x'], self.rects['x'] + self.rects['width'],
+              self.pads['x'] - 0.5*self.pads['diameter'],
+              self.pads['x'] + 0.5*self.pads['diameter']]
+        ys = [self.polygons['y'], self.wires['y1'], self.wires['y2'],
+              self.glyphs['y1'], self.glyphs['y2'],
+              ay0, ay1,
+              self.circles['y'] - self.circles['r'],
+              self.circles['y'] + self.circles['r'],
+              self.discs['y'] - self.discs['r'],
+              self.discs['y'] + self.discs['r'],
+              self.rects['y'], self.rects['y'] + self.rects['height'],
+              self.pads['y'] - 0.5*self.pads['diameter'],
+              self.pads['y'] + 0.5*self.pads['diameter']]
+        x = np.concatenate(xs)
+        y = np.concatenate(ys)
+        if len(x) == 0:
+            return 0.0, 0.0, 0.0, 0.0
+        return float(x.min()), float(y.min()), float(x.max()), float(y.max())
+
+    def translated(self, dx: float, dy: float) -> 'Geometry':
+        """Copy of the geometry moved by (dx, dy)"""
+        arrays = {}
+        for kind, a in self.arrays().items():
+            a = a.copy()
+            for x, y in (('x', 'y'), ('x1', 'y1'), ('x2', 'y2')):
+                if x in a.dtype.names:
+                    a[x] += dx
+                    a[y] += dy
+            arrays[kind] = a
+        return Geometry(arrays, self.palette)
+
+    def scaled(self, k: float, dx: float = 0.0, dy: float = 0.0) -> 'Geometry':
+        """Copy of the geometry scaled by k about the origin, then moved
+
+        Line widths, radii and sizes are scaled along, so that the copy
+        looks like the original from further away.
+        """
+        arrays = {}
+        for kind, a in self.arrays().items():
+            a = a.copy()
+            for x, y in (('x', 'y'), ('x1', 'y1'), ('x2', 'y2')):
+                if x in a.dtype.names:
+                    a[x] = k*a[x] + dx
+                    a[y] = k*a[y] + dy
+            for length in ('r', 'width', 'height', 'diameter', 'drill'):
+                if length in a.dtype.names:
+                    a[length] *= k
+            arrays[kind] = a
+        return Geometry(arrays, self.palette)
+
+    def draw(self, canvas: Canvas, offset: Tuple[float, float] = None):
+        """Replay the geometry on a canvas
+
+        Primitives are replayed kind by kind: polygons, pads, discs,
+        rects, circles, arcs, wires, then glyphs. Layers stack by zorder
+        as before, but within one layer, overlapping primitives of
+        different kinds may stack in this order rather than in the order
+        of the xml.
+
+        Args:
+            canvas (Canvas): canvas to draw on
+            offset (Tuple[float, float], optional): translation of the
+                whole geometry. Defaults to None.
+        """
+        if offset is not None and (offset[0] != 0 or offset[1] != 0):
+            self.translated(*offset).draw(canvas)
+            return
+        c = self.palette
+        v = self.polygons
+        for i, j in groups(v['poly']):
+            canvas.fill_polygon(v['x'][i:j], v['y'][i:j],
+                                c[v['color'][i]], -v['layer'][i])
+        for p in self.pads:
+            canvas.pad((p['x'], p['y']), p['diameter'], p['drill'],
+                       c[p['color']], -p['layer'])
+        for d in self.discs:
+            canvas.fill_circle((d['x'], d['y']), d['r'],
+                               c[d['color']], -d['layer'])
+        for r in self.rects:
+            canvas.fill_rect((r['x'], r['y']), r['width'], r['height'],
+                             c[r['color']], -r['layer'])
+        for e in self.circles:
+            canvas.circle((e['x'], e['y']), e['r'], e['width'],
+                          c[e['color']], -e['layer'])
+        for a in self.arcs:
+            canvas.arc((a['x'], a['y']), a['r'], a['theta1'], a['theta2'],
+                       a['width'], c[a['color']], -a['layer'])
+        for s in self.wires:
+            canvas.line((s['x1'], s['x2']), (s['y1'], s['y2']), s['width'],
+                        c[s['color']], -s['layer'], capstyle=CAPSTYLES[s['cap']])
+        # one call per run of strokes that look alike, e.g. per string
+        g = self.glyphs
+        if len(g) > 0:
+            brk = (g['width'][1:] != g['width'][:-1]) | \
+                (g['color'][1:] != g['color'][:-1]) | \
+                (g['layer'][1:] != g['layer'][:-1])
+            starts = np.concatenate([[0], np.flatnonzero(brk) + 1, [len(g)]])
+            segments = np.column_stack([g['x1'], g['y1'], g['x2'], g['y2']])
+            for i, j in zip(starts[:-1], starts[1:]):
+                canvas.strokes(segments[i:j], g['width'][i],
+                               c[g['color'][i]], -g['layer'][i])
+
+    def select(self, layers) -> 'Geometry':
+        """Primitives on some layers
+
+        Args:
+            layers: layer numbers to keep
+
+        Returns:
+            Geometry: subset sharing the palette
+        """
+        layers = list(layers)
+        return Geometry({kind: a[np.isin(a['layer'], layers)]
+                         for kind, a in self.arrays().items()}, self.palette)
+
+    def placed(self, x, y, angle, mirror: bool = False) -> 'Geometry':
+        """Copies of the geometry at several placements
+
+        Each copy is mirrored at the y-axis (if `mirror`), then rotated
+        counterclockwise by its angle and moved to its position. All
+        copies are transformed together. Rectangles of copies that are not
+        rotated by a multiple of 90 degrees become polygons.
+
+        Args:
+            x, y: positions of the copies, shape (K,)
+            angle: rotations of the copies [deg], shape (K,)
+            mirror (bool, optional): mirror every copy. Defaults to False.
+
+        Returns:
+            Geometry: the K copies, placement after placement
+        """
+        x0 = np.atleast_1d(np.asarray(x, dtype=float))[:, None]
+        y0 = np.atleast_1d(np.asarray(y, dtype=float))[:, None]
+        angle = np.atleast_1d(np.asarray(angle, dtype=float))
+        k = len(angle)
+        c = np.cos(np.radians(angle))[:, None]
+        s = np.sin(np.radians(angle))[:, None]
+        m = -1.0 if mirror else 1.0
+
+        def tf(u, v, rows=slice(None)):
+            u = m*np.asarray(u)
+            return (c[rows]*u - s[rows]*v + x0[rows]).ravel(), \
+                (s[rows]*u + c[rows]*v + y0[rows]).ravel()
+
+        out = {}
+        for kind in ('wires', 'glyphs'):
+            a = np.tile(getattr(self, kind), k)
+            a['x1'], a['y1'] = tf(getattr(self, kind)['x1'],
+                                  getattr(self, kind)['y1'])
+            a['x2'], a['y2'] = tf(getattr(self, kind)['x2'],
+                                  getattr(self, kind)['y2'])
+            out[kind] = a
+        for kind in ('circles', 'discs', 'pads'):
+            a = np.tile(getattr(self, kind), k)
+            a['x'], a['y'] = tf(getattr(self, kind)['x'],
+                                getattr(self, kind)['y'])
+            out[kind] = a
+
+        arcs = np.tile(self.arcs, k)
+        arcs['x'], arcs['y'] = tf(self.arcs['x'], self.arcs['y'])
+        t1, t2 = self.arcs['theta1'], self.arcs['theta2']
+        if mirror:
+            t1, t2 = 180.0 - t2, 180.0 - t1
+        arcs['theta1'] = (t1 + angle[:, None]).ravel()
+        arcs['theta2'] = (t2 + angle[:, None]).ravel()
+        out['arcs'] = arcs
+
+        # polygons of every copy get their own ids
+        p = self.polygons
+        n_poly = int(p['poly'].max()) + 1 if len(p) > 0 else 0
+        polygons = np.tile(p, k)
+        polygons['x'], polygons['y'] = tf(p['x'], p['y'])
+        polygons['poly'] = (p['poly'] + n_poly*np.arange(k)[:, None]).ravel()
+
+        r = self.rects
+        right = np.isclose(np.mod(angle + 45.0, 90.0), 45.0)
+        xa, ya = tf(r['x'], r['y'], right)
+        xb, yb = tf(r['x'] + r['width'], r['y'] + r['height'], right)
+        rects = np.tile(r, int(right.sum()))
+        rects['x'] = np.minimum(xa, xb)
+        rects['y'] = np.minimum(ya, yb)
+        rects['width'] = np.abs(xb - xa)
+        rects['height'] = np.abs(yb - ya)
+        out['rects'] = rects
+        if not right.all() and len(r) > 0:
+            # corners counterclockwise, one polygon per rectangle and copy
+            rows = ~right
+            corners = [(r['x'], r['y']),
+                       (r['x'] + r['width'], r['y']),
+                       (r['x'] + r['width'], r['y'] + r['height']),
+                       (r['x'], r['y'] + r['height'])]
+            xy = [tf(u, v, rows) for u, v in corners]
+            n = len(xy[0][0])
+            quads = np.zeros(4*n, VERTEX)
+            quads['x'] = np.column_stack([q[0] for q in xy]).ravel()
+            quads['y'] = np.column_stack([q[1] for q in xy]).ravel()
+            quads['poly'] = np.repeat(np.arange(n) + n_poly*k, 4)
+            quads['layer'] = np.repeat(np.tile(r['layer'], int(rows.sum())), 4)
+            quads['color'] = np.repeat(np.tile(r['color'], int(rows.sum())), 4)
+            polygons = np.concatenate([polygons, quads])
+        out['polygons'] = polygons
+        return Geometry(out, self.palette)
+
+
+def concatenate(geometries: List[Geometry]) -> Geometry:
+    """Join geometries into one with a common palette
+
+    Args:
+        geometries (List[Geometry]): parts
+
+    Returns:
+        Geometry: all primitives, in the order of the parts
+    """
+    palette: List[str] = []
+    index: Dict[str, int] = {}
+    parts = {kind: [] for kind in DTYPES}
+    n_poly = 0
+    for g in geometries:
+        for color in g.palette:
+            if color not in index:
+                index[color] = len(palette)
+                palette.append(color)
+        remap = np.array([index[color] for color in g.palette] or [0],
+                         dtype='i2')
+        for kind, a in g.arrays().items():
+            if len(a) == 0:
+                continue
+            a = a.copy()
+            a['color'] = remap[a['color']]
+            if kind == 'polygons':
+                a['poly'] += n_poly
+                n_poly = int(a['poly'].max()) + 1
+            parts[kind].append(a)
+    arrays = {kind: np.concatenate(p) if p else np.zeros(0, DTYPES[kind])
+              for kind, p in parts.items()}
+    return Geometry(arrays, palette)
+
+
+class GeometryBuilder(Canvas):
+    """Canvas that records the primitives into a `Geometry`"""
+
+    def __init__(self):
+        self.palette: List[str] = []
+        self.colors: Dict[str, int] = {}
+        self.records: Dict[str, list] = {kind: [] for kind in DTYPES}
+        # glyph records added as whole arrays, in order with `records`
+        self.blocks: List[np.ndarray] = []
+        self.n_polygons = 0
+
+    def _color(self, color: str) -> int:
+        i = self.colors.get(color)
+        if i is None:
+            i = len(self.palette)
+            self.colors[color] = i
+            self.palette.append(color)
+        return i
+
+    def _segments(self, kind, x, y, w, color, zorder, cap):
+        c = self._color(color)
+        records = self.records[kind]
+        for i in range(len(x)-1):
+            records.append((x[i], y[i], x[i+1], y[i+1], w, -zorder, c, cap))
+
+    def line(self, x, y, w, color, zorder, capstyle='projecting'):
+        self._segments('wires', x, y, w, color, zorder,
+                       CAPSTYLES.index(capstyle))
+
+    def glyph(self, x, y, w, color, zorder):
+        self._segments('glyphs', x, y, w, color, zorder,
+                       CAPSTYLES.index('round'))
+
+    def strokes(self, segments, w, color, zorder):
+        block = np.zeros(len(segments), SEGMENT)
+        for i, name in enumerate(('x1', 'y1', 'x2', 'y2')):
+            block[name] = segments[:, i]
+        block['width'] = w
+        block['layer'] = -zorder
+        block['color'] = self._color(color)
+        block['cap'] = CAPSTYLES.index('round')
+        records = self.records['glyphs']
+        if len(records) > 0:
+            self.blocks.append(np.array(records, dtype=SEGMENT))
+            records.clear()
+        self.blocks.append(block)
+
+    def circle(self, xy, r, w, color, zorder):
+        self.records['circles'].append(
+            (xy[0], xy[1], r, w, -zorder, self._color(color)))
+
+    def fill_circle(self, xy, r, color, zorder):
+        self.records['discs'].append(
+            (xy[0], xy[1], r, -zorder, self._color(color)))
+
+    def fill_rect(self, xy, width, height, color, zorder):
+        self.records['rects'].append(
+            (xy[0], xy[1], width, height, -zorder, self._color(color)))
+
+    def fill_polygon(self, x, y, color, zorder):
+        c = self._color(color)
+        records = self.records['polygons']
+        for u, v in zip(x, y):
+            records.append((u, v, self.n_polygons, -zorder, c))
+        self.n_polygons += 1
+
+    def arc(self, xy, r, theta1, theta2, w, color, zorder):
+        self.records['arcs'].append(
+            (xy[0], xy[1], r, theta1, theta2, w, -zorder, self._color(color)))
+
+    def pad(self, xy, diameter, drill, color, zorder):
+        self.records['pads'].append(
+            (xy[0], xy[1], diameter, drill, -zorder, self._color(color)))
+
+    def count(self, kind: str) -> int:
+        """Number of records of a kind so far"""
+        n = len(self.records[kind])
+        if kind == 'glyphs':
+            n += sum(len(b) for b in self.blocks)
+        return n
+
+    def geometry(self) -> Geometry:
+        arrays = {kind: np.array(records, dtype=DTYPES[kind])
+                  for kind, records in self.records.items()}
+        if len(self.blocks) > 0:
+            arrays['glyphs'] = np.concatenate(self.blocks + [arrays['glyphs']])
+        return Geometry(arrays, list(self.palette))
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+from typing import Dict, List
+
+from colorful_logger import get_colorful_logger
+
+logger = get_colorful_logger(__name__)
+
+
+def digest(*parts: str) -> str:
+    """Hash of the given strings
+
+    Returns:
+        str: hex digest
+    """
+    h = hashlib.sha1()
+    for p in parts:
+        h.update(p.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+class Manifest(object):
+    """Digests of the items rendered into an output directory
+
+    The manifest from the previous run is loaded on construction. Items
+    are looked up by their output path relative to the directory.
+    """
+    filename = 'manifest.json'
+
+    def __init__(self, dirpath: str):
+        self.dirpath = dirpath
+        self.path = os.path.join(dirpath, self.filename)
+        self.previous: Dict[str, str] = {}
+        self.items: Dict[str, str] = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    self.previous = json.load(f)['items']
+            except (ValueError, KeyError) as e:
+                logger.warning(f'ignore broken manifest {self.path}: {e}')
+
+    def unchanged(self, relpath: str, item_digest: str) -> bool:
+        """Record an item and tell whether its output is up to date
+
+        Args:
+            relpath (str): output path relative to the directory
+            item_digest (str): digest of the item
+
+        Returns:
+            bool: True if the previous run wrote the same item
+        """
+        self.items[relpath] = item_digest
+        return self.previous.get(relpath) == item_digest and \
+            os.path.exists(os.path.join(self.dirpath, relpath))
+
+    def prune(self) -> List[str]:
+        """Remove outputs of items that are gone since the previous run
+
+        Paths of the previous manifest that resolve outside the directory,
+        e.g. from an edited manifest, are skipped.
+
+        Returns:
+            List[str]: removed paths
+        """
+        removed = []
+        root = os.path.realpath(self.dirpath)
+        for relpath in self.previous:
+            if relpath in self.items:
+                continue
+            path = os.path.realpath(os.path.join(self.dirpath, relpath))
+            if os.path.commonpath([root, path]) != root or path == root:
+                logger.warning(f'skip {relpath}, outside of {self.dirpath}')
+                continue
+            if os.path.isfile(path):
+                os.remove(path)
+                removed.append(path)
+        return removed
+
+    def save(self):
+        with open(self.path, 'w') as f:
+            json.dump({'items': self.items}, f, indent=1, sort_keys=True)
@@ -0,0 +1,369 @@
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import matplotlib
+import numpy as np
+
+# only files are written, never a window
+matplotlib.use('Agg')
+
+import matplotlib.patches as patches  # noqa: E402
+import matplotlib.pyplot as plt  # noqa: E402
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: E402
+from matplotlib.figure import Figure  # noqa: E402
+from matplotlib.transforms import Bbox  # noqa: E402
+
+from canvas import Canvas, PageTransform, chains
+from DiagramDataUnit import (ArcDataUnit, CircleDataUnit,
+                             LineCollectionDataUnits, LineDataUnits,
+                             PatchCollectionDataUnit, RectDataUnit)
+from geometry import tessellate_arcs
+from profiler import stage
+
+# matplotlib config
+plt.style.use('dark_background')
+plt.rcParams["svg.fonttype"] = "none"
+plt.rcParams["figure.facecolor"] = '#2b2b2b'
+plt.rcParams["axes.facecolor"] = '#2b2b2b'
+plt.rcParams["savefig.facecolor"] = '#2b2b2b'
+plt.rcParams["font.family"] = 'sans-serif'
+plt.rcParams["svg.hashsalt"] = 'EagleDrawer'  # reproducible svg ids
+
+
+class FigurePool(object):
+    """Figure and axes reused by the drawings of a process
+
+    The figure lives outside of pyplot on its own canvas. Between two
+    drawings only the artists, the title and the data limits are
+    cleared, so that the figure, its fonts, ticks and renderer are set up
+    once instead of per item.
+
+    Args:
+        figsize (Tuple[float, float], optional): size [inch]. Defaults to
+            None, i.e. the rc default.
+        dpi (float, optional): resolution. Defaults to None.
+        rect (Tuple[float, float, float, float], optional): position of
+            the axes in figure coordinates. Defaults to None, i.e. a
+            default subplot.
+    """
+
+    def __init__(self, figsize: Tuple[float, float] = None, dpi: float = None,
+                 rect: Tuple[float, float, float, float] = None):
+        self.key = (figsize, dpi, rect)
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.figure)
+        if rect is None:
+            self.ax = self.figure.add_subplot()
+        else:
+            self.ax = self.figure.add_axes(rect)
+        self.in_use = False
+        self.n_drawings = 0
+
+    def acquire(self) -> plt.Axes:
+        self.in_use = True
+        self.n_drawings += 1
+        return self.ax
+
+    def release(self):
+        """Clear the drawing and give the axes back to the pool"""
+        ax = self.ax
+        for artists in (ax.collections, ax.patches, ax.lines, ax.texts,
+                        ax.images):
+            for a in list(artists):
+                a.remove()
+        ax.set_title('')
+        ax.dataLim.set_points(Bbox.null().get_points())
+        ax.ignore_existing_data_limits = True
+        ax.set_autoscale_on(True)
+        self.in_use = False
+
+
+# pools of this process, a drawing in progress keeps its pool busy
+_pools: List[FigurePool] = []
+
+
+def figure_pool(figsize: Tuple[float, float] = None, dpi: float = None,
+                rect: Tuple[float, float, float, float] = None) -> FigurePool:
+    """Free pool with the given figure layout, made on first use"""
+    key = (figsize, dpi, rect)
+    for pool in _pools:
+        if pool.key == key and not pool.in_use:
+            return pool
+    pool = FigurePool(figsize, dpi, rect)
+    _pools.append(pool)
+    return pool
+
+
+def page_transform(ax: plt.Axes) -> PageTransform:
+    """Data to page coordinates of an axes as last drawn"""
+    figure = ax.figure
+    k = 72./figure.dpi
+    (x0, y0), (x1, y1) = ax.transData.transform([(0, 0), (1, 1)])
+    height = figure.get_figheight()*72.
+    return PageTransform(figure.get_figwidth()*72., height, (x1 - x0)*k,
+                         -(y1 - y0)*k, x0*k, height - y0*k)
+
+
+class AxesCanvas(Canvas):
+    """Draw every primitive as its own matplotlib artist
+
+    Args:
+        ax (plt.Axes, optional): axes to draw on. Defaults to None, i.e.
+            the axes of a `FigurePool`.
+    """
+
+    def __init__(self, ax: plt.Axes = None):
+        self.pool = None
+        if ax is None:
+            self.pool = figure_pool()
+            ax = self.pool.acquire()
+        self.ax = ax
+
+    def close(self):
+        """Hand the figure back to its pool, or close a pyplot figure"""
+        if self.pool is not None:
+            self.pool.release()
+            self.pool = None
+        else:
+            plt.close(self.ax.figure)
+
+    def line(self, x, y, w, color, zorder, capstyle='projecting'):
+        l = LineDataUnits(x, y, linewidth=w, color=color, zorder=zorder,
+                          solid_capstyle=capstyle)
+        self.ax.add_line(l)
+
+    def circle(self, xy, r, w, color, zorder):
+        c = CircleDataUnit(xy=xy, radius=r, ec=color,
+                           fill=False, linewidth=w, zorder=zorder)
+        self.ax.add_patch(c)
+
+    def fill_circle(self, xy, r, color, zorder):
+        c = patches.Circle(xy=xy, radius=r, ec=None, fc=color, zorder=zorder)
+        self.ax.add_patch(c)
+
+    def fill_rect(self, xy, width, height, color, zorder):
+        rect = RectDataUnit(xy=xy, width=width, height=height,
+                            fc=color, ec=None, lw=None, zorder=zorder)
+        self.ax.add_patch(rect)
+
+    def fill_polygon(self, x, y, color, zorder):
+        p = patches.Polygon(np.column_stack([x, y]), closed=True,
+                            fc=color, ec=None, zorder=zorder)
+        self.ax.add_patch(p)
+
+    def strokes(self, segments, w, color, zorder):
+        # one artist per string
+        c = LineCollectionDataUnits(
+            [np.column_stack(xy) for xy in chains(segments)], colors=color,
+            linewidths=w, capstyle='round', joinstyle='round', zorder=zorder)
+        self.ax.add_collection(c)
+
+    def arc(self, xy, r, theta1, theta2, w, color, zorder):
+        arc = ArcDataUnit(xy, r*2, r*2, theta1=theta1, theta2=theta2,
+                          linewidth=w, color=color, zorder=zorder)
+        self.ax.add_patch(arc)
+
+    def save(self, figpath, title='', format=None):
+        with stage('flush'):
+            self.flush()
+        with stage('autoscale'):
+            self.ax.axis('scaled')
+            self.ax.set_aspect('equal')
+        self.ax.set_title(title)
+        # no timestamp, so that reruns and parallel runs write identical files
+        with stage('savefig'):
+            self.ax.figure.savefig(
+                figpath, format=format,
+                metadata={'Date': None} if format in (None, 'svg') else None)
+        # the aspect is applied while drawing, the transform is final now
+        self.page = page_transform(self.ax)
+        self.close()
+
+
+class ArtistBatch(AxesCanvas):
+    """Collect primitives and emit them as a few collection artists
+
+    The primitives are grouped by z-order (i.e. layer) and one collection
+    per group is added to the axes on `flush`. Arcs are tessellated into
+    polylines and join the line collections. Linewidths stay in data
+    units.
+    """
+
+    def __init__(self, ax: plt.Axes = None):
+        super().__init__(ax)
+        # zorder -> filled patches
+        self.fills: Dict[float, List[patches.Patch]] = defaultdict(list)
+        # zorder -> stroked circles
+        self.outlines: Dict[float, List[patches.Patch]] = defaultdict(list)
+        self.outline_widths: Dict[float, List[float]] = defaultdict(list)
+        # zorder -> [x, y, r, theta1, theta2, linewidth, color]
+        self.arcs: Dict[float, List[tuple]] = defaultdict(list)
+        # (zorder, capstyle) -> [polyline, color, linewidth]
+        self.lines: Dict[Tuple[float, str], List[list]] = defaultdict(
+            lambda: [[], [], []])
+        self.n_primitives = 0
+
+    def line(self, x, y, w, color, zorder, capstyle='projecting'):
+        segs, colors, widths = self.lines[(zorder, capstyle)]
+        segs.append(np.column_stack([x, y]))
+        colors.append(color)
+        widths.append(w)
+        self.n_primitives += 1
+
+    def strokes(self, segments, w, color, zorder):
+        segs, colors, widths = self.lines[(zorder, 'round')]
+        n = len(segs)
+        segs.extend(np.column_stack(xy) for xy in chains(segments))
+        colors.extend([color]*(len(segs) - n))
+        widths.extend([w]*(len(segs) - n))
+        self.n_primitives += 1
+
+    def circle(self, xy, r, w, color, zorder):
+        self.outlines[zorder].append(
+            patches.Circle(xy=xy, radius=r, ec=color, fill=False))
+        self.outline_widths[zorder].append(w)
+        self.n_primitives += 1
+
+    def fill_circle(self, xy, r, color, zorder):
+        self.fills[zorder].append(patches.Circle(xy=xy, radius=r, fc=color))
+        self.n_primitives += 1
+
+    def fill_rect(self, xy, width, height, color, zorder):
+        self.fills[zorder].append(
+            patches.Rectangle(xy=xy, width=width, height=height, fc=color))
+        self.n_primitives += 1
+
+    def fill_polygon(self, x, y, color, zorder):
+        self.fills[zorder].append(
+            patches.Polygon(np.column_stack([x, y]), closed=True, fc=color))
+        self.n_primitives += 1
+
+    def arc(self, xy, r, theta1, theta2, w, color, zorder):
+        self.arcs[zorder].append((xy[0], xy[1], r, theta1, theta2, w, color))
+        self.n_primitives += 1
+
+    def flush(self) -> int:
+        """Add the collected primitives to the axes as collections
+
+        Returns:
+            int: number of collection artists added
+        """
+        for z, arcs in self.arcs.items():
+            x, y, r, t1, t2, widths, colors = zip(*arcs)
+            segs, cs, ws = self.lines[(z, 'butt')]
+            segs.extend(tessellate_arcs(x, y, r, t1, t2))
+            cs.extend(colors)
+            ws.extend(widths)
+        self.arcs.clear()
+
+        n = 0
+        zorders = set(self.fills) | set(self.outlines) | \
+            set(z for z, _ in self.lines)
+        for z in sorted(zorders):
+            ps = self.fills.get(z)
+            if ps:
+                c = PatchCollectionDataUnit(
+                    ps, facecolors=[p.get_facecolor() for p in ps],
+                    edgecolors='none', linewidths=0, zorder=z)
+                self.ax.add_collection(c)
+                n += 1
+
+            ps = self.outlines.get(z)
+            if ps:
+                c = PatchCollectionDataUnit(
+                    ps, facecolors='none',
+                    edgecolors=[p.get_edgecolor() for p in ps],
+                    linewidths=self.outline_widths[z], zorder=z)
+                self.ax.add_collection(c)
+                n += 1
+
+            for (zz, capstyle), (segs, colors, widths) in self.lines.items():
+                if zz != z:
+                    continue
+                c = LineCollectionDataUnits(
+                    segs, colors=colors, linewidths=widths,
+                    capstyle=capstyle, joinstyle='round', zorder=z)
+                self.ax.add_collection(c)
+                n += 1
+
+        self.fills.clear()
+        self.outlines.clear()
+        self.outline_widths.clear()
+        self.lines.clear()
+        return n
+
+
+class TileCanvas(ArtistBatch):
+    """Borderless square raster of a fixed region, e.g. a map tile
+
+    Args:
+        bounds (Tuple[float, float, float, float]): xmin, ymin, xmax, ymax
+            of the region in data units
+        size (int, optional): edge of the image [px]. Defaults to 256.
+    """
+
+    def __init__(self, bounds: Tuple[float, float, float, float],
+                 size: int = 256):
+        dpi = 100
+        pool = figure_pool((size/dpi, size/dpi), dpi, (0, 0, 1, 1))
+        ax = pool.acquire()
+        ax.set_axis_off()
+        ax.set_xlim(bounds[0], bounds[2])
+        ax.set_ylim(bounds[1], bounds[3])
+        super().__init__(ax)
+        self.pool = pool
+
+    def save(self, figpath, title='', format=None):
+        with stage('flush'):
+            self.flush()
+        with stage('savefig'):
+            self.ax.figure.savefig(figpath, format=format,
+                                   dpi=self.ax.figure.dpi,
+                                   metadata={'Software': None})
+        self.close()
+
+
+class SheetCanvas(ArtistBatch):
+    """Borderless page of a fixed region at a fixed scale, e.g. a sheet
+
+    The page has the size of the region and shows neither axes nor a
+    title.
+
+    Args:
+        bounds (Tuple[float, float, float, float]): xmin, ymin, xmax, ymax
+            of the region in data units
+        scale (float): pt per data unit
+    """
+
+    def __init__(self, bounds: Tuple[float, float, float, float],
+                 scale: float):
+        # one pool for all sheets, the figure is resized per sheet
+        pool = figure_pool(rect=(0, 0, 1, 1))
+        ax = pool.acquire()
+        ax.figure.set_size_inches((bounds[2] - bounds[0])*scale/72.,
+                                  (bounds[3] - bounds[1])*scale/72.)
+        ax.set_axis_off()
+        ax.set_xlim(bounds[0], bounds[2])
+        ax.set_ylim(bounds[1], bounds[3])
+        super().__init__(ax)
+        self.pool = pool
+
+    def save(self, figpath, title='', format=None):
+        with stage('flush'):
+            self.flush()
+        with stage('savefig'):
+            self.ax.figure.savefig(
+                figpath, format=format,
+                metadata={'Date': None} if format in (None, 'svg') else None)
+        self.page = page_transform(self.ax)
+        self.close()
+
+
+def figure_canvas(batch: bool = False) -> Canvas:
+    """Canvas on the pooled figure of this process
+
+    Args:
+        batch (bool, optional): draw one collection per layer instead of
+            one artist per primitive. Defaults to False.
+    """
+    return ArtistBatch() if batch else AxesCanvas()
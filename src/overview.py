@@ -0,0 +1,150 @@
+import json
+import math
+import os
+from typing import Dict, List, Tuple
+
+from colorful_logger import get_colorful_logger
+from EagleDraw import (GeometryCache, LayerTable, RenderOptions,
+                       new_canvas, save_geometry)
+from geometry_ir import Geometry, GeometryBuilder, concatenate
+from profiler import count_glyph
+from vector_font import glyph_table
+
+logger = get_colorful_logger(__name__)
+
+CELL = 10.0  # mm, side of the square an item is scaled into
+MARGIN = 0.5  # mm between an item and the border of its cell
+LABEL_HEIGHT = 2.0  # mm below each cell for the name of the item
+LABEL_SIZE = 1.0
+LABEL_LAYER = 95
+FRAME_WIDTH = 0.05
+ASPECT = 4/3  # of the grid
+SCALE = 3*72/25.4  # pt per mm, the sheet is drawn at 3:1
+
+
+def grid_shape(n: int) -> Tuple[int, int]:
+    """Rows and columns of a grid of n cells of about `ASPECT`"""
+    cols = max(1, math.ceil(math.sqrt(n*ASPECT*(CELL + LABEL_HEIGHT)/CELL)))
+    return math.ceil(n/cols), cols
+
+
+def _label(builder: GeometryBuilder, layers: LayerTable, s: str, x: float,
+           y: float):
+    table = glyph_table()
+    w = 0.2*LABEL_SIZE/5.0
+    # long names shrink to the width of their cell
+    size = min(LABEL_SIZE, (CELL - MARGIN)/max(table.extent(s), 1e-9))
+    segments, _ = table.layout(s, size, w, 'top-center')
+    count_glyph(len(s))
+    segments[:, [0, 2]] += x
+    segments[:, [1, 3]] += y
+    layer = layers[LABEL_LAYER]
+    builder.strokes(segments, w, layer.hex, layer.zorder)
+
+
+def compose_overview(kind: str, names: List[str], cache: GeometryCache,
+                     layers: LayerTable) -> Tuple[Geometry, List[Dict]]:
+    """Grid of the items of a library, each scaled into its cell
+
+    The cached geometries are scaled and moved into their cells, row by
+    row in library order, and joined into one geometry with the names
+    below the cells.
+
+    Args:
+        kind (str): `packages` or `symbols`
+        names (List[str]): items in grid order
+        cache (GeometryCache): geometries of the items
+        layers (LayerTable): layer table of the drawing
+
+    Returns:
+        Tuple[Geometry, List[Dict]]: the sheet and, per cell, its index,
+            row, column, item name, image path and `sheet_box` (xmin,
+            ymin, xmax, ymax) in sheet coordinates
+    """
+    rows, cols = grid_shape(len(names))
+    parts = []
+    cells = []
+    labels = GeometryBuilder()
+    inner = CELL - 2*MARGIN
+    for i, name in enumerate(names):
+        row, col = divmod(i, cols)
+        x0 = col*CELL
+        y1 = -row*(CELL + LABEL_HEIGHT)
+        box = (x0, y1 - CELL, x0 + CELL, y1)
+        cells.append({'index': i, 'row': row, 'col': col, 'name': name,
+                      'path': f'{kind}/{name}.svg', 'sheet_box': box})
+        # the frames span the grid, so the sheet has the extent of the grid
+        layer = layers[LABEL_LAYER]
+        labels.line([x0, x0 + CELL, x0 + CELL, x0, x0],
+                    [y1, y1, y1 - CELL - LABEL_HEIGHT,
+                     y1 - CELL - LABEL_HEIGHT, y1],
+                    FRAME_WIDTH, layer.hex, layer.zorder)
+        _label(labels, layers, name, x0 + 0.5*CELL, y1 - CELL)
+        geometry = cache.lookup(kind, name)
+        if geometry is None or len(geometry) == 0:
+            continue
+        gx0, gy0, gx1, gy1 = geometry.bounds()
+        k = inner/max(gx1 - gx0, gy1 - gy0, 1e-9)
+        parts.append(geometry.scaled(
+            k, x0 + 0.5*CELL - k*0.5*(gx0 + gx1),
+            y1 - 0.5*CELL - k*0.5*(gy0 + gy1)))
+    parts.append(labels.geometry())
+    return concatenate(parts), cells
+
+
+def render_overview(kind: str, names: List[str], cache: GeometryCache,
+                    figpath: str, options: RenderOptions = RenderOptions(),
+                    sink=None) -> str:
+    """Draw the overview sheet of a library and save it with its cell map
+
+    The sheet is drawn in one pass like a board, one collection per
+    layer, on a page of the size of the grid at `SCALE` without axes or
+    title. The cell map, see `compose_overview`, gives the `box` (left,
+    top, right, bottom) of every cell in pt from the top left corner of
+    the page, the user units of the svg viewBox, next to the size of the
+    page. It is saved next to the sheet as `<figpath without .svg>.json`,
+    added to an archive sink or to the index entry of the pdf page.
+
+    Args:
+        kind (str): `packages` or `symbols`
+        names (List[str]): items in grid order
+        cache (GeometryCache): geometries of the items
+        figpath (str): output path of the sheet
+        options (RenderOptions, optional): backend and its settings
+        sink (optional): where the sheet goes instead of `figpath`.
+            Defaults to None.
+
+    Returns:
+        str: output path
+    """
+    sheet, cells = compose_overview(kind, names, cache, cache.layers)
+    rows, cols = grid_shape(len(names))
+    title = f'{len(names)} {kind}'
+    options = options._replace(batch=True)
+    # the grid and the half of the frames outside of it
+    region = (-FRAME_WIDTH, -rows*(CELL + LABEL_HEIGHT) - FRAME_WIDTH,
+              cols*CELL + FRAME_WIDTH, FRAME_WIDTH)
+    canvas = new_canvas(options, region, SCALE)
+    save_geometry(sheet, figpath, 'overview', title, options, sink=sink,
+                  canvas=canvas)
+
+    page = canvas.page
+    for cell in cells:
+        cell['box'] = [round(v, 2) for v in page.box(*cell['sheet_box'])]
+    cellmap = {'kind': kind, 'rows': rows, 'cols': cols, 'cell': CELL,
+               'label_height': LABEL_HEIGHT, 'bounds': sheet.bounds(),
+               'page': [round(page.width, 2), round(page.height, 2)],
+               'cells': cells}
+    mappath = os.path.splitext(figpath)[0] + '.json'
+    data = json.dumps(cellmap, indent=1).encode('utf-8')
+    if hasattr(sink, 'describe'):
+        # a pdf has no files, its index describes the pages
+        sink.describe(figpath, {'map': cellmap})
+    elif sink is not None:
+        sink.write(mappath, data, 'overview', title)
+    else:
+        os.makedirs(os.path.dirname(mappath) or '.', exist_ok=True)
+        with open(mappath, 'wb') as f:
+            f.write(data)
+    logger.debug(f'save {figpath}')
+    return figpath
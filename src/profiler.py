@@ -0,0 +1,197 @@
+import contextlib
+import functools
+import json
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from colorful_logger import get_colorful_logger
+
+logger = get_colorful_logger(__name__)
+
+# profiler of the running `profiling` block, None when disabled
+_active: 'Profiler' = None
+
+
+class Profiler(object):
+    """Wall times and counters of a rendering run
+
+    `stages` are the steps of the pipeline (xml_parse, glyph_load,
+    geometry, draw, flush, autoscale, savefig, ...), `functions` the
+    draw_* functions. Function times include the functions they call.
+    """
+
+    def __init__(self):
+        self.t_start = time.perf_counter()
+        self.stages: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+        self.functions: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+        self.items: List[dict] = []
+        self.layers: Dict[int, int] = defaultdict(int)
+        self.glyphs = 0
+        self.bytes_written = 0
+        self.bytes_saved = 0
+
+    def add(self, table: Dict[str, List[float]], name: str, seconds: float):
+        entry = table[name]
+        entry[0] += 1
+        entry[1] += seconds
+
+    def add_item(self, kind: str, name: str, seconds: float, path: str,
+                 nbytes: int, layers: Dict[int, int], saved: int = 0):
+        """Record a rendered item
+
+        Args:
+            kind (str): `packages` or `symbols`
+            name (str): item name
+            seconds (float): wall time of the item
+            path (str): output path
+            nbytes (int): size of the output
+            layers (Dict[int, int]): primitives per layer number
+            saved (int, optional): bytes saved by compacting the output.
+                Defaults to 0.
+        """
+        self.items.append({'kind': kind, 'name': name, 'seconds': seconds,
+                           'path': path, 'bytes': nbytes,
+                           'bytes_saved': saved,
+                           'primitives': sum(layers.values())})
+        self.bytes_written += nbytes
+        self.bytes_saved += saved
+        for number, n in layers.items():
+            self.layers[int(number)] += int(n)
+
+    def state(self) -> dict:
+        """Counters without the totals, to send them between processes"""
+        return {'stages': dict(self.stages),
+                'functions': dict(self.functions),
+                'items': self.items,
+                'layers': dict(self.layers),
+                'glyphs': self.glyphs}
+
+    def merge(self, state: dict):
+        """Add the counters of another profiler, e.g. of a worker"""
+        for table, other in ((self.stages, state['stages']),
+                             (self.functions, state['functions'])):
+            for name, (calls, seconds) in other.items():
+                table[name][0] += calls
+                table[name][1] += seconds
+        for item in state['items']:
+            self.items.append(item)
+            self.bytes_written += item['bytes']
+            self.bytes_saved += item['bytes_saved']
+        for number, n in state['layers'].items():
+            self.layers[int(number)] += n
+        self.glyphs += state['glyphs']
+
+    def report(self, slowest: int = 10) -> dict:
+        """Machine readable report
+
+        Args:
+            slowest (int, optional): number of slowest items to list.
+                Defaults to 10.
+
+        Returns:
+            dict: report
+        """
+        def table(t):
+            return {name: {'calls': int(calls), 'seconds': seconds}
+                    for name, (calls, seconds) in sorted(t.items())}
+
+        items = sorted(self.items, key=lambda i: i['seconds'], reverse=True)
+        return {
+            'seconds': time.perf_counter() - self.t_start,
+            'stages': table(self.stages),
+            'functions': table(self.functions),
+            'items': {'count': len(self.items),
+                      'seconds': sum(i['seconds'] for i in self.items),
+                      'slowest': items[:slowest]},
+            'layers': {str(k): v for k, v in sorted(self.layers.items())},
+            'primitives': sum(self.layers.values()),
+            'glyphs': self.glyphs,
+            'bytes_written': self.bytes_written,
+            'bytes_saved': self.bytes_saved,
+        }
+
+    def summary(self, report: dict) -> str:
+        stages = ', '.join(f'{name} {s["seconds"]:.2f} s'
+                           for name, s in report['stages'].items())
+        line = f'profile: {report["items"]["count"]} items in ' \
+            f'{report["seconds"]:.2f} s ({stages}), ' \
+            f'{report["primitives"]} primitives, {report["glyphs"]} glyphs, ' \
+            f'{report["bytes_written"]/1e6:.2f} MB written'
+        if report['bytes_saved'] > 0:
+            line += f' ({report["bytes_saved"]/1e6:.2f} MB saved by compacting)'
+        slowest = report['items']['slowest']
+        if len(slowest) > 0:
+            line += f', slowest {slowest[0]["name"]} ' \
+                f'{slowest[0]["seconds"]:.2f} s'
+        return line
+
+
+def active_profiler() -> 'Profiler':
+    """Profiler of the running `profiling` block, or None"""
+    return _active
+
+
+@contextlib.contextmanager
+def profiling(path: str = None, slowest: int = 10):
+    """Profile the rendering inside the block
+
+    Args:
+        path (str, optional): where to write the json report. Defaults to
+            None, i.e. no file.
+        slowest (int, optional): number of slowest items in the report.
+            Defaults to 10.
+
+    Yields:
+        Profiler: the profiler
+    """
+    global _active
+    previous = _active
+    _active = Profiler()
+    try:
+        yield _active
+    finally:
+        p = _active
+        _active = previous
+        if path is not None:
+            report = p.report(slowest)
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=1)
+            logger.info(p.summary(report))
+            logger.info(f'write {path}')
+
+
+@contextlib.contextmanager
+def _timed_stage(p: Profiler, name: str):
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        p.add(p.stages, name, time.perf_counter() - t)
+
+
+def stage(name: str):
+    """Context manager that times a pipeline stage while profiling"""
+    if _active is None:
+        return contextlib.nullcontext()
+    return _timed_stage(_active, name)
+
+
+def profiled(func):
+    """Time the calls of a function while profiling"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        p = _active
+        if p is None:
+            return func(*args, **kwargs)
+        t = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            p.add(p.functions, func.__name__, time.perf_counter() - t)
+    return wrapper
+
+
+def count_glyph(n: int = 1):
+    if _active is not None:
+        _active.glyphs += n
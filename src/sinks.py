@@ -0,0 +1,298 @@
+import io
+import json
+import os
+import tarfile
+import threading
+import zipfile
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+from canvas import Canvas
+from colorful_logger import get_colorful_logger
+
+logger = get_colorful_logger(__name__)
+
+# `dir` writes a file per item, the default
+SINKS = ('dir', 'zip', 'tar', 'pdf')
+INDEX_NAME = 'index.json'
+
+
+class MemorySink(object):
+    """Keeps the drawing of an item in memory, e.g. to send it from a worker"""
+    in_worker = True
+    writes_files = False
+
+    def __init__(self):
+        self.data: bytes = None
+
+    def save(self, canvas: Canvas, figpath: str, kind: str, name: str) -> int:
+        buf = io.BytesIO()
+        canvas.save(buf, title=name, format='svg')
+        self.data = buf.getvalue()
+        return len(self.data)
+
+    def write(self, figpath: str, data: bytes, kind: str, name: str) -> int:
+        self.data = data
+        return len(data)
+
+
+class ArchiveSink(object):
+    """Every drawing of a library in one uncompressed zip or tar archive
+
+    Entries are appended as the items finish, under the paths they would
+    have in the output directory, e.g. `packages/R0603.svg`. The index,
+    `index.json`, is the last entry and lists path, kind, name and size
+    of every drawing.
+
+    Args:
+        path (str): path of the archive
+        dirpath (str): output directory of the library, entry paths are
+            relative to it
+        fmt (str, optional): `zip` or `tar`. Defaults to 'zip'.
+    """
+    # items can be rendered to bytes in the worker processes
+    in_worker = True
+    writes_files = False
+
+    def __init__(self, path: str, dirpath: str, fmt: str = 'zip'):
+        self.path = path
+        self.dirpath = dirpath
+        self.fmt = fmt
+        self.index: List[Dict] = []
+        if fmt == 'zip':
+            self.archive = zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED)
+        else:
+            self.archive = tarfile.open(path, 'w')
+
+    def save(self, canvas: Canvas, figpath: str, kind: str, name: str) -> int:
+        """Write a drawing to the archive
+
+        Returns:
+            int: size of the entry
+        """
+        memory = MemorySink()
+        memory.save(canvas, figpath, kind, name)
+        return self.write(figpath, memory.data, kind, name)
+
+    def write(self, figpath: str, data: bytes, kind: str, name: str) -> int:
+        """Add an entry, e.g. a drawing rendered by a worker"""
+        relpath = os.path.relpath(figpath, self.dirpath).replace(os.sep, '/')
+        self._add(relpath, data)
+        self.index.append({'path': relpath, 'kind': kind, 'name': name,
+                           'bytes': len(data)})
+        return len(data)
+
+    def _add(self, relpath: str, data: bytes):
+        if self.fmt == 'zip':
+            # fixed timestamps, so that reruns write identical archives
+            info = zipfile.ZipInfo(relpath, date_time=(1980, 1, 1, 0, 0, 0))
+            self.archive.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(relpath)
+            info.size = len(data)
+            self.archive.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        self._add(INDEX_NAME, json.dumps({'items': self.index},
+                                         indent=1).encode('utf-8'))
+        self.archive.close()
+        logger.info(f'write {len(self.index)} drawings to {self.path}')
+
+
+class PdfSink(object):
+    """Every drawing of a library as a page of one pdf
+
+    Pages are appended as the items finish. The pages are drawn by
+    matplotlib in the process that holds the file, the index of the pages
+    goes to `<path>.json`.
+
+    Args:
+        path (str): path of the pdf
+        dirpath (str): output directory of the library, the index lists
+            the paths the drawings would have in it
+    """
+    # pages are drawn where the file is open, workers send the geometry
+    in_worker = False
+    writes_files = False
+
+    def __init__(self, path: str, dirpath: str):
+        from matplotlib.backends.backend_pdf import PdfPages
+
+        self.path = path
+        self.dirpath = dirpath
+        self.index: List[Dict] = []
+        # no timestamp, so that reruns write identical files
+        self.pages = PdfPages(path, metadata={'CreationDate': None})
+
+    def save(self, canvas: Canvas, figpath: str, kind: str, name: str) -> int:
+        """Append a drawing as a page
+
+        Returns:
+            int: 0, pages share the resources of the file and have no size
+                of their own
+        """
+        canvas.save(self.pages, title=name, format='pdf')
+        relpath = os.path.relpath(figpath, self.dirpath).replace(os.sep, '/')
+        self.index.append({'page': len(self.index) + 1, 'path': relpath,
+                           'kind': kind, 'name': name})
+        return 0
+
+    def describe(self, figpath: str, fields: Dict):
+        """Add fields to the index entry of a page, e.g. a cell map"""
+        relpath = os.path.relpath(figpath, self.dirpath).replace(os.sep, '/')
+        for entry in reversed(self.index):
+            if entry['path'] == relpath:
+                entry.update(fields)
+                return
+        raise KeyError(f'no page for {relpath}')
+
+    def close(self):
+        self.pages.close()
+        with open(self.path + '.json', 'w') as f:
+            json.dump({'pages': self.index}, f, indent=1)
+        logger.info(f'write {len(self.index)} pages to {self.path}')
+
+
+class WriteQueue(object):
+    """Files written by a background thread while the next items are drawn
+
+    `put` blocks while `depth` files or `max_bytes` are waiting, so that
+    drawing cannot run away from the disk. The file being written does
+    not count, it leaves the queue when the thread takes it, so even a
+    depth of 1 lets the next file wait while one is written. A file
+    larger than `max_bytes` is still queued once the queue is empty. A
+    file that cannot be written is logged and the queue goes on; `close`
+    raises once every file was tried.
+
+    Args:
+        depth (int, optional): files waiting at most. Defaults to 8.
+        max_bytes (int, optional): bytes waiting at most.
+            Defaults to 64 MB.
+    """
+
+    def __init__(self, depth: int = 8, max_bytes: int = 64*2**20):
+        self.depth = max(1, depth)
+        self.max_bytes = max_bytes
+        self.cond = threading.Condition()
+        # path and data of the waiting files
+        self.files: Deque[Tuple[str, bytes]] = deque()
+        self.nbytes = 0
+        self.writing: str = None  # path of the file being written
+        self.errors: List[Tuple[str, str]] = []
+        self.closed = False
+        self.thread: threading.Thread = None
+
+    def put(self, path: str, data: bytes):
+        with self.cond:
+            if self.closed:
+                raise ValueError('write queue is closed')
+            while len(self.files) > 0 and (
+                    len(self.files) >= self.depth or
+                    self.nbytes + len(data) > self.max_bytes):
+                self.cond.wait()
+            self.files.append((path, data))
+            self.nbytes += len(data)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run,
+                                               name='write-queue',
+                                               daemon=True)
+                self.thread.start()
+            self.cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while len(self.files) == 0 and not self.closed:
+                    self.cond.wait()
+                if len(self.files) == 0:
+                    return
+                path, data = self.files.popleft()
+                self.nbytes -= len(data)
+                self.writing = path
+                self.cond.notify_all()
+            try:
+                # never write through a hardlink into the render store
+                if os.path.lexists(path):
+                    os.remove(path)
+                with open(path, 'wb') as f:
+                    f.write(data)
+            except OSError as e:
+                logger.error(f'cannot write {path}: {e}')
+                self.errors.append((path, str(e)))
+            with self.cond:
+                self.writing = None
+                self.cond.notify_all()
+
+    def flush(self):
+        """Wait until every queued file is written"""
+        with self.cond:
+            while len(self.files) > 0 or self.writing is not None:
+                self.cond.wait()
+
+    def close(self):
+        """Write the remaining files and stop the thread
+
+        Raises:
+            OSError: if files could not be written
+        """
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if len(self.errors) > 0:
+            path, message = self.errors[0]
+            raise OSError(f'{len(self.errors)} files could not be written, '
+                          f'first {path}: {message}')
+
+
+class QueuedFiles(object):
+    """Drawings of a library as files, written by a `WriteQueue`
+
+    The layout is that of the output directory without a sink, only the
+    writing moves to the background. `close` waits for the queue.
+
+    Args:
+        queue (WriteQueue): queue shared by the libraries of a run
+    """
+    in_worker = True
+    writes_files = True
+
+    def __init__(self, queue: WriteQueue):
+        self.queue = queue
+
+    def save(self, canvas: Canvas, figpath: str, kind: str, name: str) -> int:
+        memory = MemorySink()
+        memory.save(canvas, figpath, kind, name)
+        return self.write(figpath, memory.data, kind, name)
+
+    def write(self, figpath: str, data: bytes, kind: str, name: str) -> int:
+        self.queue.put(figpath, data)
+        return len(data)
+
+    def close(self):
+        self.queue.flush()
+
+
+def open_sink(sink: str, dirpath: str, queue: WriteQueue = None):
+    """Sink of the drawings of a library
+
+    The archive or pdf is written next to the output directory of the
+    library, e.g. `imgs/lib.zip` for `imgs/lib`.
+
+    Args:
+        sink (str): one of `SINKS`
+        dirpath (str): output directory of the library
+        queue (WriteQueue, optional): writes the files of `dir` in the
+            background. Defaults to None.
+
+    Returns:
+        the sink, None for `dir` without a queue
+    """
+    if sink == 'dir':
+        return QueuedFiles(queue) if queue is not None else None
+    path = os.path.normpath(dirpath) + f'.{sink}'
+    if sink == 'pdf':
+        return PdfSink(path, dirpath)
+    return ArchiveSink(path, dirpath, sink)
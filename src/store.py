@@ -0,0 +1,136 @@
+import json
+import os
+import shutil
+from typing import Dict, List, Tuple
+
+from colorful_logger import get_colorful_logger
+
+logger = get_colorful_logger(__name__)
+
+
+class RenderStore(object):
+    """Rendered items by digest, shared by every library of an output directory
+
+    Each unique item (see `item_digest`) is rendered once and kept in
+    `.store/<xx>/<digest>.svg`. Its output paths are hardlinks to that file,
+    or copies where the file system has no hardlinks, and `index.json`
+    lists them per digest. The store persists across runs.
+
+    Args:
+        outputdir (str): output directory, paths in the index are
+            relative to it
+    """
+    dirname = '.store'
+    filename = 'index.json'
+
+    def __init__(self, outputdir: str):
+        self.outputdir = outputdir
+        self.root = os.path.join(outputdir, self.dirname)
+        self.path = os.path.join(self.root, self.filename)
+        # digest -> kind, name and output paths
+        self.items: Dict[str, dict] = {}
+        # output path -> digest
+        self.owners: Dict[str, str] = {}
+        # digest -> output path that renders it in this run
+        self.claims: Dict[str, str] = {}
+        # links to items that are not rendered yet, see `resolve`
+        self.deferred: List[Tuple[str, str, str, str]] = []
+        self.n_linked = 0
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    self.items = json.load(f)['items']
+            except (ValueError, KeyError) as e:
+                logger.warning(f'ignore broken render store index '
+                               f'{self.path}: {e}')
+        for item_digest, item in self.items.items():
+            for relpath in item['paths']:
+                self.owners[relpath] = item_digest
+
+    def blob(self, item_digest: str) -> str:
+        return os.path.join(self.root, item_digest[:2], item_digest + '.svg')
+
+    def _record(self, item_digest: str, figpath: str, kind: str, name: str):
+        relpath = os.path.relpath(figpath, self.outputdir)
+        previous = self.owners.get(relpath)
+        if previous is not None and previous != item_digest:
+            self.items[previous]['paths'].remove(relpath)
+        item = self.items.setdefault(
+            item_digest, {'kind': kind, 'name': name, 'paths': []})
+        if relpath not in item['paths']:
+            item['paths'].append(relpath)
+        self.owners[relpath] = item_digest
+
+    def link(self, item_digest: str, figpath: str, kind: str,
+             name: str) -> bool:
+        """Point an output path at the stored rendering of an item
+
+        Args:
+            item_digest (str): digest of the item
+            figpath (str): output path
+            kind (str): `packages` or `symbols`
+            name (str): item name
+
+        Returns:
+            bool: False if the item was never rendered, i.e. the caller
+                has to render it and `add` it. An item that another output
+                path of this run renders is linked on `resolve`.
+        """
+        blob = self.blob(item_digest)
+        if not os.path.exists(blob):
+            owner = self.claims.setdefault(item_digest, figpath)
+            if owner == figpath:
+                return False
+            self.deferred.append((item_digest, figpath, kind, name))
+            self.n_linked += 1
+            return True
+        if not (os.path.exists(figpath) and os.path.samefile(blob, figpath)):
+            if os.path.exists(figpath):
+                os.remove(figpath)
+            _link_or_copy(blob, figpath)
+        self._record(item_digest, figpath, kind, name)
+        self.n_linked += 1
+        return True
+
+    def add(self, item_digest: str, figpath: str, kind: str, name: str):
+        """Keep a rendered item, see `link`"""
+        self._record(item_digest, figpath, kind, name)
+        blob = self.blob(item_digest)
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            _link_or_copy(figpath, blob)
+
+    def resolve(self):
+        """Link the outputs of items that were rendered after their lookup"""
+        deferred, self.deferred = self.deferred, []
+        for item_digest, figpath, kind, name in deferred:
+            if not os.path.exists(self.blob(item_digest)):
+                logger.warning(f'{self.claims[item_digest]} was not '
+                               f'rendered, no link to {figpath}')
+                continue
+            self.link(item_digest, figpath, kind, name)
+            self.n_linked -= 1  # counted on the first lookup
+
+    def save(self):
+        # outputs removed since, e.g. by `Manifest.prune`, are forgotten
+        items = {}
+        for item_digest, item in self.items.items():
+            paths = [p for p in item['paths'] if os.path.exists(
+                os.path.join(self.outputdir, p))]
+            if len(paths) > 0:
+                items[item_digest] = dict(item, paths=paths)
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump({'items': items}, f, indent=1, sort_keys=True)
+
+    def duplicates(self) -> List[List[str]]:
+        """Output paths that share a rendering, one list per item"""
+        return [item['paths'] for item in self.items.values()
+                if len(item['paths']) > 1]
+
+
+def _link_or_copy(src: str, dst: str):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
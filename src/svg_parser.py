@@ -1,107 +1,239 @@
 import argparse
-from ast import parse
-from typing import Tuple
-import re
-import copy
+import math
 import os
-import sys
+import re
+from typing import List
 
 import xml.etree.ElementTree as ET
 import numpy as np
-import matplotlib.pyplot as plt
-
-
-def parse_tf(s):
-    # matrix(a,b,c,d,tx,ty)
-    t = re.findall(
-        r'matrix\(([\S]+?),([\S]+?),([\S]+?),([\S]+?),([\S]+?),([\S]+?)\)', s)
-    a, b, c, d, tx, ty = t[0]
-    mat = np.matrix([[float(a), float(c), float(tx)],
-                     [float(b), float(d), float(ty)],
-                     [0, 0, 1]
-                     ])
+
+SVG_NS = '{http://www.w3.org/2000/svg}'
+CURVE_SEGMENTS = 8  # chords per bezier curve
+
+_transform_re = re.compile(r'(matrix|translate|scale|rotate|skewX|skewY)'
+                           r'\s*\(([^)]*)\)')
+_path_re = re.compile(r'([MmLlHhVvZzCcSsQqTtAa])|'
+                      r'([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)')
+# number of arguments of each path command
+_n_args = {'m': 2, 'l': 2, 'h': 1, 'v': 1, 'z': 0,
+           'c': 6, 's': 4, 'q': 4, 't': 2, 'a': 7}
+
+
+def parse_tf(s: str) -> np.ndarray:
+    """parse a transform attribute
+
+    Args:
+        s (str): transform list, e.g. `matrix(a,b,c,d,tx,ty)` or
+            `translate(10 20) scale(2)`
+
+    Returns:
+        np.ndarray: 3x3 affine matrix of the whole list
+    """
+    mat = np.eye(3)
+    for name, args in _transform_re.findall(s):
+        v = [float(x) for x in re.split(r'[\s,]+', args.strip()) if x]
+        m = np.eye(3)
+        if name == 'matrix':
+            a, b, c, d, tx, ty = v
+            m[:2] = [[a, c, tx], [b, d, ty]]
+        elif name == 'translate':
+            m[0, 2] = v[0]
+            m[1, 2] = v[1] if len(v) > 1 else 0.0
+        elif name == 'scale':
+            m[0, 0] = v[0]
+            m[1, 1] = v[1] if len(v) > 1 else v[0]
+        elif name == 'rotate':
+            t = math.radians(v[0])
+            m[:2, :2] = [[math.cos(t), -math.sin(t)],
+                         [math.sin(t), math.cos(t)]]
+            if len(v) == 3:
+                # rotate(a, cx, cy) = translate(c) rotate(a) translate(-c)
+                cx, cy = v[1], v[2]
+                m[:2, 2] = [cx, cy] - m[:2, :2] @ [cx, cy]
+        elif name == 'skewX':
+            m[0, 1] = math.tan(math.radians(v[0]))
+        else:
+            m[1, 0] = math.tan(math.radians(v[0]))
+        # the list applies right to left
+        mat = mat @ m
     return mat
 
 
-def transform(pos, transforms=[]):
+def apply_transform(points: np.ndarray, mat: np.ndarray) -> np.ndarray:
+    """Transform points by an affine matrix
+
+    Args:
+        points (np.ndarray): shape (N, 2)
+        mat (np.ndarray): 3x3 affine matrix
+
+    Returns:
+        np.ndarray: transformed points, shape (N, 2)
+    """
+    return points @ mat[:2, :2].T + mat[:2, 2]
 
-    # print(f'transforms:\n{transforms}')
-    p = np.matrix([pos[0], pos[1], 1]).T
-    for tf in reversed(transforms):
-        p = tf @ p
-    return np.ravel(p)[0:2]
 
+def _bezier(p0, controls, p1, n: int = CURVE_SEGMENTS) -> List[np.ndarray]:
+    """Points of a bezier curve after p0
 
-def parse_node(s: str) -> Tuple:
-    """parse nodes in a path
+    A curve whose control points lie on the chord is a straight line and
+    gives its end point only.
+    """
+    p0 = np.asarray(p0, dtype=float)
+    p1 = np.asarray(p1, dtype=float)
+    cs = [np.asarray(c, dtype=float) for c in controls]
+    chord = p1 - p0
+    length = math.hypot(*chord)
+    flat = all(abs(chord[0]*(c - p0)[1] - chord[1]*(c - p0)[0])
+               <= 1e-9*max(length, 1.0)**2 for c in cs)
+    if flat:
+        return [p1]
+    t = np.linspace(0.0, 1.0, n + 1)[1:, None]
+    if len(cs) == 1:
+        c = cs[0]
+        pts = (1-t)**2*p0 + 2*(1-t)*t*c + t**2*p1
+    else:
+        c1, c2 = cs
+        pts = (1-t)**3*p0 + 3*(1-t)**2*t*c1 + 3*(1-t)*t**2*c2 + t**3*p1
+    return list(pts)
+
+
+def parse_path(d: str) -> List[np.ndarray]:
+    """parse the d attribute of a path
+
+    Supports the move, line, horizontal, vertical and close commands in
+    absolute and relative form. Quadratic and cubic bezier curves are
+    flattened into `CURVE_SEGMENTS` chords.
 
     Args:
-        s (str): body of the path's d attribute
+        d (str): body of the path's d attribute
 
     Returns:
-        Tuple: (symbol, positions)
+        List[np.ndarray]: subpaths with shape (N, 2)
     """
     # https://developer.mozilla.org/ja/docs/Web/SVG/Tutorial/Paths
-    sy = re.findall(r'[a-zA-Z ]', s)
-    l = re.split('[a-zA-Z ]', s)  # sprit with alphabet
-    pos = [p.split(',') for p in l[1:]]
+    tokens = _path_re.findall(d)
+    subpaths = []
+    points = []
+    cur = np.zeros(2)
+    start = np.zeros(2)
+    last_ctrl = None  # reflected by the smooth curve commands
+    cmd = None
+    i = 0
+    while i < len(tokens):
+        letter, number = tokens[i]
+        if letter:
+            cmd = letter
+            i += 1
+        elif cmd is None:
+            raise ValueError(f'path data must start with a command: {d}')
+        op = cmd.lower()
+        rel = cmd.islower()
+        n = _n_args[op]
+        args = [float(t[1]) for t in tokens[i:i+n]]
+        if len(args) < n or any(t[0] for t in tokens[i:i+n]):
+            raise ValueError(f'too few arguments for {cmd} in path: {d}')
+        i += n
+        ctrl = None
+
+        if op == 'm':
+            if len(points) > 1:
+                subpaths.append(points)
+            cur = cur + args if rel else np.array(args)
+            start = cur
+            points = [cur]
+            # further pairs are implicit line commands
+            cmd = 'l' if rel else 'L'
+        elif op == 'z':
+            if points:
+                points.append(start)
+                if len(points) > 1:
+                    subpaths.append(points)
+            cur = start
+            points = []
+            # a command after closepath starts from the subpath start
+            cmd = None
+        else:
+            if not points:
+                points = [cur]
+            if op == 'l':
+                end = cur + args if rel else np.array(args)
+                points.append(end)
+            elif op == 'h':
+                end = np.array([cur[0] + args[0] if rel else args[0], cur[1]])
+                points.append(end)
+            elif op == 'v':
+                end = np.array([cur[0], cur[1] + args[0] if rel else args[0]])
+                points.append(end)
+            elif op in 'cq':
+                v = np.array(args).reshape(-1, 2) + (cur if rel else 0)
+                controls, end = v[:-1], v[-1]
+                points.extend(_bezier(cur, controls, end))
+                ctrl = controls[-1]
+            elif op in 'st':
+                v = np.array(args).reshape(-1, 2) + (cur if rel else 0)
+                refl = 2*cur - last_ctrl if last_ctrl is not None else cur
+                controls = [refl] + list(v[:-1])
+                end = v[-1]
+                points.extend(_bezier(cur, controls, end))
+                ctrl = controls[-1]
+            else:
+                raise ValueError(f'unsupported path command {cmd}: {d}')
+            cur = end
+        last_ctrl = ctrl
+    if len(points) > 1:
+        subpaths.append(points)
+    return [np.array(p, dtype=float) for p in subpaths]
+
 
-    # convert str to float
-    for p in pos:
-        for i, x in enumerate(p):
-            p[i] = float(x)
+def seek_tree(tree: ET.Element, tf: np.ndarray = None,
+              paths: List[np.ndarray] = None) -> List[np.ndarray]:
+    """Collect transformed paths under an element
 
-    return sy, pos
+    The transforms of nested groups are composed once per group, and the
+    points of each path are transformed with a single matrix product.
 
+    Args:
+        tree (ET.Element): svg root or group
+        tf (np.ndarray, optional): 3x3 transform of `tree`. Defaults to
+            identity.
+        paths (List[np.ndarray], optional): list to append the paths to
 
-def seek_tree(tree: ET.ElementTree, tf=[], paths=[]):
+    Returns:
+        List[np.ndarray]: paths with shape (N, 2) in root coordinates
+    """
+    if tf is None:
+        tf = np.eye(3)
+    if paths is None:
+        paths = []
     for child in tree:
-        tf_c = copy.deepcopy(tf)
         tag = child.tag
         attr = child.attrib
-        # print(tag)
-        # print(attr)
-
+        tf_c = tf
         if 'transform' in attr:
-            if len(tf_c) == 0:
-                tf_c = [parse_tf(attr['transform'])]
-            else:
-                tf_c.append(parse_tf(attr['transform']))
+            tf_c = tf @ parse_tf(attr['transform'])
 
-        if tag == '{http://www.w3.org/2000/svg}g':
+        if tag == f'{SVG_NS}g':
             seek_tree(child, tf_c, paths)
-        elif tag == '{http://www.w3.org/2000/svg}path':
-            d = attr['d']
-            sy, positions = parse_node(d)
-            transformed_pos = [
-                transform(p, tf_c) for p in positions
-            ]
-            # print(f'#tf: {len(tf_c)}')
-            # print(f'transformed_pos: {transformed_pos}')
-            paths.append(transformed_pos)
-
-        else:
-            pass
-            # print(f'{tag}')
-            # print(f'tf: {tf_c}')
+        elif tag == f'{SVG_NS}path':
+            for p in parse_path(attr.get('d', '')):
+                paths.append(apply_transform(p, tf_c))
     return paths
 
 
 def show_text(filename: str):
+    import matplotlib.pyplot as plt
+
     tree = ET.parse(filename)
     root = tree.getroot()
 
     print(f'{root.tag}')
-    pathes = []
-    pathes = seek_tree(root, [], pathes)
+    pathes = seek_tree(root)
     print(f'#pathes: {len(pathes)}')
     print('---')
 
     fig, ax = plt.subplots()
     for p in pathes:
-        x = [xx[0] for xx in p]
-        y = [yy[1] for yy in p]
-        ax.plot(x, y)
+        ax.plot(p[:, 0], p[:, 1])
     ax.set_aspect('equal', adjustable='box')
     ax.set_xlim([0, 20])
     ax.set_ylim([20, 0])
@@ -109,12 +241,6 @@ def show_text(filename: str):
     img_path = os.path.join(os.path.dirname(__file__), f'../tmp/{b}.png')
     plt.savefig(img_path)
     print(f'save {img_path}')
-    # tf = parse_tf('matrix(1,0,0,1,210,30)')
-    # pp = transform([0, 0], [tf])
-    # print(f'pp: {pp}')
-
-    # print(parse_node('M7483,1883L7496,1883L7533,1993'))
-    # print(parse_node('M7456.92,1809.5L7534.08,1809.5'))
 
 
 if __name__ == '__main__':
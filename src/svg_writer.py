@@ -0,0 +1,270 @@
+import math
+from collections import defaultdict
+from typing import Dict, List, Tuple
+from xml.sax.saxutils import escape
+
+from canvas import Canvas, PageTransform, chains
+from geometry import arc_bounds
+
+# same page layout and dark theme as the matplotlib output
+FIG_WIDTH = 460.8  # pt, 6.4 inch
+FIG_HEIGHT = 345.6  # pt, 4.8 inch
+AXES_RECT = (0.125, 0.11, 0.9, 0.88)  # left, bottom, right, top
+MARGIN = 0.05
+FACECOLOR = '#2b2b2b'
+FOREGROUND = '#ffffff'
+FONT_FAMILY = 'DejaVu Sans, sans-serif'
+
+capstyles = {'projecting': 'square', 'round': 'round', 'butt': 'butt'}
+
+
+def fmt(v: float) -> str:
+    s = '%.4f' % v
+    s = s.rstrip('0').rstrip('.')
+    return '0' if s == '-0' else s
+
+
+def tick_step(span: float, nbins: int) -> float:
+    """Nice tick interval for a span, from the 1-2-2.5-5 series"""
+    if span <= 0:
+        return 1.0
+    raw = span/max(nbins, 1)
+    scale = 10**math.floor(math.log10(raw))
+    for m in (1, 2, 2.5, 5, 10):
+        if m*scale >= raw:
+            return m*scale
+    return 10*scale
+
+
+def tick_label(v: float, step: float) -> str:
+    digits = max(0, -math.floor(math.log10(step) + 1e-9))
+    if abs(step/10**math.floor(math.log10(step)) - 2.5) < 1e-9:
+        digits += 1
+    s = f'{v:.{digits}f}'
+    if float(s) == 0:
+        s = s.lstrip('-')
+    return s.replace('-', '−')
+
+
+class SvgCanvas(Canvas):
+    """Write primitives as svg elements without matplotlib
+
+    Elements are kept in data coordinates inside a group whose transform
+    maps the data box onto the axes, so that stroke widths stay in data
+    units. Painting order follows zorder like matplotlib.
+
+    Args:
+        bounds (Tuple[float, float, float, float], optional): xmin, ymin,
+            xmax, ymax of a fixed region, drawn on a page of its size
+            without axes and title, e.g. a sheet. Defaults to None, i.e.
+            the page layout of matplotlib around the drawing.
+        scale (float, optional): pt per data unit of the fixed region.
+            Defaults to None.
+    """
+
+    def __init__(self, bounds: Tuple[float, float, float, float] = None,
+                 scale: float = None):
+        self.bounds = bounds
+        self.scale = scale
+        # zorder -> svg elements
+        self.elements: Dict[float, List[str]] = defaultdict(list)
+        self.xmin = math.inf
+        self.xmax = -math.inf
+        self.ymin = math.inf
+        self.ymax = -math.inf
+        self.n_primitives = 0
+
+    def _extend(self, x0: float, y0: float, x1: float, y1: float):
+        self.xmin = min(self.xmin, x0)
+        self.xmax = max(self.xmax, x1)
+        self.ymin = min(self.ymin, y0)
+        self.ymax = max(self.ymax, y1)
+
+    def _add(self, zorder: float, element: str):
+        self.elements[zorder].append(element)
+        self.n_primitives += 1
+
+    def line(self, x, y, w, color, zorder, capstyle='projecting'):
+        x = [float(v) for v in x]
+        y = [float(v) for v in y]
+        self._extend(min(x), min(y), max(x), max(y))
+        points = ' '.join(f'{fmt(u)},{fmt(v)}' for u, v in zip(x, y))
+        self._add(zorder,
+                  f'<polyline points="{points}" stroke="{color}" '
+                  f'stroke-width="{fmt(w)}" '
+                  f'stroke-linecap="{capstyles[capstyle]}"/>')
+
+    def strokes(self, segments, w, color, zorder):
+        if len(segments) == 0:
+            return
+        self._extend(float(min(segments[:, 0].min(), segments[:, 2].min())),
+                     float(min(segments[:, 1].min(), segments[:, 3].min())),
+                     float(max(segments[:, 0].max(), segments[:, 2].max())),
+                     float(max(segments[:, 1].max(), segments[:, 3].max())))
+        # one path per string, one subpath per stroke
+        d = ''.join('M' + 'L'.join(f'{fmt(u)},{fmt(v)}' for u, v in zip(x, y))
+                    for x, y in chains(segments))
+        self._add(zorder,
+                  f'<path d="{d}" stroke="{color}" stroke-width="{fmt(w)}" '
+                  f'stroke-linecap="round"/>')
+
+    def circle(self, xy, r, w, color, zorder):
+        x, y = xy
+        self._extend(x-r, y-r, x+r, y+r)
+        self._add(zorder,
+                  f'<circle cx="{fmt(x)}" cy="{fmt(y)}" r="{fmt(r)}" '
+                  f'stroke="{color}" stroke-width="{fmt(w)}"/>')
+
+    def fill_circle(self, xy, r, color, zorder):
+        x, y = xy
+        self._extend(x-r, y-r, x+r, y+r)
+        self._add(zorder,
+                  f'<circle cx="{fmt(x)}" cy="{fmt(y)}" r="{fmt(r)}" '
+                  f'fill="{color}"/>')
+
+    def fill_rect(self, xy, width, height, color, zorder):
+        x, y = xy
+        self._extend(x, y, x+width, y+height)
+        self._add(zorder,
+                  f'<rect x="{fmt(x)}" y="{fmt(y)}" width="{fmt(width)}" '
+                  f'height="{fmt(height)}" fill="{color}"/>')
+
+    def fill_polygon(self, x, y, color, zorder):
+        x = [float(v) for v in x]
+        y = [float(v) for v in y]
+        self._extend(min(x), min(y), max(x), max(y))
+        points = ' '.join(f'{fmt(u)},{fmt(v)}' for u, v in zip(x, y))
+        self._add(zorder, f'<polygon points="{points}" fill="{color}"/>')
+
+    def arc(self, xy, r, theta1, theta2, w, color, zorder):
+        x, y = xy
+        span = (theta2 - theta1) % 360.0
+        if span == 0:
+            span = 360.0
+        # extent of the arc itself, not of the full circle
+        self._extend(*[float(b[0]) for b in
+                       arc_bounds(x, y, r, theta1, theta1 + span)])
+
+        def point(t):
+            t = math.radians(t)
+            return f'{fmt(x + r*math.cos(t))},{fmt(y + r*math.sin(t))}'
+
+        if span >= 360.0:
+            # a single svg arc cannot close on itself
+            d = f'M{point(theta1)}A{fmt(r)},{fmt(r)} 0 0 1 {point(theta1+180)}' \
+                f'A{fmt(r)},{fmt(r)} 0 0 1 {point(theta1)}'
+        else:
+            large = 1 if span > 180 else 0
+            d = f'M{point(theta1)}A{fmt(r)},{fmt(r)} 0 {large} 1 ' \
+                f'{point(theta1+span)}'
+        self._add(zorder,
+                  f'<path d="{d}" stroke="{color}" stroke-width="{fmt(w)}"/>')
+
+    def _view(self) -> Tuple[float, float, float, float, float]:
+        """Data limits and scale like `axis('scaled')` in matplotlib
+
+        Returns:
+            Tuple: xmin, ymin, k [pt/unit], box width, box height
+        """
+        xmin, xmax, ymin, ymax = self.xmin, self.xmax, self.ymin, self.ymax
+        if xmin > xmax:
+            xmin, xmax, ymin, ymax = 0.0, 1.0, 0.0, 1.0
+        dx = xmax - xmin
+        dy = ymax - ymin
+        if dx == 0:
+            dx = 1.0
+            xmin -= 0.5
+        if dy == 0:
+            dy = 1.0
+            ymin -= 0.5
+        xmin -= MARGIN*dx
+        ymin -= MARGIN*dy
+        dx *= 1 + 2*MARGIN
+        dy *= 1 + 2*MARGIN
+
+        left, bottom, right, top = AXES_RECT
+        aw = (right - left)*FIG_WIDTH
+        ah = (top - bottom)*FIG_HEIGHT
+        k = min(aw/dx, ah/dy)
+        return xmin, ymin, k, dx*k, dy*k
+
+    def _axes(self, xmin, ymin, k, bw, bh, title) -> List[str]:
+        """Frame, ticks and title around the data box"""
+        left, bottom, right, top = AXES_RECT
+        cx = 0.5*(left + right)*FIG_WIDTH
+        cy = FIG_HEIGHT - 0.5*(bottom + top)*FIG_HEIGHT
+        x0 = cx - 0.5*bw
+        y0 = cy - 0.5*bh
+        out = [f'<rect x="{fmt(x0)}" y="{fmt(y0)}" width="{fmt(bw)}" '
+               f'height="{fmt(bh)}" fill="none" stroke="{FOREGROUND}" '
+               f'stroke-width="0.8"/>']
+
+        ticks = []
+        labels = []
+        for axis, length in (('x', bw), ('y', bh)):
+            lo = xmin if axis == 'x' else ymin
+            step = tick_step(length/k, min(9, int(length/30)))
+            v = math.ceil(lo/step - 1e-9)*step
+            while v <= lo + length/k + 1e-9:
+                if axis == 'x':
+                    px = x0 + (v - lo)*k
+                    ticks.append(f'M{fmt(px)},{fmt(y0+bh)}v3.5')
+                    labels.append(
+                        f'<text x="{fmt(px)}" y="{fmt(y0+bh+17)}" '
+                        f'text-anchor="middle">{tick_label(v, step)}</text>')
+                else:
+                    py = y0 + bh - (v - lo)*k
+                    ticks.append(f'M{fmt(x0)},{fmt(py)}h-3.5')
+                    labels.append(
+                        f'<text x="{fmt(x0-7)}" y="{fmt(py+3.5)}" '
+                        f'text-anchor="end">{tick_label(v, step)}</text>')
+                v += step
+
+        out.append(f'<path d="{"".join(ticks)}" stroke="{FOREGROUND}" '
+                   f'stroke-width="0.8"/>')
+        out.append(f'<g fill="{FOREGROUND}" font-size="10" '
+                   f'font-family="{FONT_FAMILY}">')
+        out.extend(labels)
+        out.append(f'<text x="{fmt(cx)}" y="{fmt(y0-6)}" font-size="12" '
+                   f'text-anchor="middle">{escape(title)}</text>')
+        out.append('</g>')
+        return out
+
+    def save(self, figpath, title='', format=None):
+        if format not in (None, 'svg'):
+            raise ValueError(f'svg-native cannot write {format}')
+        if self.bounds is None:
+            width, height = FIG_WIDTH, FIG_HEIGHT
+            xmin, ymin, k, bw, bh = self._view()
+            left, bottom, right, top = AXES_RECT
+            x0 = 0.5*(left + right)*FIG_WIDTH - 0.5*bw
+            y1 = FIG_HEIGHT - 0.5*(bottom + top)*FIG_HEIGHT + 0.5*bh
+        else:
+            xmin, ymin, xmax, ymax = self.bounds
+            k = self.scale
+            width, height = (xmax - xmin)*k, (ymax - ymin)*k
+            x0, y1 = 0.0, height
+        # data -> page: scale, flip y and move the data box onto the axes
+        tf = f'matrix({fmt(k)} 0 0 {fmt(-k)} {fmt(x0 - xmin*k)} ' \
+            f'{fmt(y1 + ymin*k)})'
+        self.page = PageTransform(width, height, k, -k,
+                                  x0 - xmin*k, y1 + ymin*k)
+
+        lines = ['<?xml version="1.0" encoding="utf-8" standalone="no"?>',
+                 f'<svg xmlns="http://www.w3.org/2000/svg" version="1.1" '
+                 f'width="{fmt(width)}pt" height="{fmt(height)}pt" '
+                 f'viewBox="0 0 {fmt(width)} {fmt(height)}">',
+                 f'<rect width="100%" height="100%" fill="{FACECOLOR}"/>',
+                 f'<g transform="{tf}" fill="none" stroke-linejoin="round">']
+        for z in sorted(self.elements):
+            lines.extend(self.elements[z])
+        lines.append('</g>')
+        if self.bounds is None:
+            lines.extend(self._axes(xmin, ymin, k, bw, bh, title))
+        lines.append('</svg>')
+        text = '\n'.join(lines) + '\n'
+        if isinstance(figpath, str):
+            with open(figpath, 'w', encoding='utf-8') as f:
+                f.write(text)
+        else:
+            figpath.write(text.encode('utf-8'))
@@ -0,0 +1,220 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from colorful_logger import get_colorful_logger
+from geometry import arc_bounds
+from geometry_ir import DTYPES, Geometry, groups
+
+logger = get_colorful_logger(__name__)
+
+TILE_SIZE = 256  # px
+MIN_PIXELS = 1.0  # primitives smaller than this are dropped from a level
+
+
+def primitive_bounds(geometry: Geometry) -> Dict[str, np.ndarray]:
+    """Bounding boxes of the primitives, stroke widths included
+
+    Polygons are boxed per polygon, in the order of their ids.
+
+    Returns:
+        Dict[str, np.ndarray]: kind -> array (N, 4) of xmin, ymin, xmax, ymax
+    """
+    g = geometry
+    boxes = {}
+    for kind in ('wires', 'glyphs'):
+        a = getattr(g, kind)
+        h = 0.5*a['width']
+        boxes[kind] = np.column_stack([
+            np.minimum(a['x1'], a['x2']) - h, np.minimum(a['y1'], a['y2']) - h,
+            np.maximum(a['x1'], a['x2']) + h, np.maximum(a['y1'], a['y2']) + h])
+    a = g.arcs
+    h = 0.5*a['width']
+    x0, y0, x1, y1 = arc_bounds(a['x'], a['y'], a['r'], a['theta1'],
+                                a['theta2'])
+    boxes['arcs'] = np.column_stack([x0 - h, y0 - h, x1 + h, y1 + h])
+    for kind, r in (('circles', g.circles['r'] + 0.5*g.circles['width']),
+                    ('discs', g.discs['r']),
+                    ('pads', 0.5*g.pads['diameter'])):
+        a = getattr(g, kind)
+        boxes[kind] = np.column_stack([a['x'] - r, a['y'] - r,
+                                       a['x'] + r, a['y'] + r])
+    r = g.rects
+    boxes['rects'] = np.column_stack([r['x'], r['y'], r['x'] + r['width'],
+                                      r['y'] + r['height']])
+    v = g.polygons
+    boxes['polygons'] = np.array(
+        [[v['x'][i:j].min(), v['y'][i:j].min(),
+          v['x'][i:j].max(), v['y'][i:j].max()]
+         for i, j in groups(v['poly'])]).reshape(-1, 4)
+    return boxes
+
+
+class GridIndex(object):
+    """Uniform grid over the primitives of a geometry
+
+    The square `extent` is split into n x n cells, numbered from the top
+    left corner like map tiles. Each cell lists the primitives whose
+    bounding boxes intersect it.
+
+    Args:
+        boxes (Dict[str, np.ndarray]): see `primitive_bounds`
+        extent (Tuple[float, float, float]): xmin, ymax and edge length of
+            the indexed square
+        n (int): cells per edge
+        min_size (float, optional): primitives whose boxes are smaller in
+            both directions are left out. Defaults to 0.
+    """
+
+    def __init__(self, boxes: Dict[str, np.ndarray],
+                 extent: Tuple[float, float, float], n: int,
+                 min_size: float = 0.0):
+        x0, y1, edge = extent
+        self.n = n
+        cell = edge/n
+        # cell -> kind -> primitive indices
+        self.cells: Dict[Tuple[int, int], Dict[str, np.ndarray]] = {}
+        for kind, b in boxes.items():
+            idx = np.flatnonzero((b[:, 2] - b[:, 0] >= min_size) |
+                                 (b[:, 3] - b[:, 1] >= min_size))
+            b = b[idx]
+            ix0 = np.clip(np.floor((b[:, 0] - x0)/cell), 0, n-1).astype(int)
+            ix1 = np.clip(np.floor((b[:, 2] - x0)/cell), 0, n-1).astype(int)
+            iy0 = np.clip(np.floor((y1 - b[:, 3])/cell), 0, n-1).astype(int)
+            iy1 = np.clip(np.floor((y1 - b[:, 1])/cell), 0, n-1).astype(int)
+            wx = ix1 - ix0 + 1
+            counts = wx*(iy1 - iy0 + 1)
+            if counts.sum() == 0:
+                continue
+            # one (cell, primitive) pair per covered cell
+            owner = np.repeat(np.arange(len(b)), counts)
+            k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts,
+                                                    counts)
+            ix = ix0[owner] + k % wx[owner]
+            iy = iy0[owner] + k//wx[owner]
+            cell_ids = iy*n + ix
+            order = np.argsort(cell_ids, kind='stable')
+            cell_ids = cell_ids[order]
+            members = idx[owner[order]]
+            for i, j in groups(cell_ids):
+                c = int(cell_ids[i])
+                self.cells.setdefault((c % n, c//n), {})[kind] = members[i:j]
+
+    def query(self, ix: int, iy: int) -> Dict[str, np.ndarray]:
+        return self.cells.get((ix, iy), {})
+
+
+def take(geometry: Geometry, selection: Dict[str, np.ndarray]) -> Geometry:
+    """Subset of a geometry by primitive indices (polygon ids for polygons)"""
+    arrays = {}
+    for kind in DTYPES:
+        idx = selection.get(kind)
+        a = getattr(geometry, kind)
+        if idx is None:
+            arrays[kind] = a[:0]
+        elif kind == 'polygons':
+            starts = np.array([i for i, _ in groups(a['poly'])], dtype=int)
+            ids = a['poly'][starts[idx]]
+            arrays[kind] = a[np.isin(a['poly'], ids)]
+        else:
+            arrays[kind] = a[idx]
+    return Geometry(arrays, geometry.palette)
+
+
+# per-process geometry of the tile workers
+_worker_geometry: Geometry = None
+
+
+def _init_worker(arrays: Dict[str, np.ndarray], palette: List[str]):
+    global _worker_geometry
+    _worker_geometry = Geometry(arrays, palette)
+
+
+def _render_tile(selection: Dict[str, np.ndarray],
+                 bounds: Tuple[float, float, float, float], figpath: str,
+                 geometry: Geometry = None) -> str:
+    from mpl_canvas import TileCanvas
+
+    if geometry is None:
+        geometry = _worker_geometry
+    canvas = TileCanvas(bounds, TILE_SIZE)
+    take(geometry, selection).draw(canvas)
+    canvas.save(figpath)
+    return figpath
+
+
+def write_pyramid(geometry: Geometry, dirpath: str, levels: int,
+                  jobs: int = 1) -> dict:
+    """Write a geometry as a pyramid of png tiles
+
+    Level 0 is one tile showing everything, each further level doubles
+    the resolution. Tiles are written to `<level>/<x>/<y>.png` with y
+    counted from the top, empty tiles are skipped. `tiles.json`
+    describes the pyramid.
+
+    Args:
+        geometry (Geometry): primitives to draw
+        dirpath (str): output directory
+        levels (int): number of zoom levels
+        jobs (int, optional): number of worker processes, 0 uses every
+            core. Defaults to 1.
+
+    Returns:
+        dict: the descriptor
+    """
+    boxes = primitive_bounds(geometry)
+    b = np.concatenate([a for a in boxes.values() if len(a) > 0] or
+                       [np.zeros((1, 4))])
+    xmin, ymin = b[:, 0].min(), b[:, 1].min()
+    xmax, ymax = b[:, 2].max(), b[:, 3].max()
+    edge = max(xmax - xmin, ymax - ymin) or 1.0
+    # centre the drawing in the square of level 0
+    x0 = 0.5*(xmin + xmax) - 0.5*edge
+    y1 = 0.5*(ymin + ymax) + 0.5*edge
+
+    tasks = []
+    n_tiles = []
+    for level in range(levels):
+        n = 2**level
+        cell = edge/n
+        pixel = cell/TILE_SIZE
+        index = GridIndex(boxes, (x0, y1, edge), n, MIN_PIXELS*pixel)
+        for (ix, iy), selection in sorted(index.cells.items()):
+            bounds = (x0 + ix*cell, y1 - (iy + 1)*cell,
+                      x0 + (ix + 1)*cell, y1 - iy*cell)
+            figpath = os.path.join(dirpath, f'{level}/{ix}/{iy}.png')
+            os.makedirs(os.path.dirname(figpath), exist_ok=True)
+            tasks.append((selection, bounds, figpath))
+        n_tiles.append(len(index.cells))
+
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if jobs <= 1:
+        for selection, bounds, figpath in tasks:
+            _render_tile(selection, bounds, figpath, geometry)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(geometry.arrays(),
+                                           geometry.palette)) as executor:
+            for future in [executor.submit(_render_tile, *task)
+                           for task in tasks]:
+                future.result()
+
+    descriptor = {
+        'tile_size': TILE_SIZE,
+        'levels': levels,
+        'format': 'png',
+        'path': '{level}/{x}/{y}.png',
+        # data coordinates of the top left corner and edge of level 0
+        'origin': [float(x0), float(y1)],
+        'extent': float(edge),
+        'bounds': [float(xmin), float(ymin), float(xmax), float(ymax)],
+        'tiles': n_tiles,
+    }
+    with open(os.path.join(dirpath, 'tiles.json'), 'w') as f:
+        json.dump(descriptor, f, indent=1)
+    logger.info(f'write {sum(n_tiles)} tiles in {levels} levels to {dirpath}')
+    return descriptor
@@ -0,0 +1,278 @@
+import glob
+import os
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from profiler import stage
+from svg_parser import seek_tree
+
+LETTERS_DIR = os.path.join(os.path.dirname(__file__), 'letters')
+
+EMPTY_ADVANCE = 0.5  # advance of glyphs without strokes, e.g. space [size]
+SPACING = 0.1  # between the strokes of neighbouring glyphs [size]
+
+symbol_map = {
+    '&': 'and',
+    '\'': 'apostrophe',
+    '*': 'asterisk',
+    '@': 'at',
+    '(': 'bracket-l',
+    ')': 'bracket-r',
+    '^': 'circumflex',
+    ':': 'colon',
+    ',': 'comma',
+    '{': 'curly-bracket-l',
+    '}': 'curly-bracket-r',
+    '$': 'dollar',
+    '=': 'equal',
+    '!': 'exclamation',
+    '>': 'ge',
+    '`': 'grave',
+    '-': 'hyphen',
+    '<': 'le',
+    '#': 'no',
+    '%': 'per',
+    '.': 'period',
+    '+': 'plus',
+    '?': 'question',
+    '\"': 'quotation',
+    ';': 'semicolon',
+    '/': 'slash',
+    '[': 'sq-bracket-l',
+    ']': 'sq-bracket-r',
+    '~': 'tilde',
+    '_': 'underscore',
+    '|': 'vertical',
+    ' ': 'space'
+}
+
+
+def glyph_name(s: str) -> str:
+    """Name of the glyph file (without extension) for a letter
+
+    Args:
+        s (str): single letter
+
+    Returns:
+        str: glyph name, e.g. `a_lower`, `A_upper`, `0`, `hyphen` or `tofu`
+    """
+    if 'a' <= s <= 'z':
+        return f'{s}_lower'
+    if 'A' <= s <= 'Z':
+        return f'{s}_upper'
+    if '0' <= s <= '9':
+        return s
+    if s in symbol_map:
+        return symbol_map[s]
+    return 'tofu'
+
+
+def load_glyph(filename: str) -> List[np.ndarray]:
+    """Load strokes of a glyph svg
+
+    The 20x20 glyph cell is centred on the origin, flipped to y-up and
+    scaled so that multiplying by the text size gives eagle units.
+
+    Args:
+        filename (str): path of the glyph svg
+
+    Returns:
+        List[np.ndarray]: polylines with shape (N, 2)
+    """
+    with stage('glyph_load'):
+        root = ET.parse(filename).getroot()
+        strokes = []
+        for a in seek_tree(root):
+            strokes.append(np.column_stack([(a[:, 0]-10.0)/12.7,
+                                            (10.0-a[:, 1])/12.7]))
+    return strokes
+
+
+class GlyphStore(object):
+    """In-memory vector font
+
+    Each glyph svg is read from disk at most once. `hits` and `misses`
+    count lookups served from memory and loads from disk.
+    """
+
+    def __init__(self, dirpath: str = LETTERS_DIR):
+        self.dirpath = dirpath
+        self.glyphs: Dict[str, List[np.ndarray]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name: str) -> List[np.ndarray]:
+        """Strokes of a glyph by its name
+
+        Args:
+            name (str): glyph name (see `glyph_name`)
+
+        Returns:
+            List[np.ndarray]: centred and flipped polylines
+        """
+        strokes = self.glyphs.get(name)
+        if strokes is not None:
+            self.hits += 1
+            return strokes
+        self.misses += 1
+        filename = os.path.join(self.dirpath, f'{name}.svg')
+        if not os.path.exists(filename):
+            filename = os.path.join(self.dirpath, 'tofu.svg')
+        strokes = load_glyph(filename)
+        self.glyphs[name] = strokes
+        return strokes
+
+    def lookup(self, s: str) -> List[np.ndarray]:
+        """Strokes of a letter
+
+        Args:
+            s (str): single letter
+
+        Returns:
+            List[np.ndarray]: centred and flipped polylines
+        """
+        return self.get(glyph_name(s))
+
+    def preload(self):
+        """Load every glyph in the font directory"""
+        for f in sorted(glob.glob(os.path.join(self.dirpath, '*.svg'))):
+            name = os.path.splitext(os.path.basename(f))[0]
+            if name not in self.glyphs:
+                self.misses += 1
+                self.glyphs[name] = load_glyph(f)
+
+    def stats(self) -> Dict[str, int]:
+        return {'glyphs': len(self.glyphs),
+                'hits': self.hits,
+                'misses': self.misses}
+
+
+glyph_store = GlyphStore()
+
+
+class GlyphTable(object):
+    """Strokes and metrics of every glyph, packed for whole-string layout
+
+    The stroke segments of all glyphs are stacked in one (M, 4) array of
+    x1, y1, x2, y2 in units of the text size; glyph i owns the rows
+    `starts[i]:starts[i+1]`. `advance` is the width of a glyph's strokes
+    plus `SPACING` and `bearing` moves its strokes to start at the pen.
+    Characters are looked up by code point, anything outside ascii draws
+    the tofu glyph.
+
+    Args:
+        store (GlyphStore): font to pack, every glyph is loaded
+    """
+
+    def __init__(self, store: GlyphStore):
+        store.preload()
+        names = sorted(store.glyphs)
+        index = {name: i for i, name in enumerate(names)}
+        tofu = index.get('tofu', 0)
+        self.ascii = np.array([index.get(glyph_name(chr(c)), tofu)
+                               for c in range(128)], dtype=np.intp)
+        self.tofu = tofu
+
+        segments = []
+        counts = []
+        self.advance = np.full(len(names), EMPTY_ADVANCE)
+        self.bearing = np.zeros(len(names))
+        for i, name in enumerate(names):
+            strokes = store.glyphs[name]
+            segs = [np.column_stack([p[:-1], p[1:]]) for p in strokes]
+            segs = np.concatenate(segs) if len(segs) > 0 else \
+                np.zeros((0, 4))
+            segments.append(segs)
+            counts.append(len(segs))
+            if len(segs) > 0:
+                xmin = min(segs[:, 0].min(), segs[:, 2].min())
+                xmax = max(segs[:, 0].max(), segs[:, 2].max())
+                self.advance[i] = xmax - xmin + SPACING
+                self.bearing[i] = -xmin
+        self.segments = np.concatenate(segments)
+        self.starts = np.concatenate([[0], np.cumsum(counts)]).astype(np.intp)
+        # cap height and baseline of the capitals and digits, descenders
+        # reach below the baseline like in eagle
+        caps = [self.segments[self.starts[i]:self.starts[i+1]]
+                for i in self.ascii[[ord(c) for c in
+                                     'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789']]]
+        ys = np.concatenate([c[:, [1, 3]].ravel() for c in caps] + [[]])
+        if len(ys) > 0:
+            self.ascent, self.descent = float(ys.max()), float(ys.min())
+        else:
+            self.ascent, self.descent = 0.5, -0.5
+
+    def glyphs(self, s: str) -> np.ndarray:
+        """Glyph indices of the characters of a string"""
+        codes = np.frombuffer(s.encode('utf-32-le'), dtype=np.uint32)
+        return np.where(codes < 128, self.ascii[np.minimum(codes, 127)],
+                        self.tofu)
+
+    def extent(self, s: str, size: float = 1.0, w: float = 0.0) -> float:
+        """Width of a string from its first to its last stroke"""
+        g = self.glyphs(s)
+        if len(g) == 0:
+            return 0.0
+        return size*(self.advance[g].sum() - SPACING) + w*(len(g) - 1)
+
+    def layout(self, s: str, size: float = 1.0, w: float = 0.0,
+               align: str = 'bottom-left',
+               angle: float = 0.0) -> Tuple[np.ndarray, float]:
+        """Stroke segments of a whole string around its anchor
+
+        Args:
+            s (str): text
+            size (float, optional): text size. Defaults to 1.0.
+            w (float, optional): linewidth, added to every advance.
+                Defaults to 0.0.
+            align (str, optional): anchor of the text, e.g. `top-center`,
+                from the extent of the string and the line box of the
+                font. Defaults to 'bottom-left'.
+            angle (float, optional): rotation about the anchor [rad].
+                Defaults to 0.0.
+
+        Returns:
+            Tuple[np.ndarray, float]: segments (N, 4) of x1, y1, x2, y2
+                relative to the anchor, and the width of the string
+        """
+        g = self.glyphs(s)
+        advance = size*self.advance[g] + w
+        # pen position of each glyph, its strokes start there
+        pen = np.cumsum(advance) - advance + size*self.bearing[g]
+        width = float(advance.sum()) - size*SPACING - w if len(g) > 0 \
+            else 0.0
+
+        counts = self.starts[g + 1] - self.starts[g]
+        n = int(counts.sum())
+        first = np.cumsum(counts) - counts
+        rows = np.repeat(self.starts[g] - first, counts) + np.arange(n)
+        segs = size*self.segments[rows]
+        shift = np.repeat(pen, counts)
+
+        vertical, _, horizontal = align.partition('-')
+        if horizontal == '':  # `center`
+            horizontal = 'center'
+        dx = {'left': 0.0, 'center': -0.5*width,
+              'right': -width}.get(horizontal, 0.0)
+        dy = {'top': -size*self.ascent, 'center': 0.0,
+              'bottom': -size*self.descent}.get(vertical, 0.0)
+        x = segs[:, [0, 2]] + (shift + dx)[:, None]
+        y = segs[:, [1, 3]] + dy
+        if angle != 0:
+            c, s_ = np.cos(angle), np.sin(angle)
+            x, y = c*x - s_*y, s_*x + c*y
+        return np.column_stack([x[:, 0], y[:, 0], x[:, 1], y[:, 1]]), width
+
+
+_glyph_table: GlyphTable = None
+
+
+def glyph_table() -> GlyphTable:
+    """Glyph table of the font, built on first use"""
+    global _glyph_table
+    if _glyph_table is None:
+        with stage('glyph_table'):
+            _glyph_table = GlyphTable(glyph_store)
+    return _glyph_table